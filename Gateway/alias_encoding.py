@@ -0,0 +1,176 @@
+import json
+import struct
+import time
+from collections import namedtuple
+from django.conf import settings
+
+# Alias payload mode for outbound MQTT (Sparkplug-style).
+#
+# A "birth" message, encoded with the connector's payload codec and published
+# to <topic>/BIRTH, lists every metric ("device/key") with a numeric alias and
+# its current value:
+#     {"type": "birth", "bd_seq": 3, "timestamp": ..., "metrics": [{"name", "alias", "value"}]}
+# "Data" messages on <topic>/DATA are binary and carry only the aliases whose
+# value changed since the last message:
+#     DATA_HEADER  version, bd_seq, seq, frame count
+#     per frame:   FRAME_HEADER  timestamp (ms), metric count
+#     per metric:  METRIC_HEADER alias, value type, then the value
+# A consumer must drop data whose bd_seq does not match the last birth.
+# The session is reborn (new bd_seq, full birth) after a reconnect, a
+# configuration change or when a new metric shows up.
+
+PAYLOAD_MODES = ("plain", "alias")
+BIRTH_SUFFIX = "/BIRTH"
+DATA_SUFFIX = "/DATA"
+VERSION = 1
+MAX_ALIAS = 0xFFFF
+
+DATA_HEADER = struct.Struct(">BIIH")
+FRAME_HEADER = struct.Struct(">QH")
+METRIC_HEADER = struct.Struct(">HB")
+LENGTH = struct.Struct(">I")
+
+T_NULL, T_BOOL, T_INT, T_FLOAT, T_STR, T_JSON = range(6)
+SCALARS = {T_BOOL: struct.Struct(">?"), T_INT: struct.Struct(">q"), T_FLOAT: struct.Struct(">d")}
+
+# Messages of one send: birth (None when the session is current) and data
+# (None when nothing changed), plus the session state to commit once published.
+AliasMessages = namedtuple("AliasMessages", ["birth", "data", "state"])
+SessionState = namedtuple("SessionState", ["key", "bd_seq", "seq", "aliases", "values"])
+EncodedValue = namedtuple("EncodedValue", ["type", "data"])
+
+
+def get_payload_mode(plan):
+    configuration = plan.configuration if isinstance(plan.configuration, dict) else {}
+    mode = configuration.get("payload_mode", getattr(settings, "OUTBOUND_PAYLOAD_MODE", "plain"))
+    if mode not in PAYLOAD_MODES:
+        print(f"⚠ Unknown payload mode {mode!r} for outbound connector {plan.name}, sending plain payloads")
+        return "plain"
+    return mode
+
+
+def frame_metrics(frame):
+    """Flatten an outbound frame into {metric name: value}."""
+    if "values" in frame:  # modbus: {"node", "values": {key: value}}
+        return {f"{frame.get('node')}/{key}": value for key, value in frame["values"].items()}
+    if "data" in frame:  # mqtt: {"data": {device: {key: value}}}
+        return {
+            f"{device}/{key}": value
+            for device, values in frame["data"].items()
+            for key, value in values.items()
+        }
+    return {key: value for key, value in frame.items() if key != "timestamp"}
+
+
+def encode_value(value):
+    if value is None:
+        return EncodedValue(T_NULL, b"")
+    if isinstance(value, bool):
+        return EncodedValue(T_BOOL, SCALARS[T_BOOL].pack(value))
+    if isinstance(value, int) and -(2 ** 63) <= value < 2 ** 63:
+        return EncodedValue(T_INT, SCALARS[T_INT].pack(value))
+    if isinstance(value, (int, float)):
+        return EncodedValue(T_FLOAT, SCALARS[T_FLOAT].pack(value))
+    if isinstance(value, str):
+        data = value.encode()
+        return EncodedValue(T_STR, LENGTH.pack(len(data)) + data)
+    data = json.dumps(value).encode()
+    return EncodedValue(T_JSON, LENGTH.pack(len(data)) + data)
+
+
+def decode_data(payload):
+    """Inverse of the data encoding: (bd_seq, seq, [(timestamp, {alias: value}), ...])."""
+    version, bd_seq, seq, frame_count = DATA_HEADER.unpack_from(payload)
+    if version != VERSION:
+        raise ValueError(f"unsupported alias payload version {version}")
+    offset = DATA_HEADER.size
+    frames = []
+    for _ in range(frame_count):
+        timestamp, count = FRAME_HEADER.unpack_from(payload, offset)
+        offset += FRAME_HEADER.size
+        values = {}
+        for _ in range(count):
+            alias, value_type = METRIC_HEADER.unpack_from(payload, offset)
+            offset += METRIC_HEADER.size
+            if value_type in SCALARS:
+                values[alias] = SCALARS[value_type].unpack_from(payload, offset)[0]
+                offset += SCALARS[value_type].size
+            elif value_type == T_NULL:
+                values[alias] = None
+            else:
+                (length,) = LENGTH.unpack_from(payload, offset)
+                data = payload[offset + LENGTH.size:offset + LENGTH.size + length]
+                offset += LENGTH.size + length
+                values[alias] = data.decode() if value_type == T_STR else json.loads(data)
+        frames.append((timestamp, values))
+    return bd_seq, seq, frames
+
+
+class AliasSession:
+    """Alias table and last sent values of one outbound MQTT connector.
+
+    ``prepare`` builds the messages for a batch of frames without changing
+    the session; ``commit`` applies them once they were published, so a
+    failed send is simply prepared again on retry.
+    """
+
+    def __init__(self):
+        self.state = SessionState(None, 0, 0, {}, {})
+        self.births = 0
+
+    def prepare(self, frames, key, codec):
+        """Messages for frames; key identifies the MQTT session and configuration, a new key forces a rebirth.
+
+        The birth is encoded with codec, data messages are always binary.
+        """
+        state = self.state
+        aliases = dict(state.aliases)
+        values = dict(state.values)
+        now = int(time.time() * 1000)
+        batches = []
+        for frame in frames:
+            changed = {}
+            for name, value in frame_metrics(frame).items():
+                if name not in aliases:
+                    if len(aliases) > MAX_ALIAS:
+                        raise ValueError(f"more than {MAX_ALIAS + 1} metrics, cannot assign an alias to {name}")
+                    aliases[name] = len(aliases)
+                if name not in values or values[name] != value:
+                    changed[aliases[name]] = value
+                values[name] = value
+            if changed:
+                batches.append((int(frame.get("timestamp") or now), changed))
+
+        rebirth = state.key != key or len(aliases) != len(state.aliases)
+        birth = None
+        bd_seq, seq = state.bd_seq, state.seq
+        if rebirth:
+            bd_seq, seq = (bd_seq + 1) & 0xFFFFFFFF, 0
+            birth = codec.encode({
+                "type": "birth",
+                "bd_seq": bd_seq,
+                "timestamp": now,
+                "metrics": [{"name": name, "alias": alias, "value": values.get(name)} for name, alias in aliases.items()],
+            })
+            batches = []  # the birth already carries the current values
+
+        data = None
+        if batches:
+            parts = [DATA_HEADER.pack(VERSION, bd_seq, seq, len(batches))]
+            for timestamp, changed in batches:
+                parts.append(FRAME_HEADER.pack(timestamp, len(changed)))
+                for alias, value in changed.items():
+                    encoded = encode_value(value)
+                    parts.append(METRIC_HEADER.pack(alias, encoded.type))
+                    parts.append(encoded.data)
+            data = b"".join(parts)
+            seq = (seq + 1) & 0xFFFFFFFF
+        return AliasMessages(birth, data, SessionState(key, bd_seq, seq, aliases, values))
+
+    def commit(self, messages):
+        if messages.birth is not None:
+            self.births += 1
+        self.state = messages.state
+
+    def stats(self):
+        return {"bd_seq": self.state.bd_seq, "seq": self.state.seq, "aliases": len(self.state.aliases), "births": self.births}
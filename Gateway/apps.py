@@ -8,12 +8,21 @@ class GatewayConfig(AppConfig):
     name = 'Gateway'
 
     def ready(self):
+        # Invalidate cached poll plans whenever configuration rows change
+        from . import signals  # noqa: F401
+
         if os.environ.get('RUN_MAIN') == 'true':  # Prevent double run in dev mode
             # Import here to avoid Django app registry issues
-            from . import modbus, mqtt
+            from . import modbus, mqtt, rest_poller, retention
 
             # # Start Modbus loop
             modbus.start_modbus_loop()
 
             # # Start MQTT loop
             mqtt.start_mqtt_loop()
+
+            # Poll REST inbound connectors in pull mode
+            rest_poller.start_rest_poll_loop()
+
+            # Trim stored samples to each connector's retention policy
+            retention.start_retention_loop()
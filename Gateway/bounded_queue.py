@@ -0,0 +1,81 @@
+import collections
+import threading
+import time
+
+# What put() does when the queue is full
+BLOCK = "block"              # wait for space (up to block_timeout, then drop the new item)
+DROP_OLDEST = "drop_oldest"  # evict the oldest queued item
+DROP_NEWEST = "drop_newest"  # reject the new item
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+class BoundedQueue:
+    """Thread-safe FIFO with a fixed capacity, an overflow policy and counters."""
+
+    def __init__(self, maxsize, policy=BLOCK, block_timeout=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r}, expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = max(int(maxsize), 1)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.enqueued = 0
+        self.dropped = 0
+        self.high_watermark = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Enqueue an item, return False if it was dropped instead."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait_for(lambda: len(self._items) < self.maxsize, self.block_timeout):
+                    self.dropped += 1
+                    return False
+            self._items.append(item)
+            self.enqueued += 1
+            self.high_watermark = max(self.high_watermark, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get_batch(self, max_items, timeout):
+        """Wait until max_items are queued or timeout elapses, then pop up to max_items."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._items) < max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(count)]
+            if batch:
+                self._cond.notify_all()
+            return batch
+
+    def get(self, timeout):
+        """Pop one item, or return None if nothing arrives within timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def stats(self):
+        return {
+            "depth": len(self._items),
+            "capacity": self.maxsize,
+            "policy": self.policy,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "high_watermark": self.high_watermark,
+        }
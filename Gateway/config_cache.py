@@ -0,0 +1,39 @@
+import threading
+
+# Bumped whenever gateway configuration changes; everything derived from the
+# configuration (read plans, decoders, ...) is cached against this version.
+_version = 0
+_cache = {}
+_lock = threading.Lock()
+
+
+def version():
+    return _version
+
+
+def invalidate():
+    """Drop everything derived from the current configuration."""
+    global _version
+    with _lock:
+        _version += 1
+        _cache.clear()
+
+
+def cached(key, builder):
+    """Return builder() for the current config version, building it at most once per version."""
+    with _lock:
+        built_version = _version
+        if key in _cache:
+            return _cache[key]
+    value = builder()
+    with _lock:
+        # Don't store values built from configuration that changed meanwhile
+        if built_version == _version:
+            value = _cache.setdefault(key, value)
+    return value
+
+
+def peek(key):
+    """Return the value cached for key at the current version, None if it is not built yet."""
+    with _lock:
+        return _cache.get(key)
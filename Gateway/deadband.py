@@ -0,0 +1,69 @@
+import threading
+import time
+
+ABSOLUTE = "absolute"
+PERCENT = "percent"
+
+
+def exceeds_deadband(previous, value, deadband, mode=ABSOLUTE):
+    """True when value moved further than the deadband away from previous."""
+    try:
+        change = abs(float(value) - float(previous))
+    except (TypeError, ValueError):
+        return value != previous  # non-numeric values are reported on any change
+    if mode == PERCENT:
+        if previous == 0:
+            return change > 0
+        return change > abs(float(previous)) * deadband / 100.0
+    return change > deadband
+
+
+class DeadbandFilter:
+    """Remembers the last reported value per series and drops unchanged samples.
+
+    A sample passes when its series has no deadband configured, when it is
+    the first value seen, when it moved beyond the deadband since the last
+    *reported* value, or when the series has been silent for ``heartbeat``
+    seconds. Comparing against the last reported value (not the last polled
+    one) stops slow drifts from slipping through in small steps.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.passed = 0
+        self.suppressed = 0
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def should_report(self, key, value, deadband=None, mode=ABSOLUTE, heartbeat=None, now=None):
+        if deadband is None:
+            self.passed += 1
+            return True
+        now = self.clock() if now is None else now
+        with self._lock:
+            last = self._last.get(key)
+            report = (
+                last is None
+                or exceeds_deadband(last[0], value, deadband, mode)
+                or (heartbeat and now - last[1] >= heartbeat)
+            )
+            if report:
+                self._last[key] = (value, now)
+                self.passed += 1
+            else:
+                self.suppressed += 1
+            return bool(report)
+
+    def filter_samples(self, samples):
+        """Filter Modbus (TimeseriesPlan, value) pairs."""
+        now = self.clock()
+        return [
+            (ts, value) for ts, value in samples
+            if self.should_report(("modbus", ts.id), value, ts.deadband, ts.deadband_mode, ts.heartbeat, now)
+        ]
+
+    def stats(self):
+        return {"series": len(self._last), "passed": self.passed, "suppressed": self.suppressed}
+
+
+deadband_filter = DeadbandFilter()
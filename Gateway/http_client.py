@@ -0,0 +1,124 @@
+import gzip
+import threading
+import time
+from collections import namedtuple
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+# Connection settings of one REST connector; configuration keys of the same
+# name override the HTTP_* settings.
+HTTPOptions = namedtuple("HTTPOptions", ["pool_size", "connect_timeout", "read_timeout", "gzip"])
+
+
+def get_http_options(connector):
+    configuration = connector.configuration if isinstance(connector.configuration, dict) else {}
+    try:
+        return HTTPOptions(
+            pool_size=max(int(configuration.get("pool_size", getattr(settings, "HTTP_POOL_SIZE", 4))), 1),
+            connect_timeout=float(configuration.get("connect_timeout", getattr(settings, "HTTP_CONNECT_TIMEOUT", 5))),
+            read_timeout=float(configuration.get("read_timeout", getattr(settings, "HTTP_READ_TIMEOUT", 10))),
+            gzip=bool(configuration.get("gzip", getattr(settings, "HTTP_GZIP_REQUESTS", False))),
+        )
+    except (TypeError, ValueError):
+        print(f"⚠ Invalid HTTP settings for connector {connector.name}, using defaults")
+        return HTTPOptions(4, 5.0, 10.0, False)
+
+
+class HTTPClient:
+    """Keep-alive requests.Session for one REST connector.
+
+    Connections are pooled per host (up to ``pool_size``), so consecutive
+    sends reuse the TCP/TLS connection. With ``gzip`` enabled, request
+    bodies are compressed unless they already carry a Content-Encoding.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=options.pool_size, pool_maxsize=options.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.requests = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self.total_latency = 0.0
+
+    def request(self, method, url, data=None, headers=None, **kwargs):
+        headers = dict(headers or {})
+        if data is not None and self.options.gzip and "Content-Encoding" not in headers:
+            if isinstance(data, str):
+                data = data.encode()
+            data = gzip.compress(data)
+            headers["Content-Encoding"] = "gzip"
+        kwargs.setdefault("timeout", (self.options.connect_timeout, self.options.read_timeout))
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, data=data, headers=headers, **kwargs)
+        except requests.RequestException:
+            self.failures += 1
+            raise
+        finally:
+            self.requests += 1
+            self.total_latency += time.monotonic() - started
+            self.bytes_sent += len(data) if isinstance(data, (bytes, bytearray)) else 0
+        if response.status_code >= 400:
+            self.failures += 1
+        return response
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        return self.request("POST", url, data=data, headers=headers, **kwargs)
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        return self.request("GET", url, params=params, headers=headers, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "bytes_sent": self.bytes_sent,
+            "avg_latency": round(self.total_latency / self.requests, 4) if self.requests else None,
+        }
+
+
+class HTTPClientManager:
+    """Shared HTTPClient per connector id, replaced when its HTTP settings change."""
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, connector):
+        """Return the client for an outbound connector (model or OutboundPlan)."""
+        options = get_http_options(connector)
+        stale = None
+        with self._lock:
+            client = self._clients.get(connector.id)
+            if client is not None and client.options != options:
+                stale, client = client, None
+            if client is None:
+                client = self._clients[connector.id] = HTTPClient(options)
+        if stale:
+            stale.close()
+        return client
+
+    def retain(self, connector_ids):
+        """Close clients of connectors that no longer exist."""
+        with self._lock:
+            stale = [self._clients.pop(key) for key in list(self._clients) if key not in connector_ids]
+        for client in stale:
+            client.close()
+
+    def close_all(self):
+        self.retain(())
+
+    def stats(self):
+        with self._lock:
+            clients = dict(self._clients)
+        return {connector_id: client.stats() for connector_id, client in clients.items()}
+
+
+http_clients = HTTPClientManager()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gateway', '0004_auto_20250826_1020'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='unit_id',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gateway', '0005_device_unit_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='connect_timeout',
+            field=models.FloatField(default=3.0),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='read_timeout',
+            field=models.FloatField(default=3.0),
+        ),
+    ]
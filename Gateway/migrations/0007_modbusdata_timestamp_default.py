@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gateway', '0006_device_timeouts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ihg_modbusdata',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
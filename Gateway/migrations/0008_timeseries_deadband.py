@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Gateway', '0007_modbusdata_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ihg_mqtttimeseries',
+            name='deadband',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ihg_mqtttimeseries',
+            name='deadband_mode',
+            field=models.CharField(choices=[('absolute', 'Absolute'), ('percent', 'Percent')], default='absolute', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='ihg_mqtttimeseries',
+            name='heartbeat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ihg_timeseries',
+            name='deadband',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ihg_timeseries',
+            name='deadband_mode',
+            field=models.CharField(choices=[('absolute', 'Absolute'), ('percent', 'Percent')], default='absolute', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='ihg_timeseries',
+            name='heartbeat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
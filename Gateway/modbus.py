@@ -1,207 +1,181 @@
 import time
-from datetime import datetime, timedelta
-from pymodbus.client import ModbusTcpClient
-from Gateway.models import (
-    IHG_InboundConnector,
-    IHG_OutboundConnector,
-    IHG_MQTTConfiguration,
-    Device,
-    IHG_Timeseries,
-    IHG_ModbusData,
-    IHG_Gateway,
-)
-import json
-import paho.mqtt.client as mqtt
-from Gateway.models import (
-    IHG_InboundConnector,
-    IHG_OutboundConnector,
-    IHG_MQTTConfiguration,
-    Device,
-    IHG_Timeseries,
-    IHG_ModbusData
-)
-import paho.mqtt.client as mqtt
-import paho.mqtt.publish as publish
-import json
-import time
-from datetime import datetime
-import requests
-from django.utils.timezone import now
+import functools
 import threading
+from django.conf import settings
+from django.utils import timezone
+from Gateway.models import IHG_ModbusData
+from Gateway import config_cache
+from Gateway import status as status_module
+from Gateway.deadband import deadband_filter
+from Gateway.modbus_decoder import get_block_decoder
+from Gateway.modbus_health import device_health
+from Gateway.modbus_pool import connection_pool
+from Gateway.poll_plan import get_poll_plan
+from Gateway.router import outbound_router
+from Gateway.sample_writer import get_sample_writer
+from Gateway.scheduler import DeadlineScheduler
 
 modbus_thread = None
 modbus_thread_stop_event = threading.Event()
+modbus_scheduler = None
 
+# Seconds between sweeps for idle pooled connections
+IDLE_CHECK_INTERVAL = 30
+
+
+def build_mqtt_payload(device_name, connector_id, values):
+    return {
+        "node": device_name,
+        "group": str(connector_id),
+        "timestamp": int(time.time() * 1000),
+        "values": values,
+        "errors": {}
+    }
+
+
+def build_rest_payload(connector, device_name, values):
+    return {
+        "gateway": connector.gateway.name,
+        "device": device_name,
+        "connector_id": str(connector.connector_id),
+        "values": values
+    }
 
-def publish_to_mqtt(gateway, device_name, connector_id, values):
-    try:
-        # 1️⃣ Find outbound MQTT connector for the same gateway
-        outbound_connector = IHG_OutboundConnector.objects.filter(
-            gateway=gateway, connector_type='mqtt'
-        ).first()
-
-        if not outbound_connector:
-            print(f"⚠ No outbound MQTT connector found for gateway {gateway.name}")
-            return
-
-        # 2️⃣ Get MQTT configuration
-        mqtt_config = getattr(outbound_connector, "mqtt_config", None)
-        if not mqtt_config:
-            print(f"⚠ No MQTT configuration found for outbound connector {outbound_connector.name}")
-            return
-
-        # 3️⃣ Prepare MQTT client
-        client = mqtt.Client()
-        if mqtt_config.username:
-            client.username_pw_set(mqtt_config.username, mqtt_config.password or "")
-
-        client.connect(mqtt_config.broker_ip, mqtt_config.port, keepalive=60)
-
-        # 4️⃣ Prepare payload
-        payload = {
-            "node": device_name,
-            "group": str(connector_id),
-            "timestamp": int(time.time() * 1000),
-            "values": values,
-            "errors": {}
-        }
-
-        topics = mqtt_config.topics.all()
-        for  topic in topics:
-            print("topic",topic.name)
-        #     publish.single(
-        #     topic=topic.name,
-        #     payload=json.dumps(payload),
-        #     hostname=mqtt_config.broker_ip,
-        #     port=mqtt_config.port
-        # )
-            client.publish(topic.name, json.dumps(payload))
-        client.disconnect()
-        print(f"📤 MQTT Published for {device_name} to topic {topic}")
 
+def decode_block(block, registers):
+    """Decode a block read result into (timeseries, value) pairs."""
+    decoder = get_block_decoder(block)
+    try:
+        values = decoder.decode(registers)
     except Exception as e:
-        print(f"❌ MQTT publish failed for {device_name}: {e}")
+        print(f"      ❌ Error decoding registers {block.start}-{block.start + block.count - 1}: {e}")
+        return []
+    return [(block.tags[position].timeseries, value) for position, value in zip(decoder.positions, values)]
+
+
+def store_device_samples(connector, device, samples):
+    """Persist one device's samples and forward them to the gateway's outbound connectors."""
+    samples = deadband_filter.filter_samples(samples)
+    values_dict = {}
+    writer = get_sample_writer()
+    now = timezone.now()
+    for ts, value in samples:
+        writer.submit(IHG_ModbusData(timeseries_id=ts.id, value=value, timestamp=now))
+        values_dict[ts.name] = value
+        print(f"      📊 TS {ts.name} = {value}")
+
+    if values_dict:
+        forward_device_values(connector, device, values_dict)
+
+
+def forward_device_values(connector, device, values_dict):
+    """Hand one device's values to every outbound connector of the gateway, without waiting for any of them."""
+    for ob_connector in connector.outbound:
+        if ob_connector.connector_type == "mqtt":
+            if not ob_connector.mqtt:
+                print(f"⚠ No MQTT configuration found for outbound connector {ob_connector.name}")
+                continue
+            print(f"   📤 Queueing MQTT publish via {ob_connector.name}")
+            frame = build_mqtt_payload(device.device_name, connector.connector_id, values_dict)
+        elif ob_connector.connector_type == "rest":
+            print(f"   🌐 Queueing REST request to {ob_connector.rest_url} [{ob_connector.rest_method}]")
+            frame = build_rest_payload(connector, device.device_name, values_dict)
+        else:
+            continue
+        try:
+            outbound_router.route(ob_connector, frame)
+        except Exception as e:
+            print(f"   ❌ Error queueing data for {ob_connector.name}: {e}")
+
+
+def set_device_status(device, status):
+    status_module.set_device_status(device.id, status)
+
+
+def update_connector_status(connector, connector_active):
+    status_module.set_connector_status(
+        "inbound", connector.id, "active" if connector_active else "inactive", gateway_id=connector.gateway.id
+    )
+
 
 def read_modbus_timeseries(connector):
-    """Read Modbus timeseries for a single connector."""
+    """Read Modbus timeseries for a single connector (a poll plan ConnectorPlan)."""
     print(f"🔌 Checking connector: {connector.name}")
 
-    devices = Device.objects.filter(connector=connector)
     connector_active = False
 
-    for device in devices:
+    for device in connector.devices:
         ip = device.device_ip
         port = device.device_port
 
-        errors = {}
+        health = device_health.get(device.id)
+        if not health.allow_request():
+            print(f"   ⏸ Device {device.device_name} backing off until {health.backing_off_until:%H:%M:%S}")
+            continue
+
         print(f"   📡 Connecting to device {device.device_name} ({ip}:{port})")
-        client = ModbusTcpClient(ip, port=port)
+        client = connection_pool.acquire(ip, port, device.unit_id, device.connect_timeout, device.read_timeout)
 
-        if client.connect():
+        if client:
             print(f"   ✅ Device {device.device_name} connected")
-            device.device_status = "active"
-            device.save(update_fields=["device_status"])
-            connector_active = True  # At least one device is active
-            values_dict = {}
-            ts_list = IHG_Timeseries.objects.filter(device=device)
-            for ts in ts_list:
+            samples = []
+            error = None
+            for block in device.blocks:
                 try:
-                    result = client.read_holding_registers(address=int(ts.address), count=1)
+                    result = client.read_holding_registers(address=block.start, count=block.count)
                     if result.isError():
-                        print(f"      ⚠ Error reading {ts.name}")
+                        print(f"      ⚠ Error reading registers {block.start}-{block.start + block.count - 1}")
                         continue
-                    value = result.registers[0] * ts.scale
-                    IHG_ModbusData.objects.create(timeseries=ts, value=value)
-                    values_dict[ts.name] = value
-                    print(f"      📊 TS {ts.name} = {value}")
                 except Exception as e:
-                    print(f"      ❌ Error reading TS {ts.id}: {e}")
-                    
-
-            client.close()
-            if values_dict:
-                outbound_connectors = IHG_OutboundConnector.objects.filter(gateway=connector.gateway)
-
-                for ob_connector in outbound_connectors:
-                    if ob_connector.connector_type == "mqtt":
-                        print(f"   📤 Publishing to MQTT via {ob_connector.name}")
-                        publish_to_mqtt(
-                            gateway=connector.gateway,
-                            device_name=device.device_name,
-                            connector_id=connector.connector_id,
-                            values=values_dict
-                        )
-
-                    elif ob_connector.connector_type == "rest":
-                        try:
-                            payload = {
-                                "gateway": connector.gateway.name,
-                                "device": device.device_name,
-                                "connector_id": str(connector.connector_id),
-                                "values": values_dict
-                            }
-                            print(f"   🌐 Sending REST request to {ob_connector.rest_url} [{ob_connector.rest_method}]")
-
-                            if ob_connector.rest_method == "POST":
-                                resp = requests.post(ob_connector.rest_url, json=payload, timeout=10)
-                            else:  # GET
-                                resp = requests.get(ob_connector.rest_url, params=payload, timeout=10)
-
-                            print(f"   ✅ REST Response {resp.status_code}: {resp.text}")
-                        except Exception as e:
-                            print(f"   ❌ REST API error: {e}")
-
-                   
+                    print(f"      ❌ Error reading registers {block.start}-{block.start + block.count - 1}: {e}")
+                    # Socket is in an unknown state, reconnect on the next cycle
+                    connection_pool.discard(client)
+                    error = e
+                    break
+                samples.extend(decode_block(block, result.registers))
+
+            if error is not None and not samples:
+                health.record_failure(error)
+                set_device_status(device, "inactive")
+                continue
+
+            health.record_success()
+            set_device_status(device, "active")
+            connector_active = True  # At least one device is active
+            store_device_samples(connector, device, samples)
         else:
             print(f"   ❌ Device {device.device_name} connection failed")
-            device.device_status = "inactive"
-            device.save(update_fields=["device_status"])
-            
+            health.record_failure("connection failed")
+            set_device_status(device, "inactive")
 
-    # Update connector status
-    connector.status = "active" if connector_active else "inactive"
-    connector.save(update_fields=["status"])
+    update_connector_status(connector, connector_active)
 
-    # Update gateway status
-    gateway = connector.gateway
-    if IHG_OutboundConnector.objects.filter(gateway=gateway, status="active").exists() or IHG_InboundConnector.objects.filter(gateway=gateway, status="active").exists():
-        gateway.status = "active"
-    else:
-        gateway.status = "inactive"
-    gateway.save(update_fields=["status"])
 
+def schedule_poll_plan(scheduler, plan):
+    """Sync a scheduler's jobs with the connectors of a poll plan."""
+    jobs = {
+        connector.id: (connector.interval, functools.partial(read_modbus_timeseries, connector))
+        for connector in plan.connectors
+    }
+    jobs["close_idle_connections"] = (IDLE_CHECK_INTERVAL, connection_pool.close_idle)
+    scheduler.sync(jobs)
 
-def gateway_loop():
-    """Loop through connectors using their individual interval values."""
-    next_run_times = {}
 
-    while not modbus_thread_stop_event.is_set():
-        now = datetime.now()
-
-        connectors = IHG_InboundConnector.objects.all()
-        for connector in connectors:
-            try:
-                # Read interval from DB
-                try:
-                    interval_sec = int(connector.interval)
-                    
-                except (ValueError, TypeError):
-                    interval_sec = 60  # Default if invalid
-
-                last_run = next_run_times.get(connector.id)
-
-                # If never run or time elapsed, run it
-                if not last_run or now >= last_run:
-                    print(f"🔄 Running connector {connector.name} every {interval_sec} seconds")
-                    
-                    read_modbus_timeseries(connector)
-                    next_run_times[connector.id] = now + timedelta(seconds=interval_sec)
+def gateway_loop():
+    """Poll every connector at its own interval on a deadline scheduler."""
+    scheduler = DeadlineScheduler("modbus")
+    synced_version = None
 
-            except Exception as e:
-                print(f"⚠ Error processing connector {connector.name}: {e}")
+    def refresh():
+        nonlocal synced_version
+        plan = get_poll_plan()
+        if plan.version != synced_version:
+            schedule_poll_plan(scheduler, plan)
+            synced_version = plan.version
 
-        # Small sleep to avoid CPU 100%
-        time.sleep(5)
+    global modbus_scheduler
+    modbus_scheduler = scheduler
+    scheduler.run(modbus_thread_stop_event, refresh=refresh)
 
 def start_modbus_loop():
     global modbus_thread, modbus_thread_stop_event
@@ -209,9 +183,17 @@ def start_modbus_loop():
         print("Stopping existing Modbus thread before starting a new one")
         stop_modbus_loop()
     modbus_thread_stop_event.clear()
-    modbus_thread = threading.Thread(target=gateway_loop, daemon=True)
+    # Configuration may have changed, recompile read plans and decoders and
+    # write every status again, rows may have been re-created meanwhile
+    config_cache.invalidate()
+    status_module.clear()
+    target = gateway_loop
+    if getattr(settings, "MODBUS_ENGINE", "thread") == "asyncio":
+        from Gateway.modbus_async import async_gateway_loop
+        target = async_gateway_loop
+    modbus_thread = threading.Thread(target=target, daemon=True)
     modbus_thread.start()
-    print("Modbus loop started")
+    print(f"Modbus loop started ({target.__name__})")
 
 def stop_modbus_loop():
     global modbus_thread, modbus_thread_stop_event
@@ -221,3 +203,4 @@ def stop_modbus_loop():
         modbus_thread.join(timeout=10)
         print("Modbus loop stopped")
     modbus_thread = None
+    connection_pool.close_all()
@@ -0,0 +1,186 @@
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from pymodbus.client import AsyncModbusTcpClient
+from Gateway import modbus
+from Gateway.modbus_health import device_health
+from Gateway.modbus_pool import set_client_timeout
+from Gateway.poll_plan import get_poll_plan
+from Gateway.scheduler import DeadlineScheduler
+
+# Longest sleep between poll plan refreshes
+POLL_TICK = 1
+
+
+def store_connector_results(connector, results):
+    """Write device status, samples and connector status for one finished cycle."""
+    connector_active = False
+    for device, samples in results:
+        if samples is None:
+            modbus.set_device_status(device, "inactive")
+            continue
+        connector_active = True
+        modbus.set_device_status(device, "active")
+        modbus.store_device_samples(connector, device, samples)
+    modbus.update_connector_status(connector, connector_active)
+
+
+def client_key(device):
+    return device.device_ip, int(device.device_port), int(device.unit_id)
+
+
+class AsyncModbusEngine:
+    """Polls every Modbus device concurrently on one asyncio event loop.
+
+    A global semaphore caps how many devices are read at once and a lock per
+    (ip, port) keeps requests to the same endpoint strictly one at a time, so
+    a cycle takes as long as its slowest device rather than the sum of all.
+    Clients of devices that left the poll plan are closed when the plan
+    changes, and clients unused for MODBUS_IDLE_TIMEOUT seconds are closed
+    every IDLE_CHECK_INTERVAL.
+    """
+
+    def __init__(self, stop_event, max_concurrency=None):
+        self.stop_event = stop_event
+        self.max_concurrency = max_concurrency or getattr(settings, "MODBUS_ASYNC_MAX_CONCURRENCY", 50)
+        self.semaphore = None
+        self.endpoint_locks = {}
+        self.clients = {}
+        self.last_used = {}
+        # Jobs carry the ConnectorPlan to poll in place of a callback
+        self.scheduler = DeadlineScheduler("modbus-async")
+        self.tasks = set()
+
+    async def run(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        synced_version = None
+        next_idle_check = time.monotonic() + modbus.IDLE_CHECK_INTERVAL
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    plan = await sync_to_async(get_poll_plan)()
+                    if plan.version != synced_version:
+                        self.scheduler.sync({c.id: (c.interval, c) for c in plan.connectors})
+                        self.retain_clients({client_key(d) for c in plan.connectors for d in c.devices})
+                        synced_version = plan.version
+                except Exception as e:
+                    print(f"⚠ Error loading poll plan: {e}")
+
+                if time.monotonic() >= next_idle_check:
+                    self.close_idle_clients()
+                    next_idle_check = time.monotonic() + modbus.IDLE_CHECK_INTERVAL
+
+                for job in self.scheduler.pop_due():
+                    connector = job.callback
+                    print(f"🔄 Running connector {connector.name} every {connector.interval} seconds")
+                    task = asyncio.create_task(self.poll_connector(job))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+
+                delay = self.scheduler.time_until_next()
+                delay = POLL_TICK if delay is None else min(delay, POLL_TICK)
+                await asyncio.to_thread(self.stop_event.wait, delay)
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            for key in list(self.clients):
+                self.close_client(key)
+
+    async def poll_connector(self, job):
+        connector = job.callback
+        started = time.monotonic()
+        try:
+            results = await asyncio.gather(*(self.poll_device(device) for device in connector.devices))
+            await sync_to_async(store_connector_results)(connector, results)
+        except Exception as e:
+            print(f"⚠ Error processing connector {connector.name}: {e}")
+        finally:
+            self.scheduler.complete(job, started, time.monotonic())
+
+    async def poll_device(self, device):
+        """Return (device, samples), with samples None when the device is unreachable or backing off."""
+        health = device_health.get(device.id)
+        if not health.allow_request():
+            print(f"   ⏸ Device {device.device_name} backing off until {health.backing_off_until:%H:%M:%S}")
+            return device, None
+
+        endpoint = (device.device_ip, int(device.device_port))
+        lock = self.endpoint_locks.setdefault(endpoint, asyncio.Lock())
+        async with self.semaphore, lock:
+            client = await self.get_client(device)
+            if client is None:
+                print(f"   ❌ Device {device.device_name} connection failed")
+                health.record_failure("connection failed")
+                return device, None
+
+            samples = []
+            error = None
+            for block in device.blocks:
+                try:
+                    result = await client.read_holding_registers(
+                        address=block.start, count=block.count, device_id=device.unit_id
+                    )
+                except Exception as e:
+                    print(f"      ❌ Error reading registers {block.start}-{block.start + block.count - 1}: {e}")
+                    self.drop_client(device)
+                    error = e
+                    break
+                if result.isError():
+                    print(f"      ⚠ Error reading registers {block.start}-{block.start + block.count - 1}")
+                    continue
+                samples.extend(modbus.decode_block(block, result.registers))
+
+            if error is not None and not samples:
+                health.record_failure(error)
+                return device, None
+            health.record_success()
+            return device, samples
+
+    async def get_client(self, device):
+        key = client_key(device)
+        self.last_used[key] = time.monotonic()
+        client = self.clients.get(key)
+        if client is None:
+            # reconnect_delay=0 disables pymodbus' background reconnects, we reconnect lazily instead
+            client = AsyncModbusTcpClient(key[0], port=key[1], timeout=device.read_timeout, reconnect_delay=0)
+            self.clients[key] = client
+        if not client.connected:
+            set_client_timeout(client, device.connect_timeout)
+            try:
+                await client.connect()
+            except Exception as e:
+                print(f"   ⚠ Connect to {key[0]}:{key[1]} failed: {e}")
+            finally:
+                set_client_timeout(client, device.read_timeout)
+        return client if client.connected else None
+
+    def drop_client(self, device):
+        self.close_client(client_key(device))
+
+    def close_client(self, key):
+        client = self.clients.pop(key, None)
+        self.last_used.pop(key, None)
+        if client:
+            client.close()
+
+    def retain_clients(self, keys):
+        """Close the clients (and forget the idle endpoint locks) of devices that are no longer in the poll plan."""
+        for key in [key for key in self.clients if key not in keys]:
+            print(f"🔌 Closing Modbus connection {key[0]}:{key[1]} (unit {key[2]}), device removed")
+            self.close_client(key)
+        endpoints = {key[:2] for key in keys}
+        for endpoint in [e for e, lock in self.endpoint_locks.items() if e not in endpoints and not lock.locked()]:
+            del self.endpoint_locks[endpoint]
+
+    def close_idle_clients(self):
+        cutoff = time.monotonic() - getattr(settings, "MODBUS_IDLE_TIMEOUT", 300)
+        for key in [key for key, used in self.last_used.items() if used < cutoff]:
+            print(f"🔌 Closing idle Modbus connection {key[0]}:{key[1]} (unit {key[2]})")
+            self.close_client(key)
+
+
+def async_gateway_loop():
+    """Thread target for MODBUS_ENGINE = "asyncio"."""
+    asyncio.run(AsyncModbusEngine(modbus.modbus_thread_stop_event).run())
@@ -0,0 +1,91 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+CLOSED = "closed"        # healthy, polled every cycle
+OPEN = "open"            # failing, skipped until the backoff expires
+HALF_OPEN = "half_open"  # backoff expired, next poll is a probe
+
+
+class DeviceHealth:
+    """Circuit breaker for one Modbus device.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and the
+    device is skipped for an exponentially growing, jittered backoff. When it
+    expires one probe is allowed (half-open): success closes the breaker,
+    failure re-opens it with a longer backoff.
+    """
+
+    def __init__(self, device_id, failure_threshold=None, base_delay=None, max_delay=None, jitter=None):
+        self.device_id = device_id
+        self.failure_threshold = failure_threshold or getattr(settings, "MODBUS_BREAKER_FAILURE_THRESHOLD", 2)
+        self.base_delay = base_delay or getattr(settings, "MODBUS_BACKOFF_BASE", 5)
+        self.max_delay = max_delay or getattr(settings, "MODBUS_BACKOFF_MAX", 300)
+        self.jitter = getattr(settings, "MODBUS_BACKOFF_JITTER", 0.2) if jitter is None else jitter
+        self.state = CLOSED
+        self.failures = 0
+        self.retry_at = None
+        self.backing_off_until = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+            return self.state != OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.retry_at = self.backing_off_until = None
+            self.last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state != HALF_OPEN and self.failures < self.failure_threshold:
+                return
+            exponent = max(self.failures - self.failure_threshold, 0)
+            delay = min(self.base_delay * (2 ** exponent), self.max_delay)
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            self.state = OPEN
+            self.retry_at = time.monotonic() + delay
+            self.backing_off_until = timezone.now() + timedelta(seconds=delay)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "backing_off_until": self.backing_off_until.isoformat() if self.state == OPEN else None,
+                "last_error": self.last_error,
+            }
+
+
+class DeviceHealthRegistry:
+    def __init__(self):
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def get(self, device_id):
+        with self._lock:
+            health = self._devices.get(device_id)
+            if health is None:
+                health = self._devices[device_id] = DeviceHealth(device_id)
+            return health
+
+    def snapshot(self, device_ids=None):
+        with self._lock:
+            devices = dict(self._devices)
+        if device_ids is not None:
+            devices = {device_id: devices[device_id] for device_id in device_ids if device_id in devices}
+        return {device_id: health.snapshot() for device_id, health in devices.items()}
+
+
+device_health = DeviceHealthRegistry()
@@ -0,0 +1,99 @@
+from collections import namedtuple
+from django.conf import settings
+
+# Registers occupied by each fixed-width data_type.
+# FIXED / UFIXED / FLOAT32 (telegraf-style scaled integers) take their width
+# from the number of registers listed in the timeseries address instead.
+REGISTER_WIDTHS = {
+    "UINT16": 1,
+    "INT16": 1,
+    "UINT32": 2,
+    "INT32": 2,
+    "FLOAT32-IEEE": 2,
+    "UINT64": 4,
+    "INT64": 4,
+    "FLOAT64-IEEE": 4,
+    "DOUBLE": 4,
+}
+
+# Modbus allows at most 125 holding registers per read request
+MODBUS_MAX_REGISTERS = 125
+
+ReadBlock = namedtuple("ReadBlock", ["start", "count", "tags"])
+BlockTag = namedtuple("BlockTag", ["timeseries", "offset", "width"])
+
+
+def parse_address(address):
+    """Return (first register, register count) for addresses like '40' or '40,41'."""
+    registers = [int(part) for part in str(address).replace(";", ",").split(",") if part.strip()]
+    if not registers:
+        raise ValueError(f"empty register address {address!r}")
+    start = min(registers)
+    return start, max(registers) - start + 1
+
+
+def register_width(timeseries):
+    """Number of registers a timeseries occupies, honouring its data_type."""
+    _, listed = parse_address(timeseries.address)
+    return max(REGISTER_WIDTHS.get((timeseries.data_type or "").upper(), 1), listed)
+
+
+def get_block_limits(connector):
+    """Block size / gap tolerance for a connector, overridable via its configuration JSON."""
+    configuration = connector.configuration if isinstance(connector.configuration, dict) else {}
+    max_block_size = configuration.get(
+        "max_block_size", getattr(settings, "MODBUS_MAX_BLOCK_SIZE", MODBUS_MAX_REGISTERS)
+    )
+    max_gap = configuration.get("max_gap", getattr(settings, "MODBUS_MAX_GAP", 0))
+    try:
+        max_block_size = min(max(int(max_block_size), 1), MODBUS_MAX_REGISTERS)
+        max_gap = max(int(max_gap), 0)
+    except (TypeError, ValueError):
+        max_block_size, max_gap = MODBUS_MAX_REGISTERS, 0
+    return max_block_size, max_gap
+
+
+def build_read_plan(timeseries_list, max_block_size=MODBUS_MAX_REGISTERS, max_gap=0):
+    """Group timeseries into the fewest contiguous block reads.
+
+    Tags are merged into the current block while the hole before them is at
+    most ``max_gap`` registers and the block stays within ``max_block_size``.
+    Overlapping tags share registers.
+    """
+    spans = []
+    for ts in timeseries_list:
+        try:
+            start, _ = parse_address(ts.address)
+            width = register_width(ts)
+        except (TypeError, ValueError):
+            print(f"      ⚠ Skipping TS {ts.name}: invalid address {ts.address!r}")
+            continue
+        spans.append((start, width, ts))
+    spans.sort(key=lambda span: span[0])
+
+    blocks = []
+    block_start = block_end = None
+    members = []
+    for start, width, ts in spans:
+        end = start + width
+        if members and start - block_end <= max_gap and max(end, block_end) - block_start <= max_block_size:
+            block_end = max(block_end, end)
+        else:
+            if members:
+                blocks.append(_make_block(block_start, block_end, members))
+            block_start, block_end, members = start, end, []
+        members.append((start, width, ts))
+    if members:
+        blocks.append(_make_block(block_start, block_end, members))
+    return blocks
+
+
+def _make_block(block_start, block_end, members):
+    tags = tuple(BlockTag(ts, start - block_start, width) for start, width, ts in members)
+    return ReadBlock(block_start, block_end - block_start, tags)
+
+
+def split_block(block, registers):
+    """Yield (timeseries, registers) for every tag in a block read result."""
+    for tag in block.tags:
+        yield tag.timeseries, registers[tag.offset:tag.offset + tag.width]
@@ -0,0 +1,110 @@
+import threading
+import time
+from pymodbus.client import ModbusTcpClient
+from django.conf import settings
+
+
+DEFAULT_TIMEOUT = 3
+
+
+def set_client_timeout(client, seconds):
+    """pymodbus uses comm_params.timeout_connect both for connecting and for requests."""
+    params = [getattr(client, "comm_params", None), getattr(getattr(client, "ctx", None), "comm_params", None)]
+    for comm_params in params:
+        if comm_params is not None:
+            comm_params.timeout_connect = seconds
+
+
+class PooledConnection:
+    """One long-lived Modbus TCP socket for a (ip, port, unit) endpoint."""
+
+    def __init__(self, ip, port, unit, connect_timeout=DEFAULT_TIMEOUT, read_timeout=DEFAULT_TIMEOUT):
+        self.ip = ip
+        self.port = port
+        self.unit = unit
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.client = ModbusTcpClient(ip, port=port, timeout=read_timeout)
+        self.last_used = time.monotonic()
+
+    def ensure_connected(self):
+        """Reconnect lazily if the socket was closed by us, the peer or an error."""
+        if self.client.is_socket_open():
+            return True
+        set_client_timeout(self.client, self.connect_timeout)
+        try:
+            connected = bool(self.client.connect())
+        finally:
+            set_client_timeout(self.client, self.read_timeout)
+        if connected and self.client.socket:
+            self.client.socket.settimeout(self.read_timeout)
+        return connected
+
+    def read_holding_registers(self, address, count):
+        self.last_used = time.monotonic()
+        return self.client.read_holding_registers(address=address, count=count, device_id=self.unit)
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception as e:
+            print(f"⚠ Error closing Modbus connection {self.ip}:{self.port}: {e}")
+
+
+class ModbusConnectionPool:
+    """Keeps one socket per (ip, port, unit) and reuses it across poll cycles."""
+
+    def __init__(self, idle_timeout=None):
+        self.idle_timeout = idle_timeout
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get_idle_timeout(self):
+        if self.idle_timeout is not None:
+            return self.idle_timeout
+        return getattr(settings, "MODBUS_IDLE_TIMEOUT", 300)
+
+    def acquire(self, ip, port, unit=1, connect_timeout=DEFAULT_TIMEOUT, read_timeout=DEFAULT_TIMEOUT):
+        """Return a connected PooledConnection, or None if the device is unreachable."""
+        key = (ip, int(port), int(unit))
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is None:
+                conn = PooledConnection(*key, connect_timeout=connect_timeout, read_timeout=read_timeout)
+                self._connections[key] = conn
+        conn.connect_timeout = connect_timeout
+        if conn.read_timeout != read_timeout:
+            conn.read_timeout = read_timeout
+            set_client_timeout(conn.client, read_timeout)
+        conn.last_used = time.monotonic()
+        if conn.ensure_connected():
+            return conn
+        conn.close()
+        return None
+
+    def discard(self, conn):
+        """Drop a connection after an I/O error so the next cycle opens a fresh socket."""
+        with self._lock:
+            if self._connections.get((conn.ip, conn.port, conn.unit)) is conn:
+                del self._connections[(conn.ip, conn.port, conn.unit)]
+        conn.close()
+
+    def close_idle(self):
+        """Close connections that have not been used within the idle timeout."""
+        cutoff = time.monotonic() - self.get_idle_timeout()
+        with self._lock:
+            idle = [key for key, conn in self._connections.items() if conn.last_used < cutoff]
+            stale = [self._connections.pop(key) for key in idle]
+        for conn in stale:
+            print(f"🔌 Closing idle Modbus connection {conn.ip}:{conn.port} (unit {conn.unit})")
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            stale = list(self._connections.values())
+            self._connections.clear()
+        for conn in stale:
+            conn.close()
+
+
+connection_pool = ModbusConnectionPool()
@@ -96,12 +96,21 @@ class IHG_OutboundConnector(IHG_ConnectorBase):
         verbose_name = "Outbound Connector"
         verbose_name_plural = "Outbound Connectors"
 
+DEADBAND_MODE_CHOICES = (
+    ('absolute', 'Absolute'),
+    ('percent', 'Percent'),
+)
+
+
 class Device(models.Model):
     connector = models.ForeignKey(IHG_InboundConnector, related_name="devices", on_delete=models.CASCADE)
     device_name = models.CharField(max_length=100)
     device_id = models.CharField(max_length=100)
     device_ip = models.GenericIPAddressField(protocol='both', unpack_ipv4=True,default='127.0.0.1')
     device_port = models.PositiveIntegerField(default=0000)
+    unit_id = models.PositiveSmallIntegerField(default=1)  # Modbus unit / slave id
+    connect_timeout = models.FloatField(default=3.0)  # seconds
+    read_timeout = models.FloatField(default=3.0)  # seconds
     device_status = models.CharField(max_length=10, default='inactive')
 
 
@@ -138,6 +147,11 @@ class IHG_Timeseries(models.Model):
             ('DOUBLE', 'DOUBLE'),
         ]
     )
+    # Report-by-exception: a sample is only stored/forwarded when it moved by more
+    # than the deadband since the last reported value, or after heartbeat seconds.
+    deadband = models.FloatField(null=True, blank=True)
+    deadband_mode = models.CharField(max_length=10, choices=DEADBAND_MODE_CHOICES, default='absolute')
+    heartbeat = models.FloatField(null=True, blank=True)  # seconds
 
 class IHG_MQTTConfiguration(models.Model):
     connector_inbound = models.OneToOneField(
@@ -162,7 +176,7 @@ class IHG_MQTTConfiguration(models.Model):
     
 class IHG_ModbusData(models.Model):
     timeseries = models.ForeignKey("IHG_Timeseries", on_delete=models.CASCADE, related_name="modbus_data")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # poll time, set by the poller
     value = models.FloatField()
 
     class Meta:
@@ -171,20 +185,6 @@ class IHG_ModbusData(models.Model):
     def __str__(self):
         return f"{self.timeseries.name} - {self.value} at {self.timestamp}"
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        # --- Enforce maximum_data_points ---
-        connector = self.timeseries.device.connector  # 🔗 goes back to IHG_InboundConnector
-       
-        max_points = int(connector.maximum_data_points)
-        if max_points:
-            qs = IHG_ModbusData.objects.filter(timeseries__device__connector=connector).order_by("-timestamp")
-            if qs.count() > max_points:
-                # delete oldest extra records
-                ids_to_delete = qs[max_points:].values_list("id", flat=True)
-                IHG_ModbusData.objects.filter(id__in=ids_to_delete).delete()
-
 class IHG_MQTTTopic(models.Model):
     mqtt_config = models.ForeignKey(
         IHG_MQTTConfiguration, related_name="topics",
@@ -215,6 +215,11 @@ class IHG_MQTTTimeseries(models.Model):
     type = models.CharField(max_length=20, choices=[
         ('String', 'String'), ('Integer', 'Integer'), ('Double', 'Double'), ('Boolean', 'Boolean')
     ])
+    # Report-by-exception: a sample is only stored/forwarded when it moved by more
+    # than the deadband since the last reported value, or after heartbeat seconds.
+    deadband = models.FloatField(null=True, blank=True)
+    deadband_mode = models.CharField(max_length=10, choices=DEADBAND_MODE_CHOICES, default='absolute')
+    heartbeat = models.FloatField(null=True, blank=True)  # seconds
 
 class IHG_MQTTData(models.Model):
     device = models.ForeignKey(
@@ -231,18 +236,3 @@ class IHG_MQTTData(models.Model):
 
     def __str__(self):
         return f"{self.device.device_name} | {self.key}={self.value} @ {self.timestamp}"
-
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # If you want to enforce max data points, you must get it from device->connector
-        if self.device and self.device.topic and self.device.topic.mqtt_config:
-            connector = getattr(self.device.topic.mqtt_config, 'connector_inbound', None)
-        
-        if connector:
-            max_points = int(getattr(connector, "maximum_data_points", 0) or 0)
-        if max_points:
-            qs = IHG_MQTTData.objects.filter(device=self.device).order_by("-timestamp")
-            count = qs.count()
-            if count > max_points:
-                ids_to_delete = qs[max_points:].values_list("id", flat=True)
-                IHG_MQTTData.objects.filter(id__in=ids_to_delete).delete()
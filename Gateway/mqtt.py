@@ -1,262 +1,250 @@
 import time
-import json
 import paho.mqtt.client as mqtt
-from Gateway.models import IHG_MQTTConfiguration ,IHG_OutboundConnector,IHG_InboundConnector,IHG_MQTTData,IHG_MQTTDevice
-from Gateway.rest_connector import send_data_to_api
+from Gateway.models import IHG_MQTTConfiguration ,IHG_OutboundConnector,IHG_InboundConnector,IHG_MQTTData
 from datetime import datetime
 import threading
-import paho.mqtt.publish as publish
+import functools
+from collections import namedtuple
+from django.conf import settings
+from Gateway import config_cache
+from Gateway.deadband import deadband_filter
+from Gateway.http_client import http_clients
+from Gateway.scheduler import DeadlineScheduler
+from Gateway.mqtt_publisher import make_client_id, publisher_manager
+from Gateway.mqtt_reconciler import ClientReconciler, ClientSpec, client_userdata, subscription_filter
+from Gateway.mqtt_routing import get_routing_index, resolve_devices
+from Gateway.outbound import outbound_manager
+from Gateway.poll_plan import build_outbound_plan, get_connector_interval
+from Gateway.router import outbound_router
+from Gateway.sample_writer import get_sample_writer
+from Gateway.status import set_connector_status
+from Gateway.worker_pool import WorkerPool
 
 mqtt_thread = None
 mqtt_thread_stop_event = threading.Event()
-clients_lock = threading.Lock()
-mqtt_clients = []
 inbound_data_cache = {}
 cache_lock = threading.Lock()
-def mqtt_topic_match(subscription, topic):
-    sub_parts = subscription.strip('/').split('/')
-    topic_parts = topic.strip('/').split('/')
+ingest_pool = None
+ingest_pool_lock = threading.Lock()
 
-    if len(sub_parts) != len(topic_parts):
-        return False
+# Raw inbound message as received on paho's network thread
+IngestMessage = namedtuple("IngestMessage", ["connector_id", "topic", "payload", "received_at"])
 
-    for sub_part, topic_part in zip(sub_parts, topic_parts):
-        if sub_part == '+':
-            continue
-        if sub_part != topic_part:
-            return False
-    return True
-
-# Load allowed devices and timeseries per inbound connector and topic for filtering
-def load_allowed_timeseries(inbound_connector,msg_topic):
-    print("msg_topic",msg_topic)
-    allowed = {}
-    for topic in inbound_connector.mqtt_config.topics.all():
-        if mqtt_topic_match(topic.name, msg_topic):
-            for device in topic.devices.all():
-                allowed_device_key_set = set(ts.key for ts in device.timeseries.all())
-                allowed[device.device_name] = allowed_device_key_set
-            break
-    return allowed
 
 def on_message(client, userdata, msg):
-    payload_str  = msg.payload.decode()
-    print("Raw payload:", payload_str , type(payload_str ))
-    connector_type = userdata.get("type")
-    connector_id = userdata.get("connector_id")
+    """Runs on paho's network thread: only hand the raw message to the ingest workers."""
+    if userdata.get("type") != "inbound":
+        return
+    message = IngestMessage(userdata.get("connector_id"), msg.topic, msg.payload, time.time())
+    if not get_ingest_pool().submit(message, partition=msg.topic):
+        print(f"⚠ MQTT ingest queue full, dropped message on {msg.topic}")
+
+
+def process_inbound_message(message):
+    """Decode, route, filter and store one inbound MQTT message (ingest worker thread)."""
+    connector_id = message.connector_id
+    routes = get_routing_index(connector_id)
+    if routes is None:
+        print(f"⚠ Inbound connector {connector_id} not found")
+        return
+    set_connector_status("inbound", connector_id, "active")
 
     try:
-        payload = json.loads(payload_str)
-    except json.JSONDecodeError:
+        payload = routes.codec.decode(message.payload)
+    except ValueError as e:
+        payload = None
+        print(f"❌ Failed to decode {routes.codec.name} payload on {message.topic}: {e}")
+    if not isinstance(payload, dict):
         payload = {}
-        print(f"❌ Failed to decode JSON payload: {payload_str}")
-
-    if connector_type == "inbound":
-        inbound_connector = IHG_InboundConnector.objects.get(id=connector_id)
-        gateway = inbound_connector.gateway  # assumes inbound connector has FK gateway
-        outbound_connectors = IHG_OutboundConnector.objects.filter(gateway=gateway)
-        print(f"➡ Forwarding data to {len(outbound_connectors)} outbound connectors")
-        
-        device_name = payload.get("node")
-        ts = payload.get("timestamp")
-        inbound_connector.status = "active"
-        inbound_connector.save(update_fields=["status"])
-        if ts is not None:
-            timestamp = datetime.fromtimestamp(ts / 1000)  # convert ms → seconds
-        else:
-            timestamp = datetime.now()  # fallback to current time if timestamp is missing
-
-        values = payload.get("values", {})
-        mqtt_config = userdata.get("mqtt_config")  # pass this when connecting
-        allowed_keys_map = load_allowed_timeseries(inbound_connector,msg.topic)
-        print("allowed_keys_map",allowed_keys_map)
-        if device_name not in allowed_keys_map:
-            print(f"⚠ Device '{device_name}' not recognized for inbound connector '{inbound_connector.name}',allowed_keys_map'{allowed_keys_map}'")
-        else:
-            device_objs = IHG_MQTTDevice.objects.filter(device_name=device_name)
-            if not device_objs.exists():
-                print(f"⚠ Device '{device_name}' not found")
-                device_obj = None
-            else:
-                device_obj = device_objs.first()
-
-            allowed_keys = allowed_keys_map[device_name]
-
-            with cache_lock:
-                print("inbound_data_cache",inbound_data_cache)
-
-                if connector_id not in inbound_data_cache:
-                    inbound_data_cache[connector_id] = {}
-                
-                device_cache = inbound_data_cache[connector_id].get(device_name)
-                if device_cache is None:
-                    inbound_data_cache[connector_id][device_name] = {}
-                    device_cache = inbound_data_cache[connector_id][device_name]
-                    print(f'Created new cache for device {device_name}')
-                else:
-                    print(f'Using existing cache for device {device_name}')
-
-                # Filter and update only defined keys
-                for k, v in values.items():
-                    if k in allowed_keys:
-                        device_cache[k] = v
-                        IHG_MQTTData.objects.create(
-                        device=device_obj,
-                        key=k,
-                        value=v,
-                        timestamp=timestamp,
-                    )
-                print("device_cache",device_cache)
-        
-        
-def forward_outbound_data(outbound_connector):
-    print(f"🔄 Preparing data for outbound connector: {outbound_connector.name}")
-    inbound_connector = IHG_InboundConnector.objects.get(gateway=outbound_connector.gateway)  # Simplify for demo
-    connector_id = inbound_connector.id
+
+    device_name = payload.get("node")
+    ts = payload.get("timestamp")
+    if ts is not None:
+        timestamp = datetime.fromtimestamp(ts / 1000)  # convert ms → seconds
+    else:
+        timestamp = datetime.fromtimestamp(message.received_at)  # fallback to receive time if timestamp is missing
+
+    values = payload.get("values", {})
+    devices = resolve_devices(routes, message.topic)
+    route = devices.get(device_name)
+    if route is None:
+        print(f"⚠ Device '{device_name}' not recognized for inbound connector '{routes.name}' on topic '{message.topic}'")
+        return
+    allowed_keys = route.keys
+
+    with cache_lock:
+        device_cache = inbound_data_cache.setdefault(connector_id, {}).setdefault(device_name, {})
+
+        # Filter and update only defined keys
+        writer = get_sample_writer()
+        for k, v in values.items():
+            key_plan = allowed_keys.get(k)
+            if key_plan is None:
+                continue
+            if not deadband_filter.should_report(
+                ("mqtt", connector_id, device_name, k), v, key_plan.deadband, key_plan.deadband_mode, key_plan.heartbeat
+            ):
+                continue
+            device_cache[k] = v
+            writer.submit(IHG_MQTTData(device_id=route.device_id, key=k, value=v, timestamp=timestamp))
+
+
+def get_ingest_pool():
+    global ingest_pool
+    with ingest_pool_lock:
+        if ingest_pool is None:
+            ingest_pool = WorkerPool(
+                "mqtt-ingest",
+                process_inbound_message,
+                workers=getattr(settings, "MQTT_INGEST_WORKERS", 2),
+                queue_size=getattr(settings, "MQTT_INGEST_QUEUE_SIZE", 10000),
+                overflow=getattr(settings, "MQTT_INGEST_OVERFLOW", "drop_oldest"),
+                block_timeout=getattr(settings, "MQTT_INGEST_BLOCK_TIMEOUT", 5),
+            )
+        return ingest_pool
+
+
+def forward_outbound_data(outbound, inbound_connector_id):
+    """Hand the inbound cache snapshot to an outbound connector (an OutboundPlan)."""
+    print(f"🔄 Preparing data for outbound connector: {outbound.name}")
 
     with cache_lock:
-        data_to_send = inbound_data_cache.get(connector_id, {})
+        data_to_send = inbound_data_cache.get(inbound_connector_id, {})
+        if not data_to_send:
+            return
         # Prepare structured payload
         payload = {
             'timestamp': int(time.time() * 1000),
             'data': data_to_send
         }
-        # Clear cache after read
-        inbound_data_cache[connector_id] = {}
-
-    # Send based on outbound type
-    if outbound_connector.connector_type == 'rest':
-        print("payload",payload)
-        if mqtt_clients !=[]:
-            send_data_to_api(outbound_connector.rest_url, payload, outbound_connector.id)
-
-    elif outbound_connector.connector_type == 'mqtt':
-        config = outbound_connector.mqtt_config
-      
-        topics = config.topics.all()
-        
-    
-        auth = {
-    "username": config.username if config.username is not None else "",
-    "password": config.password if config.password is not None else ""
-}
-
-        # for topic in topics:
-            
-        #     publish.single(
-        #     topic=topic.name,
-        #     payload=json.dumps(payload),
-        #     hostname=config.broker_ip,
-        #     port=config.port
-        # )
-        client = mqtt.Client()
-        if config.username:
-            client.username_pw_set(config.username, config.password or "")
-
-        client.connect(config.broker_ip, config.port, keepalive=60)
-
-        for topic in topics:          
-            print("topic",topic.name)
-            client.publish(
-                topic=topic.name,
-                payload=json.dumps(payload),
-                qos=0, retain=False
-            )      
-
-
-def on_connect(client, userdata, flags, rc):
+        # The router persists it in the connector's outbox, which delivers it once the target is reachable
+        outbound_router.route(outbound, payload)
+        inbound_data_cache[inbound_connector_id] = {}
+
+
+def get_outbound_jobs():
+    """Forwarding jobs for outbound connectors of gateways with an MQTT inbound connector."""
+    jobs = {}
+    outbound_qs = IHG_OutboundConnector.objects.select_related("gateway", "mqtt_config").prefetch_related("mqtt_config__topics")
+    for connector in outbound_qs:
+        in_connector = IHG_InboundConnector.objects.filter(gateway=connector.gateway, connector_type="mqtt").first()
+        if not in_connector:
+            continue
+        jobs[connector.id] = (
+            get_connector_interval(in_connector),
+            functools.partial(forward_outbound_data, build_outbound_plan(connector), in_connector.id),
+        )
+    return jobs
+
+
+def get_subscription_options(connector):
+    """(shared group, MQTT protocol) of an MQTT connector; an empty group subscribes normally."""
+    configuration = connector.configuration if isinstance(connector.configuration, dict) else {}
+    group = str(configuration.get("shared_group", getattr(settings, "MQTT_SHARED_GROUP", "")) or "")
+    if any(char in group for char in "/+#"):
+        print(f"⚠ Invalid shared subscription group {group!r} for connector {connector.name}, subscribing unshared")
+        group = ""
+    version = str(configuration.get("mqtt_protocol", getattr(settings, "MQTT_PROTOCOL", "3.1.1")))
+    protocol = mqtt.MQTTv5 if version == "5" else mqtt.MQTTv311
+    return group, protocol
+
+
+def on_connect(client, userdata, flags, reason_code, properties):
     connector_id = userdata.get("connector_id")
     type = userdata.get("type")
-    connector = None
-    try:
-        print("connector_type",type)
-        if type == "inbound":
-           
-            connector = IHG_InboundConnector.objects.get(id=connector_id)
-        else:
-            
-            connector = IHG_OutboundConnector.objects.get(id=connector_id)
-    except Exception as e:
-        print(f"⚠ Connector {connector_id} not found: {e}")
-        return
-    if rc == 0:
+    if not reason_code.is_failure:
         print("✅ MQTT Connected successfully")
-        connector.status = "active"
-        connector.save(update_fields=["status"])
+        set_connector_status(type, connector_id, "active")
         # Subscribe to assigned topics after connection
         print("userdata",userdata.get("topics", []))
         for topic in userdata.get("topics", []):
             if topic and isinstance(topic, str) and topic.strip():
                 try:
-                    client.subscribe(topic.strip())
-                    print(f"📡 Subscribed to topic: {topic.strip()}")
+                    topic_filter = subscription_filter(topic.strip(), userdata.get("shared_group"))
+                    client.subscribe(topic_filter)
+                    print(f"📡 Subscribed to topic: {topic_filter}")
                 except Exception as e:
                     print(f"⚠ Failed to subscribe to topic '{topic}': {e}")
             else:
                 print(f"⚠ Skipping invalid/empty topic: {topic}")
 
     else:
-        print(f"❌ MQTT Connection failed. Code: {rc}")
-        connector.status = "inactive"
-        connector.save(update_fields=["status"])
+        print(f"❌ MQTT Connection failed. Code: {reason_code}")
+        set_connector_status(type, connector_id, "inactive")
+
+
+def build_client_specs():
+    """Desired inbound MQTT clients, {configuration id: ClientSpec}."""
+    specs = {}
+    configs = (
+        IHG_MQTTConfiguration.objects.filter(connector_inbound__isnull=False)
+        .select_related("connector_inbound")
+        .prefetch_related("topics")
+    )
+    for config in configs:
+        connector = config.connector_inbound
+        topics = tuple(sorted({topic.name.strip() for topic in config.topics.all() if topic.name and topic.name.strip()}))
+        shared_group, protocol = get_subscription_options(connector)
+        specs[config.id] = ClientSpec(
+            config.id, connector.id, "inbound", config.broker_ip, int(config.port),
+            config.username or "", config.password or "", topics, shared_group, protocol,
+        )
+    return specs
+
+
+def connect_client(spec):
+    client = mqtt.Client(
+        mqtt.CallbackAPIVersion.VERSION2,
+        client_id=make_client_id("gateway", spec.connector_id),
+        protocol=spec.protocol,
+        userdata=client_userdata(spec),
+    )
+    if spec.username:
+        client.username_pw_set(spec.username, spec.password)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.reconnect_delay_set(1, getattr(settings, "MQTT_RECONNECT_MAX_DELAY", 60))
+    print(f"🔌 Connecting to MQTT broker {spec.broker_ip}:{spec.port} (topics {', '.join(spec.topics)})")
+    client.connect_async(spec.broker_ip, spec.port, keepalive=60)
+    client.loop_start()
+    return client
+
+
+def disconnect_client(client):
+    client.disconnect()
+    client.loop_stop()
+
+
+client_reconciler = ClientReconciler(connect_client, disconnect_client)
 
 
 def mqtt_loop():
-    global mqtt_clients
-    mqtt_clients = []
-    """Loop over all MQTT configurations and keep them connected."""
-    configs = IHG_MQTTConfiguration.objects.all()
-
-    
-    with clients_lock:
-        for config in configs:
-            try:
-                connector = None
-                type = None
-                if config.connector_inbound_id:
-                    connector = config.connector_inbound
-                    type = 'inbound'
-                    
-                elif config.connector_outbound_id:
-                    connector = config.connector_outbound
-                    type = 'outbound'
-
-                if not connector:
-                    print(f"⚠ MQTT config {config.id} has no linked connector")
-                    continue
-                topics = list(config.topics.values_list('name', flat=True))
-                print(f"Topics for connector {connector.name}: {topics}")
-                client = mqtt.Client(client_id=f"gateway_{connector.id}", userdata={"topics": topics,"connector_id": connector.id,"type":type,"mqtt_config" : connector.mqtt_config})
-                print("userdata",{"topics": topics,"connector_id": connector.id})
-                mqtt_clients.append(client)
-                client.username_pw_set(config.username or "", config.password or "")
-                client.on_connect = on_connect
-                print("client_______",client)
-                client.on_message = on_message
-                
-
-                print(f"🔌 Connecting to MQTT broker {config.broker_ip}:{config.port}")
-                client.connect(config.broker_ip, config.port, keepalive=60)
-
-                client.loop_start()
-            except Exception as e:
-                print(f"⚠ Failed to set up MQTT for {config}: {e}")
-
-    
+    """Keep inbound MQTT clients in line with the configuration and forward to outbound connectors."""
+    # Forward the inbound cache to outbound connectors on their intervals
+    scheduler = DeadlineScheduler("mqtt-outbound")
+    synced_version = None
+
+    def refresh():
+        nonlocal synced_version
+        if config_cache.version() != synced_version:
+            synced_version = config_cache.version()
+            # Only clients whose broker, credentials or topics changed are touched
+            client_reconciler.reconcile(build_client_specs())
+            scheduler.sync(get_outbound_jobs())
+            # Close publishers and outboxes of deleted outbound connectors
+            publisher_manager.retain(set(
+                IHG_MQTTConfiguration.objects.filter(connector_outbound__isnull=False).values_list("id", flat=True)
+            ))
+            outbound_ids = set(IHG_OutboundConnector.objects.values_list("id", flat=True))
+            outbound_router.retain(outbound_ids)
+            outbound_manager.retain(outbound_ids)
+            http_clients.retain(outbound_ids)
+
     try:
-        while not mqtt_thread_stop_event.is_set():
-            time.sleep(1)
+        scheduler.run(mqtt_thread_stop_event, refresh=refresh)
     finally:
         # On stop event, stop all clients cleanly
-        with clients_lock:
-            for client in mqtt_clients:
-                try:
-                    client.loop_stop()  # Stop network loop
-                    client.disconnect() # Disconnect from broker
-                except Exception as e:
-                    print(f"⚠ Error stopping mqtt client: {e}")
-            mqtt_clients.clear()
-
+        client_reconciler.close_all()
 
 
 def start_mqtt_loop():
@@ -276,24 +264,3 @@ def stop_mqtt_loop():
         print("MQTT loop stopped")
     mqtt_thread = None
 
-
-def run_outbound_connector_loop(connector):
-    gateway_id = connector.gateway.id
-    in_connector = IHG_InboundConnector.objects.get(gateway=gateway_id)
-    print("in_connector",in_connector.interval)
-    interval = int(in_connector.interval)
-    while True:
-        forward_outbound_data(connector)
-        time.sleep(interval)
-
-def start_outbound_loops():
-    connectors = list(IHG_OutboundConnector.objects.all())
-    if connectors:
-        for connector in connectors:
-            thread = threading.Thread(target=run_outbound_connector_loop, args=(connector,), daemon=True)
-            thread.start()
-
-# Call this once to start all loops
-start_outbound_loops()
-
-
@@ -0,0 +1,145 @@
+import os
+import threading
+import uuid
+import paho.mqtt.client as mqtt
+from django.conf import settings
+
+# Client ids must be unique per connection on a broker; several gateway
+# processes (or containers, which all run as pid 1) connect with the same
+# configurations, so every id carries a per-process tag.
+PROCESS_TAG = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def make_client_id(prefix, config_id):
+    return f"{prefix}-{config_id}-{PROCESS_TAG}"
+
+
+class MQTTPublisher:
+    """One persistent, auto-reconnecting client for an outbound MQTT configuration.
+
+    The client runs its own network loop (loop_start), so QoS 1/2 handshakes
+    complete and paho reconnects in the background with a growing delay.
+    At most ``max_inflight`` QoS>0 messages are unacknowledged at a time.
+    """
+
+    def __init__(self, config, max_inflight=None):
+        self.config_id = config.id
+        self.params = connection_params(config)
+        self.connected = False
+        self.connected_event = threading.Event()
+        self.sessions = 0  # successful connects, a new session invalidates alias births
+        self.published = 0
+        self.failed = 0
+        self.last_error = None
+        self.client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            client_id=make_client_id("gateway-pub", config.id),
+        )
+        broker_ip, port, username, password = self.params
+        if username:
+            self.client.username_pw_set(username, password or "")
+        self.client.max_inflight_messages_set(max_inflight or getattr(settings, "MQTT_PUBLISH_MAX_INFLIGHT", 20))
+        self.client.reconnect_delay_set(1, getattr(settings, "MQTT_RECONNECT_MAX_DELAY", 60))
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.connect_async(broker_ip, port, keepalive=60)
+        self.client.loop_start()
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        self.connected = not reason_code.is_failure
+        if self.connected:
+            self.sessions += 1
+            self.connected_event.set()
+            print(f"✅ MQTT publisher connected to {self.params[0]}:{self.params[1]}")
+        else:
+            self.last_error = str(reason_code)
+            print(f"❌ MQTT publisher connection to {self.params[0]}:{self.params[1]} failed: {reason_code}")
+
+    def on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self.connected = False
+        self.connected_event.clear()
+        if reason_code.is_failure:
+            self.last_error = str(reason_code)
+            print(f"⚠ MQTT publisher disconnected from {self.params[0]}:{self.params[1]}: {reason_code}")
+
+    def wait_connected(self, timeout=None):
+        timeout = timeout or getattr(settings, "MQTT_PUBLISH_TIMEOUT", 10)
+        if not self.connected_event.wait(timeout):
+            raise ConnectionError(f"not connected to {self.params[0]}:{self.params[1]} ({self.last_error})")
+
+    def publish_and_wait(self, topic, payload, qos=0, retain=False, timeout=None):
+        """Publish and block until the broker acknowledged the message (QoS 0: until it was written).
+
+        Raises instead of queueing when the broker is unreachable, so callers
+        with their own durable queue keep the message.
+        """
+        timeout = timeout or getattr(settings, "MQTT_PUBLISH_TIMEOUT", 10)
+        self.wait_connected(timeout)
+        info = self.client.publish(topic, payload, qos=qos, retain=retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.failed += 1
+            raise ConnectionError(mqtt.error_string(info.rc))
+        info.wait_for_publish(timeout)
+        if not info.is_published():
+            self.failed += 1
+            raise TimeoutError(f"publish to {topic} not acknowledged within {timeout}s")
+        self.published += 1
+
+    def close(self):
+        try:
+            self.client.disconnect()
+            self.client.loop_stop()
+        except Exception as e:
+            print(f"⚠ Error closing MQTT publisher {self.params[0]}:{self.params[1]}: {e}")
+
+    def stats(self):
+        return {
+            "broker": f"{self.params[0]}:{self.params[1]}",
+            "connected": self.connected,
+            "published": self.published,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+
+def connection_params(config):
+    return (config.broker_ip, int(config.port), config.username or "", config.password or "")
+
+
+class PublisherManager:
+    """Shared MQTTPublisher per outbound MQTT configuration id."""
+
+    def __init__(self):
+        self._publishers = {}
+        self._lock = threading.Lock()
+
+    def get(self, config):
+        """Return the publisher for an IHG_MQTTConfiguration / MQTTTargetPlan, replacing it if its broker changed."""
+        stale = None
+        with self._lock:
+            publisher = self._publishers.get(config.id)
+            if publisher is not None and publisher.params != connection_params(config):
+                stale, publisher = publisher, None
+            if publisher is None:
+                publisher = self._publishers[config.id] = MQTTPublisher(config)
+        if stale:
+            stale.close()
+        return publisher
+
+    def retain(self, config_ids):
+        """Close publishers of configurations that no longer exist."""
+        with self._lock:
+            stale = [self._publishers.pop(config_id) for config_id in list(self._publishers) if config_id not in config_ids]
+        for publisher in stale:
+            publisher.close()
+
+    def close_all(self):
+        self.retain(())
+
+    def stats(self):
+        with self._lock:
+            publishers = dict(self._publishers)
+        return {config_id: publisher.stats() for config_id, publisher in publishers.items()}
+
+
+publisher_manager = PublisherManager()
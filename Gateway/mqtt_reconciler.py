@@ -0,0 +1,104 @@
+import threading
+from collections import namedtuple
+
+# Desired state of one inbound MQTT client, built from an IHG_MQTTConfiguration
+ClientSpec = namedtuple(
+    "ClientSpec",
+    ["config_id", "connector_id", "connector_type", "broker_ip", "port", "username", "password", "topics", "shared_group", "protocol"],
+)
+RunningClient = namedtuple("RunningClient", ["spec", "client"])
+
+
+def connection_params(spec):
+    """Everything that needs a new connection when it changes; topics can change on a live client."""
+    return (spec.broker_ip, spec.port, spec.username, spec.password, spec.shared_group, spec.protocol)
+
+
+def subscription_filter(topic, group=""):
+    """Topic filter to subscribe with, "$share/<group>/<topic>" for a shared subscription."""
+    return f"$share/{group}/{topic}" if group else topic
+
+
+def client_userdata(spec):
+    return {
+        "topics": list(spec.topics),
+        "connector_id": spec.connector_id,
+        "type": spec.connector_type,
+        "shared_group": spec.shared_group,
+    }
+
+
+class ClientReconciler:
+    """Keeps one running MQTT client per desired ClientSpec.
+
+    ``reconcile`` diffs the desired specs against the running clients and
+    only touches what changed: new configurations are connected, removed
+    ones disconnected, a changed broker or credentials reconnect that one
+    client, and changed topics are (un)subscribed on the live connection.
+    ``connect(spec)`` creates and starts a client, ``disconnect(client)``
+    stops it.
+    """
+
+    def __init__(self, connect, disconnect):
+        self.connect = connect
+        self.disconnect = disconnect
+        self.clients = {}
+        self.connects = 0
+        self.disconnects = 0
+        self.resubscribes = 0
+        self._lock = threading.Lock()
+
+    def reconcile(self, specs):
+        """Bring the running clients in line with specs ({config id: ClientSpec})."""
+        with self._lock:
+            for config_id in [config_id for config_id in self.clients if config_id not in specs]:
+                self._stop(self.clients.pop(config_id))
+
+            for config_id, spec in specs.items():
+                running = self.clients.get(config_id)
+                if running is not None and running.spec == spec:
+                    continue
+                if running is not None and connection_params(running.spec) == connection_params(spec):
+                    self._update(running, spec)
+                    continue
+                if running is not None:
+                    self._stop(running)
+                try:
+                    self.clients[config_id] = RunningClient(spec, self.connect(spec))
+                    self.connects += 1
+                except Exception as e:
+                    self.clients.pop(config_id, None)
+                    print(f"⚠ Failed to set up MQTT for configuration {config_id}: {e}")
+
+    def _update(self, running, spec):
+        client = running.client
+        client.user_data_set(client_userdata(spec))  # used again when paho reconnects
+        old_topics, new_topics = set(running.spec.topics), set(spec.topics)
+        for topic in old_topics - new_topics:
+            client.unsubscribe(subscription_filter(topic, spec.shared_group))
+            print(f"📴 Unsubscribed from topic: {topic}")
+        for topic in new_topics - old_topics:
+            client.subscribe(subscription_filter(topic, spec.shared_group))
+            print(f"📡 Subscribed to topic: {topic}")
+        self.clients[spec.config_id] = RunningClient(spec, client)
+        self.resubscribes += 1
+
+    def _stop(self, running):
+        try:
+            self.disconnect(running.client)
+        except Exception as e:
+            print(f"⚠ Error stopping mqtt client: {e}")
+        self.disconnects += 1
+
+    def close_all(self):
+        self.reconcile({})
+
+    def stats(self):
+        with self._lock:
+            clients = len(self.clients)
+        return {
+            "clients": clients,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "resubscribes": self.resubscribes,
+        }
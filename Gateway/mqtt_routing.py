@@ -0,0 +1,59 @@
+from collections import namedtuple
+from Gateway import config_cache
+from Gateway.models import IHG_InboundConnector
+from Gateway.payload_codecs import get_connector_codec
+from Gateway.topic_trie import TopicTrie
+
+# Per inbound MQTT connector: topic filter trie -> device_name -> device pk and
+# the keys configured for it, plus the connector's payload codec. Built once per configuration version (see
+# Gateway/signals.py), so on_message resolves messages without any queries.
+
+ConnectorRoutes = namedtuple("ConnectorRoutes", ["id", "name", "gateway_id", "trie", "codec"])
+DeviceRoute = namedtuple("DeviceRoute", ["device_id", "device_name", "keys"])
+KeyPlan = namedtuple("KeyPlan", ["key", "deadband", "deadband_mode", "heartbeat"])
+
+
+def build_routing_index(connector_id):
+    connector = (
+        IHG_InboundConnector.objects.filter(id=connector_id)
+        .prefetch_related("mqtt_config__topics__devices__timeseries")
+        .first()
+    )
+    if connector is None:
+        return None
+    trie = TopicTrie()
+    mqtt_config = getattr(connector, "mqtt_config", None)
+    topics = mqtt_config.topics.all() if mqtt_config is not None else []
+    for topic in topics:
+        devices = {}
+        for device in topic.devices.all():
+            keys = {
+                ts.key: KeyPlan(ts.key, ts.deadband, ts.deadband_mode, ts.heartbeat)
+                for ts in device.timeseries.all()
+            }
+            devices[device.device_name] = DeviceRoute(device.id, device.device_name, keys)
+        try:
+            trie.insert(topic.name, devices)
+        except ValueError as e:
+            print(f"⚠ Skipping invalid MQTT topic filter: {e}")
+    return ConnectorRoutes(connector.id, connector.name, connector.gateway_id, trie, get_connector_codec(connector))
+
+
+def get_routing_index(connector_id):
+    return config_cache.cached(("mqtt_routes", connector_id), lambda: build_routing_index(connector_id))
+
+
+def resolve_devices(routes, topic):
+    """Return {device_name: DeviceRoute} for every topic filter matching the message topic."""
+    matches = routes.trie.match(topic)
+    if len(matches) == 1:
+        return matches[0]
+    devices = {}
+    for matched in matches:
+        for device_name, route in matched.items():
+            existing = devices.get(device_name)
+            if existing is None:
+                devices[device_name] = route
+            else:
+                devices[device_name] = existing._replace(keys={**route.keys, **existing.keys})
+    return devices
@@ -0,0 +1,352 @@
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from django.conf import settings
+from Gateway.alias_encoding import BIRTH_SUFFIX, DATA_SUFFIX, AliasSession, get_payload_mode
+from Gateway.http_client import http_clients
+from Gateway.mqtt_publisher import publisher_manager
+from Gateway.outbound_batch import encode_envelope, encode_ndjson, get_batch_options, mqtt_envelope
+from Gateway.outbox import RECORD_HEADER, Outbox
+from Gateway.payload_codecs import get_codec
+from Gateway.status import set_connector_status
+
+# Upper bound on frames per batch, the byte budget normally ends a batch first
+MAX_BATCH_FRAMES = 1000
+# HTTP statuses meaning the data itself was refused; retrying it would never succeed
+REJECTED_STATUSES = frozenset({400, 409, 415, 422})
+
+
+class RetryAfter(Exception):
+    """The target asked to be retried later (HTTP 429/503 with Retry-After)."""
+
+    def __init__(self, delay, message):
+        super().__init__(message)
+        self.delay = delay
+
+
+class Rejected(Exception):
+    """The target refused the data for good, it is dropped instead of retried."""
+
+
+class Undeliverable(Exception):
+    """The frames cannot be encoded for the target; sending them again would fail the same way."""
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def check_response(resp):
+    if resp.ok:
+        return
+    if resp.status_code in (429, 503):
+        delay = parse_retry_after(resp.headers.get("Retry-After"))
+        if delay is not None:
+            raise RetryAfter(delay, f"HTTP {resp.status_code}, retry after {delay:.0f}s")
+    if resp.status_code in REJECTED_STATUSES:
+        raise Rejected(f"HTTP {resp.status_code}: {resp.text[:100]}")
+    resp.raise_for_status()
+
+
+def get_outbox_dir():
+    directory = getattr(settings, "OUTBOX_DIR", os.path.join(settings.BASE_DIR, "outbox"))
+    instance = getattr(settings, "GATEWAY_INSTANCE_ID", "")
+    return os.path.join(directory, instance) if instance else directory
+
+
+def get_catchup_rate(plan):
+    """Messages per second an outbound connector may send while draining a backlog."""
+    try:
+        return float(plan.configuration.get("catchup_rate") or getattr(settings, "OUTBOUND_CATCHUP_RATE", 50))
+    except (TypeError, ValueError, AttributeError):
+        return 50.0
+
+
+def pack_record(codec, payload):
+    """Outbox record of a frame: the name of the codec it is encoded with, a NUL byte, the payload."""
+    return codec.name.encode() + b"\0" + payload
+
+
+def unpack_records(records, codec):
+    """Frames of outbox records encoded with codec, re-encoding those queued under another codec."""
+    frames = []
+    for record in records:
+        name, _, payload = record.partition(b"\0")
+        name = name.decode()
+        if name != codec.name:
+            payload = codec.encode(get_codec(name).decode(payload))
+        frames.append(payload)
+    return frames
+
+
+def batch_size(records):
+    """Bytes the records occupy in the outbox."""
+    return sum(RECORD_HEADER.size + len(record) for record in records)
+
+
+class OutboundDrainer:
+    """Store-and-forward sender for one outbound connector.
+
+    Frames are appended to the connector's on-disk outbox before anything
+    is sent; a background thread reads them back in order, sends them and
+    only then advances the outbox cursor. With batching enabled, frames are
+    packed into one envelope up to the connector's byte budget, waiting up
+    to the linger time for a batch to fill. When the target is unreachable
+    the thread retries with a capped exponential backoff (or as long as a
+    Retry-After asks for), and once it is back the backlog drains at no more
+    than the connector's catch-up rate. Data the target refuses outright
+    (REJECTED_STATUSES) is dropped instead of blocking the outbox forever, and
+    so are frames that cannot be encoded for it (Undeliverable): a failed
+    batch is retried frame by frame so only the offending frames are lost.
+    Each frame is queued with the name of its codec, so a backlog survives a
+    codec change.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.outbox = Outbox(
+            os.path.join(get_outbox_dir(), f"connector-{plan.id}"),
+            segment_bytes=getattr(settings, "OUTBOX_SEGMENT_BYTES", 1024 * 1024),
+            max_bytes=getattr(settings, "OUTBOX_MAX_BYTES", 100 * 1024 * 1024),
+            fsync_interval=getattr(settings, "OUTBOX_FSYNC_INTERVAL", 1.0),
+        )
+        self.sent = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.failures = 0
+        self.rejected = 0
+        self.undeliverable = 0
+        self.last_error = None
+        self.last_latency = None
+        self.total_latency = 0.0
+        self.status = None
+        self.alias_session = AliasSession()
+        # Outbox position up to which frames are sent one at a time after an Undeliverable batch
+        self.isolate_until = None
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"outbound-{plan.id}", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, frame):
+        codec = self.plan.codec
+        self.outbox.append(pack_record(codec, codec.encode(frame)))
+        self.wake_event.set()
+
+    def run(self):
+        retry_delay = 0
+        pending_since = None
+        while not self.stop_event.is_set():
+            self.outbox.sync()
+            options = get_batch_options(self.plan)
+            if options.max_bytes and self.isolate_until is None:
+                records, position = self.outbox.read(MAX_BATCH_FRAMES, options.max_bytes)
+            else:
+                records, position = self.outbox.read(1)
+            if not records:
+                pending_since = None
+                self.wake_event.wait(1)
+                self.wake_event.clear()
+                continue
+
+            # Linger so a partial batch can fill up, unless more data is already waiting
+            if options.max_bytes and self.isolate_until is None and self.outbox.pending_bytes() <= batch_size(records):
+                pending_since = pending_since or time.monotonic()
+                remaining = pending_since + options.linger - time.monotonic()
+                if remaining > 0:
+                    self.wake_event.wait(remaining)
+                    self.wake_event.clear()
+                    continue
+
+            started = time.monotonic()
+            try:
+                self.send(records, options)
+            except Rejected as e:
+                self.rejected += len(records)
+                self.last_error = str(e)
+                print(f"❌ Outbound {self.plan.name} rejected {len(records)} frame(s) ({e}), dropping them")
+                pending_since = None
+                self.ack(position)
+                continue
+            except Undeliverable as e:
+                pending_since = None
+                if len(records) > 1:
+                    self.isolate_until = position
+                    continue
+                self.undeliverable += 1
+                self.last_error = str(e)
+                print(f"❌ Outbound {self.plan.name} cannot send a frame ({e}), dropping it")
+                self.ack(position)
+                continue
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                self.set_status("inactive")
+                retry_delay = min(max(retry_delay * 2, 1), getattr(settings, "OUTBOUND_RETRY_MAX_DELAY", 60))
+                if isinstance(e, RetryAfter):
+                    retry_delay = max(retry_delay, min(e.delay, getattr(settings, "OUTBOUND_RETRY_AFTER_MAX", 600)))
+                print(f"❌ Outbound {self.plan.name} send failed ({e}), retrying in {retry_delay}s")
+                self.stop_event.wait(retry_delay)
+                continue
+            retry_delay = 0
+            pending_since = None
+            self.last_latency = time.monotonic() - started
+            self.total_latency += self.last_latency
+            self.ack(position)
+            self.sent += 1
+            self.frames += len(records)
+            self.set_status("active")
+            # Pace only a backlog; a frame arriving on an empty outbox goes out at once
+            if self.outbox.pending_bytes():
+                self.stop_event.wait(1.0 / get_catchup_rate(self.plan))
+
+    def ack(self, position):
+        """Advance the outbox past sent or dropped frames, batching again once isolated frames are through."""
+        self.outbox.ack(position)
+        if self.isolate_until is not None and position >= self.isolate_until:
+            self.isolate_until = None
+
+    def encode(self, records, options):
+        """Message for the records in the connector's codec, built before any I/O.
+
+        MQTT gets the payload (decoded frames in alias mode), REST POST a
+        (body, headers) pair and REST GET the query parameters.
+        """
+        plan = self.plan
+        frames = unpack_records(records, plan.codec)
+        batched = bool(options.max_bytes)
+        if plan.connector_type == "mqtt":
+            if get_payload_mode(plan) == "alias":
+                return [plan.codec.decode(frame) for frame in frames]
+            return mqtt_envelope(frames, options.compression, plan.codec) if batched else frames[0]
+        if batched:
+            if options.format == "ndjson":
+                return encode_ndjson(frames, options.compression)
+            return encode_envelope(frames, options.compression, plan.codec)
+        if plan.rest_method == "POST":
+            return frames[0], {"Content-Type": plan.codec.content_type}
+        return plan.codec.decode(frames[0])
+
+    def send(self, records, options):
+        plan = self.plan
+        if plan.connector_type == "mqtt" and not plan.mqtt:
+            raise RuntimeError("no MQTT configuration")
+        try:
+            message = self.encode(records, options)
+        except (TypeError, ValueError) as e:
+            raise Undeliverable(f"cannot encode {len(records)} frame(s): {e}") from e
+
+        if plan.connector_type == "mqtt":
+            publisher = publisher_manager.get(plan.mqtt)
+            if get_payload_mode(plan) == "alias":
+                self.send_aliased(message, publisher)
+                return
+            for topic in plan.mqtt.topics:
+                publisher.publish_and_wait(topic, message, qos=plan.mqtt.qos)
+            self.bytes_sent += len(message)
+            print(f"📤 MQTT Published {len(records)} frame(s) via {plan.name} to topics {', '.join(plan.mqtt.topics)}")
+
+        elif plan.connector_type == "rest":
+            print(f"   🌐 Sending REST request to {plan.rest_url} [{plan.rest_method}]")
+            client = http_clients.get(plan)
+            if options.max_bytes or plan.rest_method == "POST":
+                body, headers = message
+                resp = client.post(plan.rest_url, data=body, headers=headers)
+                self.bytes_sent += len(body)
+            else:  # GET
+                resp = client.get(plan.rest_url, params=message)
+            check_response(resp)
+            print(f"   ✅ REST Response {resp.status_code}: {resp.text[:100]}")
+
+    def send_aliased(self, frames, publisher):
+        """Publish a birth when the session needs one, then the changed values as a binary data message."""
+        plan = self.plan
+        publisher.wait_connected()
+        key = (id(publisher), publisher.sessions, plan)
+        try:
+            messages = self.alias_session.prepare(frames, key, plan.codec)
+        except (TypeError, ValueError) as e:
+            raise Undeliverable(str(e)) from e
+        for suffix, payload in ((BIRTH_SUFFIX, messages.birth), (DATA_SUFFIX, messages.data)):
+            if payload is None:
+                continue
+            for topic in plan.mqtt.topics:
+                publisher.publish_and_wait(topic + suffix, payload, qos=plan.mqtt.qos)
+            self.bytes_sent += len(payload)
+        self.alias_session.commit(messages)
+        if messages.birth is not None:
+            print(f"📤 MQTT Birth {messages.state.bd_seq} with {len(messages.state.aliases)} aliases via {plan.name}")
+
+    def set_status(self, status):
+        if self.status == status:
+            return
+        self.status = status
+        set_connector_status("outbound", self.plan.id, status)
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        self.thread.join(timeout=5)
+        self.outbox.close()
+
+    def stats(self):
+        return {
+            "name": self.plan.name,
+            "status": self.status,
+            "sent": self.sent,
+            "frames": self.frames,
+            "bytes_sent": self.bytes_sent,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "undeliverable": self.undeliverable,
+            "last_error": self.last_error,
+            "last_latency": self.last_latency,
+            "avg_latency": round(self.total_latency / self.sent, 4) if self.sent else None,
+            "outbox": self.outbox.stats(),
+            "aliases": self.alias_session.stats(),
+        }
+
+
+class OutboundManager:
+    """One OutboundDrainer per outbound connector, created on first use."""
+
+    def __init__(self):
+        self._drainers = {}
+        self._lock = threading.Lock()
+
+    def get(self, plan):
+        with self._lock:
+            drainer = self._drainers.get(plan.id)
+            if drainer is None:
+                drainer = self._drainers[plan.id] = OutboundDrainer(plan)
+            drainer.plan = plan  # pick up configuration changes
+            return drainer
+
+    def enqueue(self, plan, frame):
+        self.get(plan).enqueue(frame)
+
+    def retain(self, connector_ids):
+        """Stop drainers of outbound connectors that no longer exist."""
+        with self._lock:
+            stale = [self._drainers.pop(key) for key in list(self._drainers) if key not in connector_ids]
+        for drainer in stale:
+            drainer.stop()
+
+    def stats(self):
+        with self._lock:
+            drainers = dict(self._drainers)
+        return {connector_id: drainer.stats() for connector_id, drainer in drainers.items()}
+
+
+outbound_manager = OutboundManager()
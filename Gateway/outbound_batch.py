@@ -0,0 +1,101 @@
+import gzip
+import zlib
+from collections import namedtuple
+from django.conf import settings
+from Gateway.payload_codecs import CODECS
+
+# Batched outbound messages pack many frames into one envelope:
+#   REST: the body is the envelope, described by Content-Type / Content-Encoding
+#         and X-Frame-Count headers. With batch_format "ndjson" the body is one
+#         JSON frame per line instead (Content-Type application/x-ndjson).
+#   MQTT: the payload starts with a one-line header, e.g.
+#         b"IHGBATCH/1 encoding=gzip codec=json frames=12\n", followed by the envelope.
+# The uncompressed envelope is {"frames": [frame, ...]} in the connector's payload codec.
+
+COMPRESSIONS = ("none", "zlib", "gzip")
+BATCH_FORMATS = ("envelope", "ndjson")
+MQTT_HEADER_MAGIC = b"IHGBATCH/1"
+
+BatchOptions = namedtuple("BatchOptions", ["max_bytes", "linger", "compression", "format"])
+
+# configuration["rest_mode"] = "bulk": gzip-compressed NDJSON batches unless overridden
+BULK_DEFAULTS = {"batch_format": "ndjson", "compression": "gzip", "linger_ms": 1000}
+
+
+def get_batch_options(plan):
+    """Batching settings of an outbound connector; max_bytes 0 sends every frame on its own."""
+    configuration = plan.configuration if isinstance(plan.configuration, dict) else {}
+    if configuration.get("rest_mode") == "bulk":
+        bulk = dict(BULK_DEFAULTS, batch_max_bytes=getattr(settings, "OUTBOUND_BULK_MAX_BYTES", 1024 * 1024))
+        configuration = {**bulk, **configuration}
+    try:
+        max_bytes = int(configuration.get("batch_max_bytes", getattr(settings, "OUTBOUND_BATCH_MAX_BYTES", 0)))
+        linger = float(configuration.get("linger_ms", getattr(settings, "OUTBOUND_LINGER_MS", 500))) / 1000
+    except (TypeError, ValueError):
+        max_bytes, linger = 0, 0.5
+    compression = configuration.get("compression", getattr(settings, "OUTBOUND_COMPRESSION", "none"))
+    if compression not in COMPRESSIONS:
+        print(f"⚠ Unknown compression {compression!r} for outbound connector {plan.name}, sending uncompressed")
+        compression = "none"
+    batch_format = configuration.get("batch_format", getattr(settings, "OUTBOUND_BATCH_FORMAT", "envelope"))
+    if batch_format not in BATCH_FORMATS or (batch_format == "ndjson" and plan.codec.name != "json"):
+        print(f"⚠ Batch format {batch_format!r} is not usable for outbound connector {plan.name}, sending envelopes")
+        batch_format = "envelope"
+    return BatchOptions(max(max_bytes, 0), max(linger, 0.0), compression, batch_format)
+
+
+def compress(body, compression):
+    if compression == "gzip":
+        return gzip.compress(body)
+    if compression == "zlib":
+        return zlib.compress(body)
+    return body
+
+
+def decompress(body, compression):
+    if compression == "gzip":
+        return gzip.decompress(body)
+    if compression == "zlib":
+        return zlib.decompress(body)
+    return body
+
+
+def batch_headers(content_type, frame_count, compression):
+    headers = {"Content-Type": content_type, "X-Frame-Count": str(frame_count)}
+    if compression != "none":
+        headers["Content-Encoding"] = "deflate" if compression == "zlib" else "gzip"
+    return headers
+
+
+def encode_envelope(frames, compression="none", codec=None):
+    """Pack frames encoded with codec (default JSON) into one envelope, return (body, headers)."""
+    codec = codec or CODECS["json"]
+    if codec.name == "json":
+        body = b'{"frames":[' + b",".join(frames) + b"]}"
+    else:
+        body = codec.encode({"frames": [codec.decode(frame) for frame in frames]})
+    return compress(body, compression), batch_headers(codec.content_type, len(frames), compression)
+
+
+def encode_ndjson(frames, compression="none"):
+    """Join JSON-encoded frames into an NDJSON body, return (body, headers)."""
+    body = compress(b"\n".join(frames) + b"\n", compression)
+    return body, batch_headers("application/x-ndjson", len(frames), compression)
+
+
+def mqtt_envelope(frames, compression="none", codec=None):
+    codec = codec or CODECS["json"]
+    body, _ = encode_envelope(frames, compression, codec)
+    header = b"%s encoding=%s codec=%s frames=%d\n" % (
+        MQTT_HEADER_MAGIC, compression.encode(), codec.name.encode(), len(frames)
+    )
+    return header + body
+
+
+def decode_mqtt_envelope(payload):
+    """Inverse of mqtt_envelope: return the uncompressed envelope bytes."""
+    header, _, body = payload.partition(b"\n")
+    if not header.startswith(MQTT_HEADER_MAGIC):
+        raise ValueError("not a batched payload")
+    fields = dict(part.split(b"=", 1) for part in header.split()[1:])
+    return decompress(body, fields.get(b"encoding", b"none").decode())
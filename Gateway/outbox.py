@@ -0,0 +1,208 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+# Record framing: payload length and CRC32, then the payload bytes
+RECORD_HEADER = struct.Struct(">II")
+SEGMENT_SUFFIX = ".log"
+CURSOR_FILE = "cursor"
+
+
+def fsync_directory(directory):
+    """Make a rename or a new file in directory durable; skipped where directories cannot be synced."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Outbox:
+    """Append-only, disk-backed message log for one outbound connector.
+
+    Messages are appended to numbered segment files and read back from a
+    persistent cursor, so anything not yet acknowledged survives outages and
+    restarts. Fully acknowledged segments are deleted; when the log grows
+    past ``max_bytes`` the oldest segments are discarded even if unsent.
+    A torn record at the end of the last segment (crash mid-write) is
+    truncated away on open.
+
+    Appends are fsynced by the next append or sync() call once
+    ``fsync_interval`` seconds have passed since the last fsync (0 syncs
+    every append), which bounds what a power failure can lose. The cursor
+    is replaced atomically and fsynced together with its directory.
+    """
+
+    def __init__(self, directory, segment_bytes=1024 * 1024, max_bytes=100 * 1024 * 1024, fsync_interval=1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.dropped_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        if not self._segments:
+            self._segments = [0]
+        self._cursor = self._load_cursor()
+        self._repair_tail()
+        self._writer = open(self._segment_path(self._segments[-1]), "ab")
+        self._unsynced = False
+        self._synced_at = time.monotonic()
+        self._bytes = sum(os.path.getsize(self._segment_path(seq)) for seq in self._segments)
+
+    def _segment_path(self, seq):
+        return os.path.join(self.directory, f"{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _load_cursor(self):
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                seq, offset = (int(part) for part in f.read().split())
+        except (OSError, ValueError):
+            return self._segments[0], 0
+        if seq not in self._segments:
+            return self._segments[0], 0
+        return seq, offset
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{self._cursor[0]} {self._cursor[1]}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        fsync_directory(self.directory)
+
+    def _repair_tail(self):
+        path = self._segment_path(self._segments[-1])
+        if not os.path.exists(path):
+            return
+        valid_end = 0
+        with open(path, "rb") as f:
+            for _, end in self._iter_records(f, 0):
+                valid_end = end
+        if valid_end != os.path.getsize(path):
+            print(f"⚠ Truncating torn record at the end of outbox segment {path}")
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+
+    @staticmethod
+    def _iter_records(f, offset):
+        """Yield (payload, end offset) of intact records from offset on."""
+        f.seek(offset)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            offset += RECORD_HEADER.size + length
+            yield payload, offset
+
+    def append(self, payload):
+        with self._lock:
+            if self._writer.tell() >= self.segment_bytes:
+                self._roll()
+            record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+            self._writer.write(record)
+            self._writer.flush()
+            self._unsynced = True
+            self._sync(self.fsync_interval)
+            self._bytes += len(record)
+            self._enforce_cap()
+
+    def sync(self):
+        """fsync appends still pending once the fsync interval has passed."""
+        with self._lock:
+            self._sync(self.fsync_interval)
+
+    def _sync(self, interval=0):
+        if self._unsynced and time.monotonic() - self._synced_at >= interval:
+            os.fsync(self._writer.fileno())
+            self._unsynced = False
+            self._synced_at = time.monotonic()
+
+    def _roll(self):
+        self._sync()
+        self._writer.close()
+        self._segments.append(self._segments[-1] + 1)
+        self._writer = open(self._segment_path(self._segments[-1]), "ab")
+        fsync_directory(self.directory)
+
+    def _enforce_cap(self):
+        while len(self._segments) > 1 and self._bytes > self.max_bytes:
+            seq = self._segments.pop(0)
+            size = self._remove_segment(seq)
+            if self._cursor[0] == seq:
+                self.dropped_bytes += size - self._cursor[1]
+                self._cursor = (self._segments[0], 0)
+                self._save_cursor()
+            print(f"⚠ Outbox {self.directory} over {self.max_bytes} bytes, discarded segment {seq}")
+
+    def _remove_segment(self, seq):
+        path = self._segment_path(seq)
+        size = os.path.getsize(path)
+        os.remove(path)
+        self._bytes -= size
+        return size
+
+    def read(self, max_records, max_bytes=None):
+        """Return ([payload, ...], position) of the oldest unacknowledged records without consuming them."""
+        records = []
+        size = 0
+        with self._lock:
+            seq, offset = self._cursor
+            for index in range(self._segments.index(seq), len(self._segments)):
+                seq = self._segments[index]
+                with open(self._segment_path(seq), "rb") as f:
+                    for payload, end in self._iter_records(f, offset):
+                        if records and max_bytes and size + len(payload) > max_bytes:
+                            return records, (seq, offset)
+                        records.append(payload)
+                        size += len(payload)
+                        offset = end
+                        if len(records) >= max_records:
+                            return records, (seq, offset)
+                if index + 1 < len(self._segments):
+                    offset = 0
+                    seq = self._segments[index + 1]
+            return records, (seq, offset)
+
+    def ack(self, position):
+        """Mark everything before position (as returned by read) as delivered."""
+        with self._lock:
+            if position < self._cursor:
+                return
+            self._cursor = position
+            self._save_cursor()
+            while self._segments[0] < position[0]:
+                self._remove_segment(self._segments.pop(0))
+
+    def pending_bytes(self):
+        with self._lock:
+            seq, offset = self._cursor
+            acknowledged = sum(os.path.getsize(self._segment_path(s)) for s in self._segments if s < seq)
+            return max(self._bytes - acknowledged - offset, 0)
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._writer.close()
+
+    def stats(self):
+        return {
+            "segments": len(self._segments),
+            "pending_bytes": self.pending_bytes(),
+            "dropped_bytes": self.dropped_bytes,
+        }
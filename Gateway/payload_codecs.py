@@ -0,0 +1,77 @@
+import json
+from collections import namedtuple
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # optional, faster JSON
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, pip install msgpack
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional, pip install cbor2
+    cbor2 = None
+
+# Payload codecs turn a message body (bytes) into Python objects and back.
+# A connector picks one with configuration["codec"] (default PAYLOAD_CODEC,
+# "json"); decoders take the raw bytes, errors surface as ValueError.
+
+Codec = namedtuple("Codec", ["name", "content_type", "encode", "decode"])
+
+CODECS = {}
+
+
+def register_codec(codec):
+    CODECS[codec.name] = codec
+
+
+def _json_encode(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+if orjson is not None:
+    register_codec(Codec("json", "application/json", orjson.dumps, orjson.loads))
+else:
+    register_codec(Codec("json", "application/json", _json_encode, json.loads))
+
+if msgpack is not None:
+    register_codec(Codec(
+        "msgpack",
+        "application/msgpack",
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    ))
+
+
+def _cbor_decode(data):
+    try:
+        return cbor2.loads(data)
+    except cbor2.CBORDecodeError as e:  # not a ValueError in newer cbor2 releases
+        raise ValueError(str(e)) from e
+
+
+if cbor2 is not None:
+    register_codec(Codec("cbor", "application/cbor", cbor2.dumps, _cbor_decode))
+
+
+def get_codec(name):
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"payload codec {name!r} is not available (installed: {', '.join(sorted(CODECS))})")
+    return codec
+
+
+def get_connector_codec(connector):
+    """Codec selected by a connector's configuration, falling back to JSON if it is unknown."""
+    configuration = connector.configuration if isinstance(connector.configuration, dict) else {}
+    name = configuration.get("codec") or getattr(settings, "PAYLOAD_CODEC", "json")
+    try:
+        return get_codec(name)
+    except ValueError as e:
+        print(f"⚠ Connector {connector.name}: {e}, using json")
+        return CODECS["json"]
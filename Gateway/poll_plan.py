@@ -0,0 +1,127 @@
+from collections import namedtuple
+from django.conf import settings
+from Gateway import config_cache
+from Gateway.models import IHG_InboundConnector, IHG_OutboundConnector
+from Gateway.modbus_planner import build_read_plan, get_block_limits
+from Gateway.payload_codecs import get_connector_codec
+
+# Immutable snapshot of everything the poll loop needs:
+# connectors -> devices -> read blocks of timeseries, plus the outbound
+# targets of each connector's gateway. Built once per configuration version
+# (see Gateway/signals.py), so steady-state polling runs no configuration queries.
+
+PollPlan = namedtuple("PollPlan", ["version", "connectors"])
+GatewayPlan = namedtuple("GatewayPlan", ["id", "name"])
+ConnectorPlan = namedtuple("ConnectorPlan", ["id", "name", "connector_id", "interval", "gateway", "devices", "outbound"])
+DevicePlan = namedtuple(
+    "DevicePlan",
+    ["id", "device_name", "device_ip", "device_port", "unit_id", "connect_timeout", "read_timeout", "blocks"],
+)
+TimeseriesPlan = namedtuple(
+    "TimeseriesPlan",
+    ["id", "name", "scale", "address", "byte_order", "data_type", "deadband", "deadband_mode", "heartbeat"],
+)
+OutboundPlan = namedtuple("OutboundPlan", ["id", "name", "connector_type", "configuration", "rest_url", "rest_method", "mqtt", "codec"])
+MQTTTargetPlan = namedtuple("MQTTTargetPlan", ["id", "broker_ip", "port", "username", "password", "topics", "qos"])
+
+
+def get_connector_interval(connector):
+    try:
+        return int(connector.interval)
+    except (ValueError, TypeError):
+        return 60  # Default if invalid
+
+
+def get_publish_qos(outbound):
+    configuration = outbound.configuration if isinstance(outbound.configuration, dict) else {}
+    try:
+        qos = int(configuration.get("qos", getattr(settings, "MQTT_PUBLISH_QOS", 0)))
+    except (TypeError, ValueError):
+        qos = 0
+    return min(max(qos, 0), 2)
+
+
+def build_outbound_plan(outbound):
+    mqtt_target = None
+    mqtt_config = getattr(outbound, "mqtt_config", None) if outbound.connector_type == "mqtt" else None
+    if mqtt_config is not None:
+        mqtt_target = MQTTTargetPlan(
+            id=mqtt_config.id,
+            broker_ip=mqtt_config.broker_ip,
+            port=mqtt_config.port,
+            username=mqtt_config.username or "",
+            password=mqtt_config.password or "",
+            topics=tuple(topic.name for topic in mqtt_config.topics.all()),
+            qos=get_publish_qos(outbound),
+        )
+    return OutboundPlan(
+        id=outbound.id,
+        name=outbound.name,
+        connector_type=outbound.connector_type,
+        configuration=dict(outbound.configuration or {}),
+        rest_url=outbound.rest_url,
+        rest_method=outbound.rest_method,
+        mqtt=mqtt_target,
+        codec=get_connector_codec(outbound),
+    )
+
+
+def build_timeseries_plan(ts):
+    return TimeseriesPlan(
+        ts.id, ts.name, ts.scale, ts.address, ts.byte_order, ts.data_type,
+        ts.deadband, ts.deadband_mode, ts.heartbeat,
+    )
+
+
+def build_outbound_by_gateway():
+    outbound_by_gateway = {}
+    outbound_qs = IHG_OutboundConnector.objects.select_related("mqtt_config").prefetch_related("mqtt_config__topics")
+    for outbound in outbound_qs.order_by("id"):
+        outbound_by_gateway.setdefault(outbound.gateway_id, []).append(build_outbound_plan(outbound))
+    return {gateway_id: tuple(plans) for gateway_id, plans in outbound_by_gateway.items()}
+
+
+def get_outbound_by_gateway():
+    """{gateway id: (OutboundPlan, ...)} for the current configuration version."""
+    return config_cache.cached("outbound_by_gateway", build_outbound_by_gateway)
+
+
+def build_poll_plan():
+    version = config_cache.version()
+    outbound_by_gateway = get_outbound_by_gateway()
+
+    connectors = []
+    connector_qs = (
+        IHG_InboundConnector.objects.filter(connector_type="modbus")
+        .select_related("gateway")
+        .prefetch_related("devices__timeseries")
+    )
+    for connector in connector_qs.order_by("id"):
+        max_block_size, max_gap = get_block_limits(connector)
+        devices = []
+        for device in connector.devices.all():
+            timeseries = [build_timeseries_plan(ts) for ts in device.timeseries.all()]
+            devices.append(DevicePlan(
+                id=device.id,
+                device_name=device.device_name,
+                device_ip=device.device_ip,
+                device_port=int(device.device_port),
+                unit_id=int(device.unit_id),
+                connect_timeout=float(device.connect_timeout),
+                read_timeout=float(device.read_timeout),
+                blocks=tuple(build_read_plan(timeseries, max_block_size, max_gap)),
+            ))
+        connectors.append(ConnectorPlan(
+            id=connector.id,
+            name=connector.name,
+            connector_id=connector.connector_id,
+            interval=get_connector_interval(connector),
+            gateway=GatewayPlan(connector.gateway_id, connector.gateway.name),
+            devices=tuple(devices),
+            outbound=outbound_by_gateway.get(connector.gateway_id, ()),
+        ))
+    return PollPlan(version, tuple(connectors))
+
+
+def get_poll_plan():
+    return config_cache.cached("poll_plan", build_poll_plan)
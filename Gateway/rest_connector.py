@@ -1,6 +1,6 @@
-import requests
 import json
 import time
+from Gateway.http_client import http_clients
 from Gateway.models import IHG_Timeseries, IHG_ModbusData,IHG_OutboundConnector,IHG_InboundConnector
 
 def run_restapi_connector(connector):
@@ -26,28 +26,14 @@ def run_restapi_connector(connector):
             for row in ts_data:
                 payload["data"][row.timeseries.name] = row.value
 
+            client = http_clients.get(connector)
             if method == "POST":
-                r = requests.post(url, json=payload, timeout=5)
+                r = client.post(url, data=json.dumps(payload), headers={"Content-Type": "application/json"})
             else:
-                r = requests.get(url, timeout=5)
+                r = client.get(url)
 
             print(f"✅ REST API response {r.status_code}: {r.text[:100]}")
 
     except Exception as e:
         print(f"❌ REST API connector failed: {e}")
 
-
-def send_data_to_api(url,payload,connector_id):
-    print(f"🌐 Sending data to REST API: {url}")
-    try:
-        connector = IHG_OutboundConnector.objects.get(id=connector_id)
-        r = requests.post(url, json=payload, timeout=5)
-        r.raise_for_status()
-        connector.status = "active"
-        connector.save(update_fields=["status"])
-        
-        
-    except Exception as e:
-        print(f"❌ REST API connector failed: {e}")
-        connector.status = "inactive"
-        connector.save(update_fields=["status"])
\ No newline at end of file
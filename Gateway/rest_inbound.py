@@ -0,0 +1,163 @@
+import hmac
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from Gateway import config_cache
+from Gateway.deadband import deadband_filter
+from Gateway.modbus import forward_device_values
+from Gateway.models import IHG_InboundConnector, IHG_ModbusData
+from Gateway.payload_codecs import CODECS, get_connector_codec
+from Gateway.poll_plan import ConnectorPlan, GatewayPlan, build_timeseries_plan, get_connector_interval, get_outbound_by_gateway
+from Gateway.sample_writer import get_sample_writer
+from Gateway.status import set_connector_status
+
+# Cached per REST inbound connector (by its connector_id UUID): the devices
+# and timeseries names a push may contain, plus the outbound targets to
+# forward to. Built once per configuration version, so pushes run no
+# configuration queries.
+RestDevice = namedtuple("RestDevice", ["device_id", "device_name", "keys"])
+RestSchema = namedtuple("RestSchema", ["connector", "devices", "codec", "token"])
+# Outcome of one push
+PushResult = namedtuple("PushResult", ["accepted", "rejected", "errors"])
+
+MAX_ERRORS = 10
+
+
+def build_rest_schema(connector_uuid):
+    connector = (
+        IHG_InboundConnector.objects.filter(connector_id=connector_uuid, connector_type="rest")
+        .select_related("gateway")
+        .prefetch_related("devices__timeseries")
+        .first()
+    )
+    if connector is None:
+        return None
+    devices = {}
+    for device in connector.devices.all():
+        route = RestDevice(
+            device.id, device.device_name, {ts.name: build_timeseries_plan(ts) for ts in device.timeseries.all()}
+        )
+        devices[device.device_name] = route
+        devices.setdefault(device.device_id, route)
+    configuration = connector.configuration if isinstance(connector.configuration, dict) else {}
+    plan = ConnectorPlan(
+        id=connector.id,
+        name=connector.name,
+        connector_id=connector.connector_id,
+        interval=get_connector_interval(connector),
+        gateway=GatewayPlan(connector.gateway_id, connector.gateway.name),
+        devices=(),
+        outbound=get_outbound_by_gateway().get(connector.gateway_id, ()),
+    )
+    return RestSchema(plan, devices, get_connector_codec(connector), str(configuration.get("token") or ""))
+
+
+def rest_schema_key(connector_uuid):
+    return ("rest_schema", str(connector_uuid))
+
+
+def get_rest_schema(connector_uuid):
+    return config_cache.cached(rest_schema_key(connector_uuid), lambda: build_rest_schema(connector_uuid))
+
+
+def peek_rest_schema(connector_uuid):
+    """The cached schema without building it (no queries), None when it is not built yet."""
+    return config_cache.peek(rest_schema_key(connector_uuid))
+
+
+def is_authorized(schema, headers):
+    """Connectors with configuration["token"] require it as a Bearer token or X-Gateway-Token header."""
+    if not schema.token:
+        return True
+    supplied = headers.get("X-Gateway-Token") or ""
+    authorization = headers.get("Authorization") or ""
+    if authorization.startswith("Bearer "):
+        supplied = authorization[len("Bearer "):]
+    return hmac.compare_digest(supplied.encode(), schema.token.encode())
+
+
+def inflate(body, content_encoding, limit):
+    """Decompress a gzip / deflate request body, refusing to grow it past limit bytes."""
+    content_encoding = (content_encoding or "identity").strip().lower()
+    if content_encoding in ("", "identity"):
+        return body
+    if content_encoding not in ("gzip", "deflate"):
+        raise ValueError(f"unsupported Content-Encoding {content_encoding!r}")
+    # wbits 47 detects gzip and zlib headers
+    decompressor = zlib.decompressobj(47)
+    data = decompressor.decompress(body, limit + 1)
+    if len(data) > limit or decompressor.unconsumed_tail:
+        raise OverflowError(f"decompressed body exceeds {limit} bytes")
+    return data
+
+
+def decode_records(schema, body, content_type):
+    """Split a push body into records: NDJSON lines, or one codec-encoded object or list of objects."""
+    if (content_type or "").split(";")[0].strip() == "application/x-ndjson":
+        codec = CODECS["json"]
+        return [codec.decode(line) for line in body.splitlines() if line.strip()]
+    payload = schema.codec.decode(body)
+    return payload if isinstance(payload, list) else [payload]
+
+
+def record_timestamp(record):
+    ts = record.get("timestamp")
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return datetime.fromtimestamp(ts / 1000, tz=dt_timezone.utc)  # ms → datetime
+    return timezone.now()
+
+
+def store_records(schema, records):
+    """Validate records against the schema, store their samples and forward them like a Modbus poll."""
+    writer = get_sample_writer()
+    accepted = rejected = 0
+    errors = []
+    for record in records:
+        if not isinstance(record, dict):
+            rejected += 1
+            errors.append("record is not an object")
+            continue
+        device_name = record.get("device") or record.get("node")
+        device = schema.devices.get(device_name)
+        values = record.get("values")
+        if device is None or not isinstance(values, dict):
+            rejected += 1
+            errors.append(f"unknown device {device_name!r}" if device is None else f"{device_name}: values must be an object")
+            continue
+        timestamp = record_timestamp(record)
+        samples = []
+        for key, value in values.items():
+            ts = device.keys.get(key)
+            if ts is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+                rejected += 1
+                errors.append(f"{device_name}.{key}: unknown key" if ts is None else f"{device_name}.{key}: not a number")
+                continue
+            samples.append((ts, value * ts.scale if ts.scale else value))
+            accepted += 1
+        forwarded = {}
+        for ts, value in deadband_filter.filter_samples(samples):
+            writer.submit(IHG_ModbusData(timeseries_id=ts.id, value=value, timestamp=timestamp))
+            forwarded[ts.name] = value
+        if forwarded:
+            forward_device_values(schema.connector, device, forwarded)
+    return PushResult(accepted, rejected, errors[:MAX_ERRORS])
+
+
+def handle_push(schema, body, content_type, content_encoding):
+    """Decode, validate and store one push body, return (HTTP status, response dict)."""
+    limit = getattr(settings, "REST_INBOUND_MAX_BYTES", 16 * 1024 * 1024)
+    try:
+        body = inflate(body, content_encoding, limit)
+    except OverflowError as e:
+        return 413, {"error": str(e)}
+    except (ValueError, zlib.error) as e:
+        return 400, {"error": f"cannot decompress body: {e}"}
+    try:
+        records = decode_records(schema, body, content_type)
+    except ValueError as e:
+        return 400, {"error": f"cannot decode body: {e}"}
+    result = store_records(schema, records)
+    set_connector_status("inbound", schema.connector.id, "active")
+    return (202 if result.accepted or not result.rejected else 422), result._asdict()
@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import namedtuple
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from Gateway import config_cache
+from Gateway.models import IHG_InboundConnector
+from Gateway.rest_inbound import get_rest_schema, store_records
+from Gateway.scheduler import DeadlineScheduler
+from Gateway.status import set_connector_status
+
+# Longest sleep between poll plan refreshes
+POLL_TICK = 1
+
+rest_poll_thread = None
+rest_poll_thread_stop_event = threading.Event()
+# Engine of the running poll loop, for the monitor stats
+rest_poll_engine = None
+
+# Pull mode of a REST inbound connector (configuration["mode"] = "poll"):
+# configuration["url"] is requested every interval, once per device when it
+# contains {device_id} or {device_name}, otherwise once for all devices. Each
+# timeseries reads the field at its address, a dotted path into the JSON
+# response ("data.0.power"), or the field named like the timeseries.
+PollField = namedtuple("PollField", ["name", "path"])
+PollDevice = namedtuple("PollDevice", ["device_name", "fields"])
+PollTarget = namedtuple("PollTarget", ["url", "devices"])
+RestPollPlan = namedtuple("RestPollPlan", ["id", "name", "interval", "headers", "targets", "schema"])
+# Validators and body hash of the last full response of one URL
+ResponseState = namedtuple("ResponseState", ["etag", "last_modified", "digest"])
+
+
+def field_path(ts):
+    path = (ts.address or "").strip() or ts.name
+    return tuple(path.split("."))
+
+
+def extract(document, path):
+    """Follow a field path through nested objects and lists, None when it does not exist."""
+    for segment in path:
+        if isinstance(document, dict):
+            document = document.get(segment)
+        elif isinstance(document, list) and segment.isdigit() and int(segment) < len(document):
+            document = document[int(segment)]
+        else:
+            return None
+    return document
+
+
+def device_url(url, device):
+    try:
+        return url.format_map({"device_id": device.device_id, "device_name": device.device_name})
+    except (KeyError, IndexError, ValueError):
+        return url
+
+
+def build_rest_poll_plans():
+    plans = []
+    connector_qs = (
+        IHG_InboundConnector.objects.filter(connector_type="rest")
+        .prefetch_related("devices__timeseries")
+    )
+    for connector in connector_qs.order_by("id"):
+        configuration = connector.configuration if isinstance(connector.configuration, dict) else {}
+        if configuration.get("mode", "push") != "poll":
+            continue
+        url = configuration.get("url")
+        if not url:
+            print(f"⚠ REST connector {connector.name} is in poll mode but has no url")
+            continue
+        schema = get_rest_schema(connector.connector_id)
+        targets = {}
+        for device in connector.devices.all():
+            fields = tuple(PollField(ts.name, field_path(ts)) for ts in device.timeseries.all())
+            targets.setdefault(device_url(url, device), []).append(PollDevice(device.device_name, fields))
+        headers = configuration.get("headers")
+        plans.append(RestPollPlan(
+            id=connector.id,
+            name=connector.name,
+            interval=schema.connector.interval,
+            headers=dict(headers) if isinstance(headers, dict) else {},
+            targets=tuple(PollTarget(url, tuple(devices)) for url, devices in targets.items()),
+            schema=schema,
+        ))
+    return plans
+
+
+def get_rest_poll_plans():
+    return config_cache.cached("rest_poll_plans", build_rest_poll_plans)
+
+
+def response_records(target, document, timestamp):
+    """Turn a decoded response into push-style records for store_records, which applies the scale."""
+    records = []
+    for device in target.devices:
+        values = {}
+        for field in device.fields:
+            value = extract(document, field.path)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[field.name] = value
+        records.append({"device": device.device_name, "timestamp": timestamp, "values": values})
+    return records
+
+
+def store_poll_results(plan, records, reachable):
+    if records:
+        store_records(plan.schema, records)
+    set_connector_status("inbound", plan.id, "active" if reachable else "inactive")
+
+
+class RestPollEngine:
+    """Polls the REST inbound connectors in pull mode on one asyncio event loop.
+
+    All requests share one pooled httpx.AsyncClient, so many endpoints are
+    polled concurrently over kept-alive connections. Requests are conditional
+    (If-None-Match / If-Modified-Since from the last response) and a 304 ends
+    the poll. A 200 whose body hashes like the previous one is dropped before
+    decoding, so unchanged vendor data costs one request and one hash.
+    """
+
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+        self.scheduler = DeadlineScheduler("rest-poll")
+        self.client = None
+        self.states = {}
+        self.tasks = set()
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.changed = 0
+        self.failures = 0
+
+    def make_client(self):
+        connections = getattr(settings, "REST_POLL_MAX_CONNECTIONS", 100)
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            timeout=httpx.Timeout(
+                getattr(settings, "HTTP_READ_TIMEOUT", 10), connect=getattr(settings, "HTTP_CONNECT_TIMEOUT", 5)
+            ),
+            follow_redirects=True,
+        )
+
+    async def run(self):
+        self.client = self.make_client()
+        synced_version = None
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    version = config_cache.version()
+                    if version != synced_version:
+                        plans = await sync_to_async(get_rest_poll_plans)()
+                        self.scheduler.sync({plan.id: (plan.interval, plan) for plan in plans})
+                        urls = {target.url for plan in plans for target in plan.targets}
+                        self.states = {url: state for url, state in self.states.items() if url in urls}
+                        synced_version = version
+                except Exception as e:
+                    print(f"⚠ Error loading REST poll plans: {e}")
+
+                for job in self.scheduler.pop_due():
+                    task = asyncio.create_task(self.poll_connector(job))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+
+                delay = self.scheduler.time_until_next()
+                delay = POLL_TICK if delay is None else min(delay, POLL_TICK)
+                await asyncio.to_thread(self.stop_event.wait, delay)
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.client.aclose()
+
+    async def poll_connector(self, job):
+        plan = job.callback
+        started = time.monotonic()
+        try:
+            results = await asyncio.gather(*(self.poll_target(plan, target) for target in plan.targets))
+            records = [record for reachable, target_records in results for record in target_records]
+            reachable = any(reachable for reachable, _ in results) or not plan.targets
+            await sync_to_async(store_poll_results)(plan, records, reachable)
+        except Exception as e:
+            print(f"⚠ Error polling REST connector {plan.name}: {e}")
+        finally:
+            self.scheduler.complete(job, started, time.monotonic())
+
+    async def poll_target(self, plan, target):
+        """Return (reachable, records), records empty when the resource did not change."""
+        headers = dict(plan.headers)
+        state = self.states.get(target.url)
+        if state is not None:
+            if state.etag:
+                headers["If-None-Match"] = state.etag
+            if state.last_modified:
+                headers["If-Modified-Since"] = state.last_modified
+        self.requests += 1
+        try:
+            response = await self.client.get(target.url, headers=headers)
+        except httpx.HTTPError as e:
+            self.failures += 1
+            print(f"   ❌ GET {target.url} failed: {e}")
+            return False, []
+        if response.status_code == 304:
+            self.not_modified += 1
+            return True, []
+        if response.status_code >= 400:
+            self.failures += 1
+            print(f"   ⚠ GET {target.url} returned {response.status_code}")
+            return False, []
+
+        body = response.content
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        self.states[target.url] = ResponseState(
+            response.headers.get("ETag"), response.headers.get("Last-Modified"), digest
+        )
+        if state is not None and state.digest == digest:
+            self.unchanged += 1
+            return True, []
+        try:
+            document = plan.schema.codec.decode(body)
+        except ValueError as e:
+            self.failures += 1
+            print(f"   ⚠ Cannot decode response of {target.url}: {e}")
+            return True, []
+        self.changed += 1
+        return True, response_records(target, document, int(time.time() * 1000))
+
+    def stats(self):
+        return {
+            "connectors": len(self.scheduler.stats()),
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "changed": self.changed,
+            "failures": self.failures,
+        }
+
+
+def rest_poll_loop():
+    global rest_poll_engine
+    rest_poll_engine = RestPollEngine(rest_poll_thread_stop_event)
+    try:
+        asyncio.run(rest_poll_engine.run())
+    finally:
+        rest_poll_engine = None
+
+
+def get_rest_poll_stats():
+    """Counters of the running REST poll loop, None while it is not running."""
+    engine = rest_poll_engine
+    return engine.stats() if engine is not None else None
+
+
+def start_rest_poll_loop():
+    global rest_poll_thread
+    if rest_poll_thread and rest_poll_thread.is_alive():
+        return
+    rest_poll_thread_stop_event.clear()
+    rest_poll_thread = threading.Thread(target=rest_poll_loop, daemon=True)
+    rest_poll_thread.start()
+    print("REST poll loop started")
+
+
+def stop_rest_poll_loop():
+    global rest_poll_thread
+    if rest_poll_thread and rest_poll_thread.is_alive():
+        rest_poll_thread_stop_event.set()
+        rest_poll_thread.join(timeout=10)
+    rest_poll_thread = None
@@ -0,0 +1,102 @@
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from Gateway.models import IHG_InboundConnector, IHG_ModbusData, IHG_MQTTData
+from Gateway.scheduler import DeadlineScheduler
+
+retention_thread = None
+retention_thread_stop_event = threading.Event()
+
+# Sample table and per-series partition for each inbound connector type
+SERIES = {
+    "modbus": (IHG_ModbusData, "timeseries__device__connector", ("timeseries_id",)),
+    "rest": (IHG_ModbusData, "timeseries__device__connector", ("timeseries_id",)),
+    "mqtt": (IHG_MQTTData, "device__topic__mqtt_config__connector_inbound", ("device_id", "key")),
+}
+
+
+def get_retention_policy(connector):
+    """Return (max points per series, max age in seconds) for a connector, 0 meaning unlimited."""
+    try:
+        max_points = int(connector.maximum_data_points or 0)
+    except (TypeError, ValueError):
+        max_points = 0
+    config = connector.configuration if isinstance(connector.configuration, dict) else {}
+    max_age = config.get("retention_seconds")
+    if max_age is None:  # an explicit 0 turns age-based retention off for this connector
+        max_age = getattr(settings, "DATA_RETENTION_SECONDS", 0)
+    try:
+        max_age = float(max_age or 0)
+    except (TypeError, ValueError):
+        max_age = 0
+    return max(max_points, 0), max(max_age, 0)
+
+
+def compact_connector(connector, now=None):
+    """Trim a connector's samples with at most one set-based DELETE per policy.
+
+    Returns the number of rows deleted.
+    """
+    if connector.connector_type not in SERIES:
+        return 0
+    model, connector_path, partition = SERIES[connector.connector_type]
+    max_points, max_age = get_retention_policy(connector)
+    samples = model.objects.filter(**{connector_path: connector})
+    deleted = 0
+
+    if max_age:
+        cutoff = (now or timezone.now()) - timedelta(seconds=max_age)
+        deleted += samples.filter(timestamp__lt=cutoff).delete()[0]
+
+    if max_points:
+        overflow = samples.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F(field) for field in partition],
+                order_by=[F("timestamp").desc(), F("id").desc()],
+            )
+        ).filter(row_number__gt=max_points).values("id")
+        deleted += model.objects.filter(id__in=overflow).delete()[0]
+
+    return deleted
+
+
+def compact_all():
+    close_old_connections()
+    total = 0
+    for connector in IHG_InboundConnector.objects.filter(connector_type__in=SERIES):
+        try:
+            total += compact_connector(connector)
+        except Exception as e:
+            print(f"⚠ Error compacting data of connector {connector.name}: {e}")
+    if total:
+        print(f"🧹 Retention removed {total} samples")
+    return total
+
+
+def retention_loop():
+    scheduler = DeadlineScheduler("retention")
+    scheduler.add("compact", getattr(settings, "RETENTION_INTERVAL", 60), compact_all)
+    scheduler.run(retention_thread_stop_event)
+
+
+def start_retention_loop():
+    global retention_thread
+    if retention_thread and retention_thread.is_alive():
+        return
+    retention_thread_stop_event.clear()
+    retention_thread = threading.Thread(target=retention_loop, daemon=True)
+    retention_thread.start()
+    print("Retention loop started")
+
+
+def stop_retention_loop():
+    global retention_thread
+    if retention_thread and retention_thread.is_alive():
+        retention_thread_stop_event.set()
+        retention_thread.join(timeout=10)
+    retention_thread = None
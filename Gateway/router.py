@@ -0,0 +1,77 @@
+import threading
+from django.conf import settings
+from Gateway.bounded_queue import OVERFLOW_POLICIES
+from Gateway.outbound import outbound_manager
+from Gateway.worker_pool import WorkerPool
+
+
+def get_queue_options(plan):
+    """(queue size, overflow policy, block timeout) of an outbound connector's router queue."""
+    configuration = plan.configuration if isinstance(plan.configuration, dict) else {}
+    try:
+        size = int(configuration.get("queue_size", getattr(settings, "OUTBOUND_QUEUE_SIZE", 10000)))
+    except (TypeError, ValueError):
+        size = 10000
+    overflow = configuration.get("overflow", getattr(settings, "OUTBOUND_QUEUE_OVERFLOW", "drop_oldest"))
+    if overflow not in OVERFLOW_POLICIES:
+        print(f"⚠ Unknown overflow policy {overflow!r} for outbound connector {plan.name}, dropping oldest")
+        overflow = "drop_oldest"
+    return max(size, 1), overflow, getattr(settings, "OUTBOUND_QUEUE_BLOCK_TIMEOUT", 1)
+
+
+class OutboundRouter:
+    """Fan-out between ingest and the outbound connectors.
+
+    Every outbound connector gets its own bounded queue and worker, so
+    ``route`` only appends to memory and returns; encoding, the outbox
+    write and everything after it happen on the connector's worker. A slow
+    or stuck target fills only its own queue, whose overflow policy then
+    decides what to drop. One worker per connector keeps frames in order.
+    Queue settings are read when a connector's queue is created.
+    """
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, plan):
+        with self._lock:
+            pool = self._pools.get(plan.id)
+            if pool is None:
+                size, overflow, block_timeout = get_queue_options(plan)
+                pool = self._pools[plan.id] = WorkerPool(
+                    f"router-{plan.id}",
+                    self.handle,
+                    workers=1,
+                    queue_size=size,
+                    overflow=overflow,
+                    block_timeout=block_timeout,
+                )
+            return pool
+
+    def handle(self, item):
+        plan, frame = item
+        self.deliver(plan, frame)
+
+    def route(self, plan, frame):
+        """Queue a frame for an outbound connector (an OutboundPlan), return False if it was dropped."""
+        if not self.get_pool(plan).submit((plan, frame)):
+            print(f"⚠ Outbound queue of {plan.name} is full, dropped a frame")
+            return False
+        return True
+
+    def retain(self, connector_ids):
+        """Stop the queues of outbound connectors that no longer exist."""
+        with self._lock:
+            stale = [self._pools.pop(key) for key in list(self._pools) if key not in connector_ids]
+        for pool in stale:
+            pool.stop()
+
+    def stats(self):
+        with self._lock:
+            pools = dict(self._pools)
+        return {connector_id: pool.stats() for connector_id, pool in pools.items()}
+
+
+outbound_router = OutboundRouter(outbound_manager.enqueue)
@@ -0,0 +1,132 @@
+import atexit
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from Gateway.bounded_queue import BoundedQueue
+
+
+class SampleWriter:
+    """Single background thread that batches sample inserts from every connector.
+
+    Pollers and MQTT callbacks submit unsaved model instances to a bounded
+    queue; the writer flushes them with bulk_create, one transaction per
+    batch, whenever ``batch_size`` rows are waiting or ``flush_interval``
+    seconds have passed. When the queue is full the overflow policy decides
+    whether producers wait or samples are dropped.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, queue_size=None, overflow=None):
+        self.batch_size = batch_size or getattr(settings, "SAMPLE_WRITER_BATCH_SIZE", 500)
+        self.flush_interval = flush_interval or getattr(settings, "SAMPLE_WRITER_FLUSH_INTERVAL", 1.0)
+        self.queue = BoundedQueue(
+            queue_size or getattr(settings, "SAMPLE_WRITER_QUEUE_SIZE", 50000),
+            overflow or getattr(settings, "SAMPLE_WRITER_OVERFLOW", "block"),
+        )
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.batches = 0
+        self.last_flush_latency = None
+        self.max_flush_latency = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="sample-writer", daemon=True)
+            self.thread.start()
+            atexit.unregister(self.stop)
+            atexit.register(self.stop)
+            print("💾 Sample writer started")
+
+    def stop(self):
+        """Stop the thread and write out whatever is still queued."""
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.flush_interval + 5)
+        self.flush(self.queue.get_batch(len(self.queue), 0))
+
+    def submit(self, sample):
+        """Queue an unsaved IHG_ModbusData / IHG_MQTTData instance for the next batch."""
+        if not self.thread or not self.thread.is_alive():
+            self.start()
+        if not self.queue.put(sample):
+            print(f"⚠ Sample writer queue full ({self.queue.maxsize}), dropped sample")
+            return False
+        return True
+
+    def run(self):
+        while not self.stop_event.is_set():
+            batch = self.queue.get_batch(self.batch_size, self.flush_interval)
+            if batch:
+                self.flush(batch)
+        close_old_connections()
+
+    def flush(self, batch):
+        if not batch:
+            return
+        started = time.monotonic()
+        by_model = {}
+        for sample in batch:
+            by_model.setdefault(type(sample), []).append(sample)
+
+        with self._flush_lock:
+            try:
+                close_old_connections()
+                with transaction.atomic():
+                    for model, rows in by_model.items():
+                        model.objects.bulk_create(rows)
+                written = len(batch)
+            except Exception as e:
+                print(f"❌ Batch insert of {len(batch)} samples failed ({e}), retrying row by row")
+                written = self.insert_rows(batch)
+
+            latency = time.monotonic() - started
+            self.batches += 1
+            self.flushed_rows += written
+            self.failed_rows += len(batch) - written
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+
+    def insert_rows(self, batch):
+        """Insert one row at a time so a single bad sample doesn't lose the whole batch."""
+        written = 0
+        for sample in batch:
+            try:
+                sample.pk = None
+                with transaction.atomic():
+                    type(sample).objects.bulk_create([sample])
+                written += 1
+            except Exception as e:
+                print(f"❌ Dropping {type(sample).__name__} sample: {e}")
+        return written
+
+    def stats(self):
+        return {
+            "queue": self.queue.stats(),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "batches": self.batches,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "running": bool(self.thread and self.thread.is_alive()),
+        }
+
+
+sample_writer = None
+writer_lock = threading.Lock()
+
+
+def get_sample_writer():
+    global sample_writer
+    with writer_lock:
+        if sample_writer is None:
+            sample_writer = SampleWriter()
+        return sample_writer
@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class ScheduledJob:
+    def __init__(self, key, interval, callback, deadline):
+        self.key = key
+        self.interval = interval
+        self.callback = callback
+        self.deadline = deadline
+        self.running = False
+        self.runs = 0
+        self.overruns = 0
+        self.last_duration = None
+
+
+class DeadlineScheduler:
+    """Runs periodic jobs at fixed deadlines kept in a priority queue.
+
+    Next deadlines are derived from the ideal schedule (previous deadline +
+    interval) rather than from completion time, so intervals never drift.
+    A run that ends past its next deadline is reported as an overrun and the
+    missed slots are skipped. Jobs added together with equal intervals get
+    staggered start offsets so they don't all fire at once.
+    """
+
+    def __init__(self, name, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self._jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (job.deadline, next(self._counter), job))
+
+    def add(self, key, interval, callback, offset=0.0):
+        with self._lock:
+            self._remove(key)
+            job = ScheduledJob(key, float(interval), callback, self.clock() + offset)
+            self._jobs[key] = job
+            self._push(job)
+            return job
+
+    def _remove(self, key):
+        # Heap entries of removed jobs are dropped lazily when they surface
+        self._jobs.pop(key, None)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def sync(self, jobs):
+        """Make the job set match ``{key: (interval, callback)}``.
+
+        Unchanged jobs keep their deadlines and just pick up the new callback,
+        jobs whose interval changed are rescheduled, new jobs are staggered.
+        """
+        now = self.clock()
+        with self._lock:
+            for key in list(self._jobs):
+                if key not in jobs:
+                    self._remove(key)
+
+            new_by_interval = {}
+            for key, (interval, callback) in jobs.items():
+                job = self._jobs.get(key)
+                if job and job.interval == float(interval):
+                    job.callback = callback
+                    continue
+                new_by_interval.setdefault(float(interval), []).append((key, callback))
+
+            for interval, new_jobs in new_by_interval.items():
+                for index, (key, callback) in enumerate(new_jobs):
+                    offset = interval * index / len(new_jobs)
+                    self._remove(key)
+                    job = ScheduledJob(key, interval, callback, now + offset)
+                    self._jobs[key] = job
+                    self._push(job)
+
+    def _valid(self, job, deadline):
+        return self._jobs.get(job.key) is job and job.deadline == deadline and not job.running
+
+    def time_until_next(self):
+        """Seconds until the earliest deadline, or None when nothing is scheduled."""
+        with self._lock:
+            while self._heap and not self._valid(self._heap[0][2], self._heap[0][0]):
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - self.clock(), 0.0)
+
+    def pop_due(self):
+        """Remove and return every job whose deadline has passed, marked as running."""
+        now = self.clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, job = heapq.heappop(self._heap)
+                if self._valid(job, deadline):
+                    job.running = True
+                    due.append(job)
+        return due
+
+    def complete(self, job, started, finished):
+        """Reschedule a finished job at its next ideal deadline."""
+        job.runs += 1
+        job.last_duration = finished - started
+        deadline = job.deadline + job.interval
+        if finished > deadline:
+            missed = int((finished - deadline) // job.interval) + 1
+            job.overruns += 1
+            print(f"⏱ {self.name} job {job.key} overran its {job.interval:g}s interval "
+                  f"(took {job.last_duration:.2f}s, skipping {missed} slot(s))")
+            deadline += missed * job.interval
+        with self._lock:
+            job.deadline = deadline
+            job.running = False
+            if self._jobs.get(job.key) is job:
+                self._push(job)
+
+    def run_job(self, job):
+        started = self.clock()
+        try:
+            job.callback()
+        except Exception as e:
+            print(f"⚠ {self.name} job {job.key} failed: {e}")
+        finally:
+            self.complete(job, started, self.clock())
+
+    def run(self, stop_event, refresh=None, max_sleep=1.0):
+        """Run due jobs in the calling thread until stop_event is set.
+
+        ``refresh`` is called on every wake-up (at most every ``max_sleep``
+        seconds) so callers can sync() the job set with their configuration.
+        """
+        while not stop_event.is_set():
+            if refresh:
+                try:
+                    refresh()
+                except Exception as e:
+                    print(f"⚠ {self.name} scheduler refresh failed: {e}")
+            for job in self.pop_due():
+                if stop_event.is_set():
+                    break
+                self.run_job(job)
+            delay = self.time_until_next()
+            stop_event.wait(max_sleep if delay is None else min(delay, max_sleep))
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            return {
+                key: {
+                    "interval": job.interval,
+                    "due_in": round(job.deadline - now, 3),
+                    "running": job.running,
+                    "runs": job.runs,
+                    "overruns": job.overruns,
+                    "last_duration": job.last_duration,
+                }
+                for key, job in self._jobs.items()
+            }
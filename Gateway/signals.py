@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from Gateway import config_cache, status
+from Gateway.models import (
+    IHG_Gateway,
+    IHG_InboundConnector,
+    IHG_OutboundConnector,
+    Device,
+    IHG_Timeseries,
+    IHG_MQTTConfiguration,
+    IHG_MQTTTopic,
+    IHG_MQTTDevice,
+    IHG_MQTTTimeseries,
+)
+
+# Models whose rows make up the gateway configuration
+CONFIG_MODELS = (
+    IHG_Gateway,
+    IHG_InboundConnector,
+    IHG_OutboundConnector,
+    Device,
+    IHG_Timeseries,
+    IHG_MQTTConfiguration,
+    IHG_MQTTTopic,
+    IHG_MQTTDevice,
+    IHG_MQTTTimeseries,
+)
+
+# Runtime state written by the pollers, not configuration
+STATUS_FIELDS = frozenset({"status", "device_status"})
+
+
+def config_changed(sender, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and STATUS_FIELDS.issuperset(update_fields):
+        return
+    config_cache.invalidate()
+    # Inside a transaction, pollers rebuilding now still read the old rows:
+    # invalidate again once the new ones are visible
+    transaction.on_commit(config_cache.invalidate)
+    # Rows may have been re-created with their default status
+    status.clear()
+
+
+for model in CONFIG_MODELS:
+    post_save.connect(config_changed, sender=model, dispatch_uid=f"config_changed_save_{model.__name__}")
+    post_delete.connect(config_changed, sender=model, dispatch_uid=f"config_changed_delete_{model.__name__}")
@@ -0,0 +1,48 @@
+import threading
+from Gateway.models import Device, IHG_Gateway, IHG_InboundConnector, IHG_OutboundConnector
+
+# Last status written per device / (direction, connector), so unchanged
+# statuses cost no query. Cleared whenever the rows may have been re-created.
+_device_status = {}
+_connector_status = {}
+_status_lock = threading.Lock()
+
+CONNECTOR_MODELS = {"inbound": IHG_InboundConnector, "outbound": IHG_OutboundConnector}
+
+
+def clear():
+    """Forget the written statuses, so the next status of every device / connector is written again."""
+    with _status_lock:
+        _device_status.clear()
+        _connector_status.clear()
+
+
+def set_device_status(device_id, status):
+    with _status_lock:
+        if _device_status.get(device_id) == status:
+            return
+        _device_status[device_id] = status
+    Device.objects.filter(id=device_id).update(device_status=status)
+
+
+def set_connector_status(connector_type, connector_id, status, gateway_id=None):
+    """Write a connector's status ("inbound" / "outbound") only when it changes, then its gateway's."""
+    key = (connector_type, connector_id)
+    with _status_lock:
+        if _connector_status.get(key) == status:
+            return
+        _connector_status[key] = status
+    connectors = CONNECTOR_MODELS[connector_type].objects.filter(id=connector_id)
+    connectors.update(status=status)
+    if gateway_id is None:
+        gateway_id = connectors.values_list("gateway_id", flat=True).first()
+    if gateway_id is not None:
+        update_gateway_status(gateway_id)
+
+
+def update_gateway_status(gateway_id):
+    """A gateway is active while any of its inbound or outbound connectors is."""
+    active = any(
+        model.objects.filter(gateway_id=gateway_id, status="active").exists() for model in CONNECTOR_MODELS.values()
+    )
+    IHG_Gateway.objects.filter(id=gateway_id).update(status="active" if active else "inactive")
@@ -1,5 +1,1061 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+import httpx
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.reasoncodes import ReasonCode
+
+from Gateway import config_cache, mqtt, status
+from Gateway.deadband import DeadbandFilter
+from Gateway.http_client import HTTPClientManager
+from Gateway.alias_encoding import AliasSession, decode_data
+from Gateway.bounded_queue import DROP_NEWEST, DROP_OLDEST, BoundedQueue
+from Gateway.models import (
+    Device,
+    IHG_Gateway,
+    IHG_InboundConnector,
+    IHG_OutboundConnector,
+    IHG_ModbusData,
+    IHG_MQTTConfiguration,
+    IHG_MQTTDevice,
+    IHG_MQTTTimeseries,
+    IHG_MQTTTopic,
+    IHG_Timeseries,
+)
+from Gateway.modbus_async import AsyncModbusEngine
+from Gateway.modbus_health import CLOSED, HALF_OPEN, OPEN, DeviceHealth, DeviceHealthRegistry
+from Gateway.modbus_decoder import BlockDecoder, parse_byte_order
+from Gateway.modbus_planner import build_read_plan, get_block_limits, parse_address, split_block
+from Gateway.modbus_pool import ModbusConnectionPool
+from Gateway.mqtt_publisher import PublisherManager
+from Gateway.mqtt_reconciler import ClientReconciler, ClientSpec
+from Gateway.outbound import OutboundDrainer, Rejected, RetryAfter, check_response, pack_record, unpack_records
+from Gateway.outbound_batch import decode_mqtt_envelope, mqtt_envelope
+from Gateway.outbox import Outbox
+from Gateway.payload_codecs import CODECS, get_codec, get_connector_codec
+from Gateway.poll_plan import ConnectorPlan, DevicePlan, GatewayPlan, OutboundPlan, TimeseriesPlan, get_poll_plan
+from Gateway.rest_poller import RestPollEngine, build_rest_poll_plans
+from Gateway.retention import compact_connector, get_retention_policy
+from Gateway.router import OutboundRouter
+from Gateway.sample_writer import SampleWriter
+from Gateway.scheduler import DeadlineScheduler
+from Gateway.topic_trie import TopicTrie
+from Gateway.worker_pool import WorkerPool
+
+
+def make_ts(name, address, data_type="UINT16", scale=1.0, byte_order="ABCD"):
+    return SimpleNamespace(name=name, address=address, data_type=data_type, scale=scale, byte_order=byte_order)
+
 
 class GatewayTests(TestCase):
     def test_example(self):
-        self.assertEqual(1 + 1, 2)  # Example test case to demonstrate structure
\ No newline at end of file
+        self.assertEqual(1 + 1, 2)  # Example test case to demonstrate structure
+
+
+class ModbusReadPlanTests(SimpleTestCase):
+    def test_parse_address(self):
+        self.assertEqual(parse_address("40"), (40, 1))
+        self.assertEqual(parse_address("40,41"), (40, 2))
+
+    def test_contiguous_tags_share_one_block(self):
+        tags = [make_ts("a", "0"), make_ts("b", "1", "UINT32"), make_ts("c", "3", "FLOAT64-IEEE")]
+        blocks = build_read_plan(tags)
+        self.assertEqual([(b.start, b.count) for b in blocks], [(0, 7)])
+
+    def test_gap_and_block_size_split_blocks(self):
+        tags = [make_ts("a", "0"), make_ts("b", "5"), make_ts("c", "8")]
+        self.assertEqual(len(build_read_plan(tags, max_gap=0)), 3)
+        self.assertEqual([(b.start, b.count) for b in build_read_plan(tags, max_gap=4)], [(0, 9)])
+        self.assertEqual([(b.start, b.count) for b in build_read_plan(tags, max_block_size=6, max_gap=4)],
+                         [(0, 6), (8, 1)])
+
+    def test_split_block_returns_registers_per_tag(self):
+        tags = [make_ts("a", "10"), make_ts("b", "11", "INT32")]
+        block = build_read_plan(tags)[0]
+        split = {ts.name: regs for ts, regs in split_block(block, [7, 1, 2])}
+        self.assertEqual(split, {"a": [7], "b": [1, 2]})
+
+    def test_block_limits_ignore_a_malformed_configuration(self):
+        self.assertEqual(get_block_limits(SimpleNamespace(configuration={"max_block_size": 20, "max_gap": 3})), (20, 3))
+        for configuration in (None, ["max_gap"], "max_gap=3"):
+            self.assertEqual(get_block_limits(SimpleNamespace(configuration=configuration)), (125, 0))
+
+
+class ModbusDecoderTests(SimpleTestCase):
+    def decode(self, tags, registers):
+        block = build_read_plan(tags)[0]
+        decoder = BlockDecoder(block)
+        return {block.tags[p].timeseries.name: v for p, v in zip(decoder.positions, decoder.decode(registers))}
+
+    def test_parse_byte_order(self):
+        self.assertEqual(parse_byte_order("ABCD"), (False, False))
+        self.assertEqual(parse_byte_order("CDAB"), (True, False))
+        self.assertEqual(parse_byte_order("DCBA"), (True, True))
+        self.assertEqual(parse_byte_order("BA"), (False, True))
+        self.assertEqual(parse_byte_order("GHEFCDAB"), (True, False))
+
+    def test_decode_mixed_block(self):
+        tags = [
+            make_ts("i16", "0", "INT16", scale=0.1),
+            make_ts("u32_cdab", "1", "UINT32", byte_order="CDAB"),
+            make_ts("f32", "3", "FLOAT32-IEEE"),
+            make_ts("i32_dcba", "5", "INT32", byte_order="DCBA"),
+            make_ts("f64_ghef", "7", "FLOAT64-IEEE", byte_order="GHEFCDAB"),
+        ]
+        # -5, 0x00020001 word swapped, 1.5f, -2 little endian, 2.5d word swapped
+        registers = [0xFFFB, 0x0001, 0x0002, 0x3FC0, 0x0000, 0xFEFF, 0xFFFF, 0x0000, 0x0000, 0x0000, 0x4004]
+        values = self.decode(tags, registers)
+        self.assertAlmostEqual(values["i16"], -0.5)
+        self.assertEqual(values["u32_cdab"], 0x00020001)
+        self.assertEqual(values["f32"], 1.5)
+        self.assertEqual(values["i32_dcba"], -2)
+        self.assertEqual(values["f64_ghef"], 2.5)
+
+    def test_fixed_width_follows_address_list(self):
+        values = self.decode([make_ts("fixed", "0,1", "FIXED", scale=0.01)], [0xFFFF, 0xFF9C])
+        self.assertAlmostEqual(values["fixed"], -1.0)
+
+    def test_undecodable_tag_is_skipped(self):
+        values = self.decode([make_ts("a", "0"), make_ts("bad", "1,2,3", "FIXED")], [1, 2, 3, 4])
+        self.assertEqual(values, {"a": 1.0})
+
+
+class PollPlanTests(TestCase):
+    def setUp(self):
+        self.gateway = IHG_Gateway.objects.create(name="gw")
+        self.connector = IHG_InboundConnector.objects.create(
+            name="plc", gateway=self.gateway, connector_type="modbus", interval="10"
+        )
+        self.device = Device.objects.create(
+            connector=self.connector, device_name="d1", device_id="1", device_ip="10.0.0.1", device_port=502
+        )
+        IHG_Timeseries.objects.create(device=self.device, name="a", scale=1, address="0", data_type="UINT16")
+
+    def test_plan_is_cached_until_configuration_changes(self):
+        plan = get_poll_plan()
+        self.assertEqual([d.device_name for d in plan.connectors[0].devices], ["d1"])
+        with self.assertNumQueries(0):
+            self.assertIs(get_poll_plan(), plan)
+
+        IHG_Timeseries.objects.create(device=self.device, name="b", scale=1, address="1", data_type="UINT16")
+        plan = get_poll_plan()
+        self.assertEqual(plan.connectors[0].devices[0].blocks[0].count, 2)
+
+    def test_status_updates_do_not_invalidate(self):
+        version = config_cache.version()
+        self.connector.status = "active"
+        self.connector.save(update_fields=["status"])
+        self.assertEqual(config_cache.version(), version)
+
+    def test_plan_built_during_a_transaction_is_rebuilt_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            IHG_Timeseries.objects.create(device=self.device, name="b", scale=1, address="1", data_type="UINT16")
+            stale = get_poll_plan()  # another thread would still see one timeseries here
+        self.assertIsNot(get_poll_plan(), stale)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeModbusTcpClient:
+    """Stands in for pymodbus' ModbusTcpClient, the socket "closes" when the test says so."""
+
+    instances = []
+
+    def __init__(self, host, port=502, timeout=None):
+        self.host = host
+        self.open = False
+        self.socket = None
+        self.connects = 0
+        self.reads = []
+        FakeModbusTcpClient.instances.append(self)
+
+    def is_socket_open(self):
+        return self.open
+
+    def connect(self):
+        self.connects += 1
+        self.open = self.host != "10.0.0.99"
+        return self.open
+
+    def read_holding_registers(self, address, count, device_id):
+        self.reads.append((address, count, device_id))
+        return SimpleNamespace(isError=lambda: False, registers=[0] * count)
+
+    def close(self):
+        self.open = False
+
+
+@mock.patch("Gateway.modbus_pool.ModbusTcpClient", FakeModbusTcpClient)
+class ModbusConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        FakeModbusTcpClient.instances = []
+        self.pool = ModbusConnectionPool(idle_timeout=30)
+
+    def test_one_client_per_endpoint_and_unit(self):
+        conn = self.pool.acquire("10.0.0.1", 502, 1)
+        self.assertIs(self.pool.acquire("10.0.0.1", "502", 1), conn)
+        self.assertIsNot(self.pool.acquire("10.0.0.1", 502, 2), conn)
+        self.assertEqual(len(FakeModbusTcpClient.instances), 2)
+        self.assertEqual(conn.client.connects, 1)
+        conn.read_holding_registers(4, 2)
+        self.assertEqual(conn.client.reads, [(4, 2, 1)])
+
+    def test_reconnects_lazily_after_the_socket_closed(self):
+        conn = self.pool.acquire("10.0.0.1", 502)
+        conn.client.open = False  # closed by the peer
+        self.assertIs(self.pool.acquire("10.0.0.1", 502), conn)
+        self.assertEqual(conn.client.connects, 2)
+        self.assertIsNone(self.pool.acquire("10.0.0.99", 502))
+
+    def test_discard_opens_a_fresh_client(self):
+        conn = self.pool.acquire("10.0.0.1", 502)
+        self.pool.discard(conn)  # after a read error
+        self.assertFalse(conn.client.open)
+        fresh = self.pool.acquire("10.0.0.1", 502)
+        self.assertIsNot(fresh, conn)
+        self.assertEqual(len(FakeModbusTcpClient.instances), 2)
+
+    def test_close_idle_and_close_all(self):
+        idle = self.pool.acquire("10.0.0.1", 502)
+        busy = self.pool.acquire("10.0.0.2", 502)
+        idle.last_used -= 60
+        self.pool.close_idle()
+        self.assertFalse(idle.client.open)
+        self.assertTrue(busy.client.open)
+        self.assertIs(self.pool.acquire("10.0.0.2", 502), busy)
+        self.pool.close_all()
+        self.assertFalse(busy.client.open)
+        self.assertIsNot(self.pool.acquire("10.0.0.2", 502), busy)
+
+
+class FakeModbusEndpoints:
+    """Stands in for pymodbus' AsyncModbusTcpClient and records how reads overlap."""
+
+    def __init__(self, unreachable=()):
+        self.unreachable = set(unreachable)
+        self.active = 0
+        self.max_active = 0
+        self.active_per_endpoint = {}
+        self.max_per_endpoint = 0
+        self.connects = 0
+
+    def client_class(self):
+        endpoints = self
+
+        class FakeClient:
+            def __init__(self, host, port=502, timeout=None, reconnect_delay=None):
+                self.endpoint = (host, port)
+                self.connected = False
+
+            async def connect(self):
+                endpoints.connects += 1
+                self.connected = self.endpoint[0] not in endpoints.unreachable
+
+            async def read_holding_registers(self, address, count, device_id):
+                endpoints.active += 1
+                endpoints.active_per_endpoint[self.endpoint] = endpoints.active_per_endpoint.get(self.endpoint, 0) + 1
+                endpoints.max_active = max(endpoints.max_active, endpoints.active)
+                endpoints.max_per_endpoint = max(endpoints.max_per_endpoint, endpoints.active_per_endpoint[self.endpoint])
+                await asyncio.sleep(0.01)
+                endpoints.active -= 1
+                endpoints.active_per_endpoint[self.endpoint] -= 1
+                return SimpleNamespace(isError=lambda: False, registers=[address + 1] * count)
+
+            def close(self):
+                self.connected = False
+
+        return FakeClient
+
+
+def make_device_plan(device_id, ip, port=502, unit_id=1):
+    ts = TimeseriesPlan(device_id * 10, f"ts{device_id}", 1.0, "4", "AB", "UINT16", None, "absolute", None)
+    return DevicePlan(device_id, f"d{device_id}", ip, port, unit_id, 1.0, 1.0, tuple(build_read_plan([ts])))
+
+
+class AsyncModbusEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.endpoints = FakeModbusEndpoints(unreachable={"10.0.0.99"})
+        patches = [
+            mock.patch("Gateway.modbus_async.AsyncModbusTcpClient", self.endpoints.client_class()),
+            mock.patch("Gateway.modbus_async.device_health", DeviceHealthRegistry()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def poll_all(self, engine, devices):
+        async def poll():
+            engine.semaphore = asyncio.Semaphore(engine.max_concurrency)
+            return await asyncio.gather(*(engine.poll_device(device) for device in devices))
+        return asyncio.run(poll())
+
+    def test_semaphore_caps_concurrent_reads(self):
+        engine = AsyncModbusEngine(threading.Event(), max_concurrency=2)
+        results = self.poll_all(engine, [make_device_plan(i, f"10.0.0.{i}") for i in range(1, 7)])
+        self.assertEqual(self.endpoints.max_active, 2)
+        self.assertTrue(all(samples for _, samples in results))
+
+    def test_same_endpoint_is_read_one_at_a_time(self):
+        engine = AsyncModbusEngine(threading.Event(), max_concurrency=10)
+        devices = [make_device_plan(i, "10.0.0.1", unit_id=i) for i in range(1, 5)]
+        devices.append(make_device_plan(9, "10.0.0.2"))
+        self.poll_all(engine, devices)
+        self.assertEqual(self.endpoints.max_per_endpoint, 1)
+        self.assertEqual(self.endpoints.max_active, 2)  # the other endpoint still runs alongside
+
+    def test_unreachable_device_backs_off(self):
+        engine = AsyncModbusEngine(threading.Event())
+        device = make_device_plan(1, "10.0.0.99")
+        with self.settings(MODBUS_BREAKER_FAILURE_THRESHOLD=1):
+            self.assertEqual(self.poll_all(engine, [device]), [(device, None)])
+            self.assertEqual(self.poll_all(engine, [device]), [(device, None)])
+        self.assertEqual(self.endpoints.connects, 1)  # the second cycle skipped the device
+
+    def test_removed_and_idle_clients_are_closed(self):
+        engine = AsyncModbusEngine(threading.Event())
+        kept, removed, idle = (make_device_plan(i, f"10.0.0.{i}") for i in range(1, 4))
+        self.poll_all(engine, [kept, removed, idle])
+        clients = dict(engine.clients)
+        engine.retain_clients({("10.0.0.1", 502, 1), ("10.0.0.3", 502, 1)})
+        self.assertFalse(clients[("10.0.0.2", 502, 1)].connected)
+        engine.last_used[("10.0.0.3", 502, 1)] -= 600
+        engine.close_idle_clients()
+        self.assertEqual(list(engine.clients), [("10.0.0.1", 502, 1)])
+        self.assertFalse(clients[("10.0.0.3", 502, 1)].connected)
+        self.assertTrue(clients[("10.0.0.1", 502, 1)].connected)
+
+    @mock.patch("Gateway.modbus.update_connector_status")
+    @mock.patch("Gateway.modbus.set_device_status")
+    @mock.patch("Gateway.modbus.get_sample_writer")
+    def test_samples_reach_the_writer(self, get_writer, set_device_status, update_connector_status):
+        engine = AsyncModbusEngine(threading.Event())
+        engine.semaphore = asyncio.Semaphore(engine.max_concurrency)
+        device = make_device_plan(1, "10.0.0.1")
+        connector = ConnectorPlan(1, "plc", None, 5, GatewayPlan(1, "gw"), (device,), ())
+        job = engine.scheduler.add(connector.id, connector.interval, connector)
+        with mock.patch("Gateway.modbus_async.sync_to_async", lambda fn: mock.AsyncMock(side_effect=fn)):
+            asyncio.run(engine.poll_connector(job))
+        sample = get_writer.return_value.submit.call_args.args[0]
+        self.assertEqual((sample.timeseries_id, sample.value), (10, 5))
+        set_device_status.assert_called_once_with(device, "active")
+        update_connector_status.assert_called_once_with(connector, True)
+
+
+class DeadlineSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = DeadlineScheduler("test", clock=self.clock)
+
+    def test_equal_intervals_are_staggered(self):
+        self.scheduler.sync({"a": (10, None), "b": (10, None)})
+        self.assertEqual([job.key for job in self.scheduler.pop_due()], ["a"])
+        self.clock.now = 105.0
+        self.assertEqual([job.key for job in self.scheduler.pop_due()], ["b"])
+
+    def test_deadlines_follow_ideal_schedule(self):
+        job = self.scheduler.add("a", 10, None)
+        self.scheduler.pop_due()
+        self.scheduler.complete(job, started=100.0, finished=103.0)
+        self.assertEqual(job.deadline, 110.0)
+        self.assertEqual(job.overruns, 0)
+
+    def test_overrun_skips_missed_slots(self):
+        job = self.scheduler.add("a", 10, None)
+        self.scheduler.pop_due()
+        self.scheduler.complete(job, started=100.0, finished=125.0)
+        self.assertEqual(job.deadline, 130.0)
+        self.assertEqual(job.overruns, 1)
+
+    def test_sync_keeps_deadline_of_unchanged_jobs(self):
+        self.scheduler.sync({"a": (10, "old")})
+        job = self.scheduler.pop_due()[0]
+        self.scheduler.complete(job, 100.0, 101.0)
+        self.scheduler.sync({"a": (10, "new"), "b": (5, None)})
+        self.assertEqual(job.deadline, 110.0)
+        self.assertEqual(job.callback, "new")
+        self.assertEqual([j.key for j in self.scheduler.pop_due()], ["b"])
+
+
+class DeviceHealthTests(SimpleTestCase):
+    def test_breaker_opens_backs_off_and_probes(self):
+        health = DeviceHealth(1, failure_threshold=2, base_delay=10, max_delay=60, jitter=0)
+        with mock.patch("Gateway.modbus_health.time.monotonic", return_value=0):
+            health.record_failure("timeout")
+            self.assertEqual(health.state, CLOSED)
+            health.record_failure("timeout")
+            self.assertEqual(health.state, OPEN)
+            self.assertFalse(health.allow_request())
+            self.assertIsNotNone(health.snapshot()["backing_off_until"])
+
+        with mock.patch("Gateway.modbus_health.time.monotonic", return_value=10):
+            self.assertTrue(health.allow_request())
+            self.assertEqual(health.state, HALF_OPEN)
+            health.record_failure("timeout")
+            self.assertEqual(health.retry_at, 30)  # backoff doubled
+
+        health.record_success()
+        self.assertEqual(health.state, CLOSED)
+        self.assertTrue(health.allow_request())
+
+
+class BoundedQueueTests(SimpleTestCase):
+    def test_overflow_policies(self):
+        queue = BoundedQueue(2, DROP_OLDEST)
+        for item in (1, 2, 3):
+            self.assertTrue(queue.put(item))
+        self.assertEqual(queue.get_batch(10, 0), [2, 3])
+
+        queue = BoundedQueue(2, DROP_NEWEST)
+        results = [queue.put(item) for item in (1, 2, 3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(queue.stats()["dropped"], 1)
+        self.assertEqual(queue.get_batch(1, 0), [1])
+
+
+class SampleWriterTests(TestCase):
+    def setUp(self):
+        gateway = IHG_Gateway.objects.create(name="gw")
+        connector = IHG_InboundConnector.objects.create(
+            name="plc", gateway=gateway, connector_type="modbus", maximum_data_points="2"
+        )
+        device = Device.objects.create(
+            connector=connector, device_name="d1", device_id="1", device_ip="10.0.0.1", device_port=502
+        )
+        self.ts = IHG_Timeseries.objects.create(device=device, name="a", scale=1, address="0", data_type="UINT16")
+
+    def test_flush_writes_batch(self):
+        writer = SampleWriter(batch_size=10, flush_interval=0.1, queue_size=10)
+        with self.assertNumQueries(3):  # savepoint, INSERT, release
+            writer.flush([IHG_ModbusData(timeseries_id=self.ts.id, value=value) for value in (1, 2, 3)])
+        self.assertEqual(IHG_ModbusData.objects.count(), 3)
+        stats = writer.stats()
+        self.assertEqual((stats["batches"], stats["flushed_rows"]), (1, 3))
+
+    def test_bad_row_does_not_lose_batch(self):
+        writer = SampleWriter(batch_size=10, flush_interval=0.1, queue_size=10)
+        writer.flush([IHG_ModbusData(timeseries_id=self.ts.id, value=1), IHG_ModbusData(timeseries_id=self.ts.id, value=None)])
+        self.assertEqual(list(IHG_ModbusData.objects.values_list("value", flat=True)), [1])
+        self.assertEqual(writer.stats()["failed_rows"], 1)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        gateway = IHG_Gateway.objects.create(name="gw")
+        self.connector = IHG_InboundConnector.objects.create(
+            name="plc", gateway=gateway, connector_type="modbus", maximum_data_points="2"
+        )
+        device = Device.objects.create(
+            connector=self.connector, device_name="d1", device_id="1", device_ip="10.0.0.1", device_port=502
+        )
+        self.a = IHG_Timeseries.objects.create(device=device, name="a", scale=1, address="0", data_type="UINT16")
+        self.b = IHG_Timeseries.objects.create(device=device, name="b", scale=1, address="1", data_type="UINT16")
+
+    def add_samples(self, ts, ages):
+        now = timezone.now()
+        IHG_ModbusData.objects.bulk_create(
+            IHG_ModbusData(timeseries=ts, value=age, timestamp=now - timedelta(seconds=age)) for age in ages
+        )
+
+    def test_keeps_newest_points_per_series(self):
+        self.add_samples(self.a, [1, 2, 3, 4])
+        self.add_samples(self.b, [5])
+        with self.assertNumQueries(1):
+            self.assertEqual(compact_connector(self.connector), 2)
+        kept = IHG_ModbusData.objects.order_by("timeseries_id", "value").values_list("timeseries__name", "value")
+        self.assertEqual(list(kept), [("a", 1), ("a", 2), ("b", 5)])
+
+    def test_drops_samples_older_than_retention_seconds(self):
+        self.connector.maximum_data_points = "0"
+        self.connector.configuration = {"retention_seconds": 60}
+        self.add_samples(self.a, [10, 120, 300])
+        self.assertEqual(compact_connector(self.connector), 2)
+        self.assertEqual(list(IHG_ModbusData.objects.values_list("value", flat=True)), [10])
+
+    def test_explicit_zero_retention_overrides_the_global_setting(self):
+        self.connector.maximum_data_points = "0"
+        self.connector.configuration = {"retention_seconds": 0}
+        self.add_samples(self.a, [10, 120])
+        with self.settings(DATA_RETENTION_SECONDS=60):
+            self.assertEqual(get_retention_policy(self.connector), (0, 0))
+            self.assertEqual(compact_connector(self.connector), 0)
+
+
+class DeadbandFilterTests(SimpleTestCase):
+    def test_absolute_deadband_with_heartbeat(self):
+        clock = FakeClock()
+        deadband = DeadbandFilter(clock=clock)
+        report = lambda value: deadband.should_report("t", value, deadband=0.5, heartbeat=60)
+        self.assertEqual([report(v) for v in (10, 10.3, 10.4, 10.6)], [True, False, False, True])
+        clock.now += 60
+        self.assertTrue(report(10.6))  # heartbeat
+        self.assertEqual(deadband.stats()["suppressed"], 2)
+
+    def test_percent_deadband_compares_with_last_reported_value(self):
+        deadband = DeadbandFilter(clock=FakeClock())
+        report = lambda value: deadband.should_report("t", value, deadband=10, mode="percent")
+        self.assertEqual([report(v) for v in (100, 105, 109, 111, 120)], [True, False, False, True, False])
+
+    def test_no_deadband_reports_everything(self):
+        deadband = DeadbandFilter(clock=FakeClock())
+        self.assertTrue(all(deadband.should_report("t", 1) for _ in range(3)))
+
+
+class TopicTrieTests(SimpleTestCase):
+    def setUp(self):
+        self.trie = TopicTrie()
+        for topic_filter in ("sensor/+/data", "sensor/#", "sensor/a/data", "#", "+/+", "$SYS/#"):
+            self.trie.insert(topic_filter, topic_filter)
+
+    def test_wildcards(self):
+        self.assertCountEqual(self.trie.match("sensor/a/data"), ["sensor/+/data", "sensor/#", "sensor/a/data", "#"])
+        self.assertCountEqual(self.trie.match("sensor"), ["sensor/#", "#"])
+        self.assertCountEqual(self.trie.match("other/x"), ["#", "+/+"])
+
+    def test_dollar_topics_need_explicit_first_level(self):
+        self.assertEqual(self.trie.match("$SYS/broker/uptime"), ["$SYS/#"])
+
+    def test_rejects_invalid_filters(self):
+        with self.assertRaises(ValueError):
+            self.trie.insert("a/#/b", None)
+        with self.assertRaises(ValueError):
+            self.trie.insert("a/b+", None)
+
+
+class MQTTRoutingTests(TestCase):
+    def setUp(self):
+        gateway = IHG_Gateway.objects.create(name="gw")
+        self.connector = IHG_InboundConnector.objects.create(name="mq", gateway=gateway, connector_type="mqtt")
+        config = IHG_MQTTConfiguration.objects.create(connector_inbound=self.connector)
+        topic = IHG_MQTTTopic.objects.create(mqtt_config=config, name="plant/+/data")
+        self.device = IHG_MQTTDevice.objects.create(topic=topic, device_name="node1")
+        IHG_MQTTTimeseries.objects.create(device=self.device, key="temp", type="Double")
+
+    def deliver(self, topic, values):
+        payload = json.dumps({"node": "node1", "values": values}).encode()
+        mqtt.process_inbound_message(mqtt.IngestMessage(self.connector.id, topic, payload, 0))
+
+    @mock.patch("Gateway.mqtt.get_sample_writer")
+    def test_messages_are_routed_without_queries(self, get_writer):
+        self.deliver("plant/a/data", {"temp": 1})
+        with self.assertNumQueries(0):
+            self.deliver("plant/b/data", {"temp": 2, "unknown": 3})
+            self.deliver("other/b/data", {"temp": 4})
+        samples = [call.args[0] for call in get_writer.return_value.submit.call_args_list]
+        self.assertEqual([(s.device_id, s.key, s.value) for s in samples], [(self.device.id, "temp", 1), (self.device.id, "temp", 2)])
+        self.connector.refresh_from_db()
+        self.assertEqual(self.connector.status, "active")
+
+    def test_shared_subscription(self):
+        self.connector.configuration = {"shared_group": "ingest", "mqtt_protocol": "5"}
+        group, protocol = mqtt.get_subscription_options(self.connector)
+        self.assertEqual((group, protocol), ("ingest", mqtt.mqtt.MQTTv5))
+        client = mock.Mock()
+        userdata = {"topics": ["plant/+/data"], "connector_id": self.connector.id, "type": "inbound", "shared_group": group}
+        mqtt.on_connect(client, userdata, None, ReasonCode(PacketTypes.CONNACK, identifier=0), None)
+        client.subscribe.assert_called_once_with("$share/ingest/plant/+/data")
+
+    @skipUnless("msgpack" in CODECS, "msgpack is not installed")
+    @mock.patch("Gateway.mqtt.get_sample_writer")
+    def test_payload_is_decoded_with_connector_codec(self, get_writer):
+        self.connector.configuration = {"codec": "msgpack"}
+        self.connector.save()
+        payload = get_codec("msgpack").encode({"node": "node1", "values": {"temp": 5}})
+        mqtt.process_inbound_message(mqtt.IngestMessage(self.connector.id, "plant/a/data", payload, 0))
+        self.assertEqual(get_writer.return_value.submit.call_args.args[0].value, 5)
+
+
+class WorkerPoolTests(SimpleTestCase):
+    def test_partitions_keep_order(self):
+        handled = []
+        done = threading.Event()
+
+        def handler(item):
+            handled.append(item)
+            if len(handled) == 6:
+                done.set()
+
+        pool = WorkerPool("test", handler, workers=3, queue_size=30)
+        for index in range(6):
+            pool.submit(("a" if index % 2 else "b", index), partition="a" if index % 2 else "b")
+        self.assertTrue(done.wait(5))
+        pool.stop()
+        self.assertEqual([index for key, index in handled if key == "a"], [1, 3, 5])
+        self.assertEqual(pool.stats()["processed"], 6)
+
+
+class PublisherManagerTests(SimpleTestCase):
+    @mock.patch("Gateway.mqtt_publisher.MQTTPublisher")
+    def test_reuses_client_until_broker_changes(self, publisher_cls):
+        publisher_cls.side_effect = lambda config: mock.Mock(params=(config.broker_ip, config.port, "", ""))
+        manager = PublisherManager()
+        config = SimpleNamespace(id=1, broker_ip="10.0.0.1", port=1883, username="", password="")
+        first = manager.get(config)
+        self.assertIs(manager.get(config), first)
+
+        moved = manager.get(SimpleNamespace(id=1, broker_ip="10.0.0.2", port=1883, username="", password=""))
+        self.assertIsNot(moved, first)
+        first.close.assert_called_once()
+
+        manager.retain(set())
+        moved.close.assert_called_once()
+
+
+class OutboxTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_read_ack_and_resume_after_restart(self):
+        outbox = Outbox(self.directory, segment_bytes=32)
+        for index in range(5):
+            outbox.append(f"message-{index}".encode())
+        records, position = outbox.read(2)
+        self.assertEqual(records, [b"message-0", b"message-1"])
+        self.assertEqual(outbox.read(2)[0], records)  # not consumed until acked
+        outbox.ack(position)
+        outbox.close()
+
+        outbox = Outbox(self.directory, segment_bytes=32)
+        self.assertEqual(outbox.read(10)[0], [b"message-2", b"message-3", b"message-4"])
+
+    def test_torn_tail_is_truncated(self):
+        outbox = Outbox(self.directory)
+        outbox.append(b"complete")
+        outbox.close()
+        segment = os.path.join(self.directory, "000000000000.log")
+        with open(segment, "ab") as f:
+            f.write(b"\x00\x00\x00\x10partial")
+
+        outbox = Outbox(self.directory)
+        outbox.append(b"next")
+        self.assertEqual(outbox.read(10)[0], [b"complete", b"next"])
+
+    def test_size_cap_discards_oldest_segments(self):
+        outbox = Outbox(self.directory, segment_bytes=20, max_bytes=60)
+        for index in range(10):
+            outbox.append(b"0123456789" + bytes([48 + index]))
+        records = outbox.read(100)[0]
+        self.assertEqual(records[-1], b"01234567899")
+        self.assertLess(len(records), 10)
+        self.assertGreater(outbox.stats()["dropped_bytes"], 0)
+
+    @mock.patch("Gateway.outbox.os.fsync")
+    def test_appends_and_cursor_are_fsynced(self, fsync):
+        outbox = Outbox(self.directory, fsync_interval=3600)
+        outbox.append(b"a")
+        outbox.append(b"b")
+        self.assertEqual(fsync.call_count, 0)  # within the fsync interval
+        outbox.ack(outbox.read(1)[1])
+        self.assertEqual(fsync.call_count, 2)  # cursor file, then its directory
+        outbox.close()
+        self.assertEqual(fsync.call_count, 3)  # the pending appends
+
+        outbox = Outbox(self.directory, fsync_interval=0)
+        outbox.append(b"c")
+        self.assertEqual(fsync.call_count, 4)
+
+
+class OutboundBatchingTests(SimpleTestCase):
+    def test_mqtt_envelope_roundtrip(self):
+        payload = mqtt_envelope([b'{"a":1}', b'{"b":2}'], "gzip")
+        self.assertTrue(payload.startswith(b"IHGBATCH/1 encoding=gzip codec=json frames=2\n"))
+        self.assertEqual(json.loads(decode_mqtt_envelope(payload)), {"frames": [{"a": 1}, {"b": 2}]})
+
+    @mock.patch.object(OutboundDrainer, "set_status")
+    @mock.patch("Gateway.http_client.requests.Session.request")
+    def test_frames_are_batched_into_one_request(self, request, set_status):
+        request.return_value.status_code = 200
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        configuration = {"batch_max_bytes": 4096, "linger_ms": 200, "compression": "zlib"}
+        plan = OutboundPlan(1, "out", "rest", configuration, "http://example.invalid/", "POST", None, get_codec("json"))
+        with self.settings(OUTBOX_DIR=directory):
+            drainer = OutboundDrainer(plan)
+            for index in range(3):
+                drainer.enqueue({"index": index})
+            for _ in range(100):
+                if drainer.sent:
+                    break
+                time.sleep(0.02)
+            drainer.stop()
+
+        request.assert_called_once()
+        headers = request.call_args.kwargs["headers"]
+        self.assertEqual((headers["X-Frame-Count"], headers["Content-Encoding"]), ("3", "deflate"))
+        body = json.loads(zlib.decompress(request.call_args.kwargs["data"]))
+        self.assertEqual([frame["index"] for frame in body["frames"]], [0, 1, 2])
+
+    @mock.patch.object(OutboundDrainer, "set_status")
+    @mock.patch("Gateway.http_client.requests.Session.request")
+    def test_catchup_rate_only_paces_a_backlog(self, request, set_status):
+        request.return_value.status_code = 200
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        plan = OutboundPlan(1, "out", "rest", {"catchup_rate": 0.2}, "http://example.invalid/", "POST", None, get_codec("json"))
+        with self.settings(OUTBOX_DIR=directory):
+            drainer = OutboundDrainer(plan)
+            for index in range(2):
+                drainer.enqueue({"index": index})
+                for _ in range(100):
+                    if drainer.sent > index:
+                        break
+                    time.sleep(0.02)
+            drainer.stop()
+        self.assertEqual(drainer.sent, 2)
+
+    @mock.patch.object(OutboundDrainer, "set_status")
+    @mock.patch("Gateway.http_client.requests.Session.request")
+    def test_bulk_mode_posts_gzipped_ndjson(self, request, set_status):
+        request.return_value.status_code = 200
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        plan = OutboundPlan(1, "bulk", "rest", {"rest_mode": "bulk", "linger_ms": 100}, "http://example.invalid/", "POST", None, get_codec("json"))
+        with self.settings(OUTBOX_DIR=directory):
+            drainer = OutboundDrainer(plan)
+            for index in range(3):
+                drainer.enqueue({"index": index})
+            for _ in range(100):
+                if drainer.sent:
+                    break
+                time.sleep(0.02)
+            drainer.stop()
+
+        headers = request.call_args.kwargs["headers"]
+        self.assertEqual((headers["Content-Type"], headers["Content-Encoding"]), ("application/x-ndjson", "gzip"))
+        lines = gzip.decompress(request.call_args.kwargs["data"]).splitlines()
+        self.assertEqual([json.loads(line)["index"] for line in lines], [0, 1, 2])
+
+    @mock.patch.object(OutboundDrainer, "set_status")
+    @mock.patch("Gateway.http_client.requests.Session.request")
+    def test_undeliverable_frame_is_dropped_alone(self, request, set_status):
+        request.return_value.status_code = 200
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        codec = get_codec("json")
+        outbox = Outbox(os.path.join(directory, "connector-1"))
+        outbox.append(pack_record(codec, b'{"index":0}'))
+        outbox.append(b"gone\0" + b'{"index":1}')  # queued under a codec that is no longer installed
+        outbox.append(pack_record(codec, b'{"index":2}'))
+        outbox.close()
+        plan = OutboundPlan(1, "out", "rest", {"batch_max_bytes": 4096, "linger_ms": 0}, "http://example.invalid/", "POST", None, codec)
+        with self.settings(OUTBOX_DIR=directory):
+            drainer = OutboundDrainer(plan)
+            for _ in range(100):
+                if drainer.frames + drainer.undeliverable == 3:
+                    break
+                time.sleep(0.02)
+            drainer.stop()
+
+        sent = [json.loads(call.kwargs["data"])["frames"] for call in request.call_args_list]
+        self.assertEqual(sent, [[{"index": 0}], [{"index": 2}]])  # the batch was retried frame by frame
+        self.assertEqual(drainer.undeliverable, 1)
+        self.assertEqual(drainer.outbox.pending_bytes(), 0)
+
+    @skipUnless("msgpack" in CODECS, "msgpack is not installed")
+    def test_backlog_survives_a_codec_change(self):
+        records = [pack_record(get_codec("json"), b'{"a":1}'), pack_record(get_codec("msgpack"), b"\x81\xa1b\x02")]
+        self.assertEqual(unpack_records(records, get_codec("json")), [b'{"a":1}', b'{"b":2}'])
+
+    def test_response_classification(self):
+        def response(status, headers=None):
+            return SimpleNamespace(ok=status < 400, status_code=status, headers=headers or {}, text="")
+
+        check_response(response(202))
+        with self.assertRaises(RetryAfter) as raised:
+            check_response(response(429, {"Retry-After": "30"}))
+        self.assertEqual(raised.exception.delay, 30)
+        with self.assertRaises(Rejected):
+            check_response(response(422))
+
+
+class PayloadCodecTests(SimpleTestCase):
+    def test_registered_codecs_roundtrip_bytes(self):
+        message = {"node": "n", "timestamp": 1700000000000, "values": {"t": 1.5, "ok": True}}
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                encoded = codec.encode(message)
+                self.assertIsInstance(encoded, bytes)
+                self.assertEqual(codec.decode(encoded), message)
+                with self.assertRaises(ValueError):
+                    codec.decode(encoded[:-1])
+
+    def test_unknown_codec_falls_back_to_json(self):
+        connector = SimpleNamespace(name="c", configuration={"codec": "xml"})
+        self.assertEqual(get_connector_codec(connector).name, "json")
+
+
+class AliasSessionTests(SimpleTestCase):
+    def frame(self, timestamp, **values):
+        return {"node": "pump", "group": "1", "timestamp": timestamp, "values": values}
+
+    def send(self, session, frames, key="s1"):
+        messages = session.prepare(frames, key, get_codec("json"))
+        session.commit(messages)
+        return messages
+
+    def test_birth_then_only_changed_values(self):
+        session = AliasSession()
+        birth = self.send(session, [self.frame(1, flow=1.5, on=True)])
+        self.assertIsNone(birth.data)
+        metrics = json.loads(birth.birth)["metrics"]
+        self.assertEqual([(m["name"], m["alias"], m["value"]) for m in metrics], [("pump/flow", 0, 1.5), ("pump/on", 1, True)])
+
+        data = self.send(session, [self.frame(2, flow=2.5, on=True), self.frame(3, flow=2.5, on=True)])
+        self.assertIsNone(data.birth)
+        self.assertEqual(decode_data(data.data), (1, 0, [(2, {0: 2.5})]))
+        self.assertIsNone(self.send(session, [self.frame(4, flow=2.5, on=True)]).data)
+
+    def test_rebirth_on_new_session_or_metric(self):
+        session = AliasSession()
+        self.send(session, [self.frame(1, flow=1)])
+        self.assertEqual(json.loads(self.send(session, [self.frame(2, flow=1)], key="s2").birth)["bd_seq"], 2)
+        rebirth = self.send(session, [self.frame(3, flow=1, level=7)], key="s2")
+        self.assertEqual(len(json.loads(rebirth.birth)["metrics"]), 2)
+
+
+class ClientReconcilerTests(SimpleTestCase):
+    def spec(self, config_id, topics=("a/#",), broker_ip="10.0.0.1"):
+        return ClientSpec(config_id, config_id, "inbound", broker_ip, 1883, "", "", topics, "", 4)
+
+    def test_only_changed_clients_are_touched(self):
+        connect = mock.Mock(side_effect=lambda spec: mock.Mock(name=f"client{spec.config_id}"))
+        disconnect = mock.Mock()
+        reconciler = ClientReconciler(connect, disconnect)
+        reconciler.reconcile({1: self.spec(1), 2: self.spec(2), 3: self.spec(3)})
+        client1, client2, client3 = (reconciler.clients[key].client for key in (1, 2, 3))
+
+        reconciler.reconcile({
+            1: self.spec(1),
+            2: self.spec(2, topics=("a/#", "b/+")),
+            3: self.spec(3, broker_ip="10.0.0.2"),
+        })
+        self.assertEqual(connect.call_count, 4)
+        client1.subscribe.assert_not_called()
+        client2.subscribe.assert_called_once_with("b/+")
+        self.assertIs(reconciler.clients[2].client, client2)
+        disconnect.assert_called_once_with(client3)
+
+        reconciler.reconcile({1: self.spec(1)})
+        self.assertEqual(list(reconciler.clients), [1])
+        self.assertEqual(reconciler.stats()["disconnects"], 3)
+
+
+class HTTPClientTests(SimpleTestCase):
+    @mock.patch("Gateway.http_client.requests.Session.request")
+    def test_session_is_reused_and_bodies_gzipped(self, request):
+        request.return_value.status_code = 200
+        manager = HTTPClientManager()
+        connector = SimpleNamespace(id=1, name="out", configuration={"gzip": True, "read_timeout": 3})
+        client = manager.get(connector)
+        client.post("http://example.invalid/", data=b'{"a":1}')
+        self.assertIs(manager.get(connector), client)
+        kwargs = request.call_args.kwargs
+        self.assertEqual((kwargs["headers"]["Content-Encoding"], kwargs["timeout"]), ("gzip", (5.0, 3.0)))
+        self.assertEqual(gzip.decompress(kwargs["data"]), b'{"a":1}')
+
+        connector.configuration = {"pool_size": 8}
+        self.assertIsNot(manager.get(connector), client)
+
+
+class OutboundRouterTests(SimpleTestCase):
+    def test_slow_target_does_not_block_ingest(self):
+        release = threading.Event()
+        delivered = []
+
+        def deliver(plan, frame):
+            release.wait(5)
+            delivered.append(frame)
+
+        router = OutboundRouter(deliver)
+        self.addCleanup(router.retain, ())
+        plan = SimpleNamespace(id=1, name="slow", configuration={"queue_size": 2, "overflow": "drop_newest"})
+        router.route(plan, 0)
+        while router.stats()[1]["depth"]:
+            time.sleep(0.01)  # the worker is now stuck delivering frame 0
+
+        started = time.monotonic()
+        self.assertEqual([router.route(plan, frame) for frame in (1, 2, 3)], [True, True, False])
+        self.assertLess(time.monotonic() - started, 0.5)
+        release.set()
+        while len(delivered) < 3:
+            time.sleep(0.01)
+        self.assertEqual(delivered, [0, 1, 2])
+        self.assertEqual(router.stats()[1]["dropped"], 1)
+
+
+class RestInboundPushTests(TestCase):
+    def setUp(self):
+        gateway = IHG_Gateway.objects.create(name="gw")
+        self.connector = IHG_InboundConnector.objects.create(
+            name="push", gateway=gateway, connector_type="rest", configuration={"token": "secret"}
+        )
+        device = Device.objects.create(connector=self.connector, device_name="meter", device_id="m1")
+        self.ts = IHG_Timeseries.objects.create(
+            device=device, name="power", scale=2, address="0", byte_order="AB", data_type="FLOAT32"
+        )
+        self.url = f"/api/inbound/{self.connector.connector_id}/push/"
+
+    @mock.patch("Gateway.rest_inbound.set_connector_status")
+    @mock.patch("Gateway.rest_inbound.get_sample_writer")
+    def test_gzipped_ndjson_push(self, get_writer, set_status):
+        lines = [
+            {"device": "meter", "timestamp": 1700000000000, "values": {"power": 12.5, "bogus": 1}},
+            {"device": "unknown", "values": {"power": 1}},
+        ]
+        body = gzip.compress(b"\n".join(json.dumps(line).encode() for line in lines))
+        response = self.client.post(
+            self.url, body, content_type="application/x-ndjson",
+            headers={"Content-Encoding": "gzip", "Authorization": "Bearer secret"},
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()["accepted"], response.json()["rejected"]), (1, 2))
+        sample = get_writer.return_value.submit.call_args.args[0]
+        self.assertEqual((sample.timeseries_id, sample.value, sample.timestamp.year), (self.ts.id, 25.0, 2023))
+
+    def test_token_is_required(self):
+        response = self.client.post(self.url, b"{}", content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+
+class RestPollerTests(TestCase):
+    def setUp(self):
+        gateway = IHG_Gateway.objects.create(name="gw")
+        connector = IHG_InboundConnector.objects.create(
+            name="vendor", gateway=gateway, connector_type="rest",
+            configuration={"mode": "poll", "url": "http://vendor.test/sites/{device_id}"},
+        )
+        device = Device.objects.create(connector=connector, device_name="meter", device_id="m1")
+        IHG_Timeseries.objects.create(
+            device=device, name="power", scale=2, address="data.0.power", byte_order="AB", data_type="FLOAT32"
+        )
+
+    def test_conditional_requests_and_unchanged_bodies(self):
+        seen = []
+        body = {"data": [{"power": 10}]}
+
+        def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v2"':
+                return httpx.Response(304)
+            etag = '"v2"' if len(seen) > 2 else '"v1"'
+            return httpx.Response(200, json=body, headers={"ETag": etag})
+
+        (plan,) = build_rest_poll_plans()
+        (target,) = plan.targets
+        self.assertEqual(target.url, "http://vendor.test/sites/m1")
+        engine = RestPollEngine(threading.Event())
+
+        async def poll(times):
+            engine.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            results = [await engine.poll_target(plan, target) for _ in range(times)]
+            await engine.client.aclose()
+            return results
+
+        first, second, third, fourth = asyncio.run(poll(4))
+        self.assertEqual(first[1][0]["values"], {"power": 10})  # scaled by store_records
+        self.assertEqual(second, (True, []))  # same body, new response: skipped by hash
+        self.assertEqual(third, (True, []))
+        self.assertEqual(fourth, (True, []))  # 304
+        self.assertEqual(seen, [None, '"v1"', '"v1"', '"v2"'])
+        with mock.patch("Gateway.rest_poller.rest_poll_engine", engine):
+            stats = self.client.get("/api/monitor/stats/").json()["rest_poller"]
+        self.assertEqual((stats["changed"], stats["unchanged"], stats["not_modified"]), (1, 2, 1))
+
+
+class InboundConnectorFormTests(TestCase):
+    def setUp(self):
+        self.gateway = IHG_Gateway.objects.create(name="gw")
+        self.connector = IHG_InboundConnector.objects.create(name="plc", gateway=self.gateway, connector_type="modbus")
+        self.form = {
+            "name": "plc",
+            "connector_id": str(self.connector.connector_id),
+            "connector_type": "modbus",
+            "interval": "5",
+            "maximum_data_points": "100",
+        }
+
+    def test_modbus_form_sets_deadband(self):
+        url = f"/inbound_connector/{self.connector.pk}/edit/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.post(url, {
+            **self.form,
+            "devices[0][name]": "meter", "devices[0][id]": "m1", "devices[0][ip]": "127.0.0.1", "devices[0][port]": "502",
+            # the empty input row is posted before the table rows
+            "devices[0][ts][name][]": ["", "power"],
+            "devices[0][ts][scale][]": ["", "1"],
+            "devices[0][ts][address][]": ["", "0"],
+            "devices[0][ts][byte_order][]": ["", "AB"],
+            "devices[0][ts][data_type][]": ["", "UINT16"],
+            "devices[0][ts][deadband][]": ["", "0.5"],
+            "devices[0][ts][deadband_mode][]": ["absolute", "percent"],
+            "devices[0][ts][heartbeat][]": ["", "90"],
+        })
+        ts = IHG_Timeseries.objects.get(device__connector=self.connector)
+        self.assertEqual((ts.deadband, ts.deadband_mode, ts.heartbeat), (0.5, "percent", 90.0))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_modbus_form_sets_unit_and_timeouts(self):
+        url = f"/inbound_connector/{self.connector.pk}/edit/"
+        device = {"devices[0][name]": "meter", "devices[0][id]": "m1", "devices[0][ip]": "127.0.0.1", "devices[0][port]": "502"}
+        self.client.post(url, {**self.form, **device, "devices[0][unit]": "7", "devices[0][read_timeout]": "0.5"})
+        saved = Device.objects.get(connector=self.connector)
+        self.assertEqual((saved.unit_id, saved.connect_timeout, saved.read_timeout), (7, 3.0, 0.5))
+        self.assertContains(self.client.get(url), 'name="devices[0][unit]" value="7"')
+
+    def test_import_reads_modbus_deadband(self):
+        config = {"inputs": {"modbus": [{
+            "name": "plc",
+            "controller": "tcp://127.0.0.1:502",
+            "tags": {"device_id": "m1", "device_name": "meter"},
+            "holding_registers": [
+                {"name": "power", "address": [0], "byte_order": "AB", "data_type": "UINT16", "deadband": 2, "heartbeat": "500ms"},
+            ],
+        }]}}
+        upload = SimpleUploadedFile("config.json", json.dumps(config).encode())
+        self.client.post(f"/gateway/{self.gateway.pk}/import/", {"config_file": upload})
+        ts = IHG_Timeseries.objects.get(device__device_id="m1")
+        self.assertEqual((ts.name, ts.deadband, ts.deadband_mode, ts.heartbeat), ("power", 2.0, "absolute", 0.5))
+
+
+class StatusTests(TestCase):
+    def setUp(self):
+        status.clear()
+        self.gateway = IHG_Gateway.objects.create(name="gw")
+        self.outbound = IHG_OutboundConnector.objects.create(name="out", gateway=self.gateway, connector_type="rest")
+
+    def test_connector_status_updates_gateway(self):
+        status.set_connector_status("outbound", self.outbound.id, "active")
+        self.gateway.refresh_from_db()
+        self.assertEqual(self.gateway.status, "active")
+        with self.assertNumQueries(0):
+            status.set_connector_status("outbound", self.outbound.id, "active")
+        status.set_connector_status("outbound", self.outbound.id, "inactive")
+        self.gateway.refresh_from_db()
+        self.assertEqual(self.gateway.status, "inactive")
+
+    def test_clear_writes_the_status_again(self):
+        status.set_connector_status("outbound", self.outbound.id, "active")
+        IHG_OutboundConnector.objects.filter(id=self.outbound.id).update(status="inactive")  # row re-created / edited
+        status.clear()
+        status.set_connector_status("outbound", self.outbound.id, "active")
+        self.outbound.refresh_from_db()
+        self.assertEqual(self.outbound.status, "active")
@@ -0,0 +1,71 @@
+SINGLE_LEVEL = "+"
+MULTI_LEVEL = "#"
+
+
+class TopicTrieNode:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = []
+
+
+class TopicTrie:
+    """Subscription filters compiled into a trie of topic levels.
+
+    Follows MQTT matching rules: ``+`` matches exactly one level, ``#`` (last
+    level only) matches the parent level and everything below it, and topics
+    starting with ``$`` are only matched by filters that spell out their first
+    level. Matching walks the trie once per level, so its cost depends on the
+    topic depth rather than the number of filters.
+    """
+
+    def __init__(self):
+        self.root = TopicTrieNode()
+        self.size = 0
+
+    def insert(self, topic_filter, value):
+        levels = topic_filter.split("/")
+        for index, level in enumerate(levels):
+            if level == MULTI_LEVEL and index != len(levels) - 1:
+                raise ValueError(f"'#' must be the last level of topic filter {topic_filter!r}")
+            if level not in (SINGLE_LEVEL, MULTI_LEVEL) and (SINGLE_LEVEL in level or MULTI_LEVEL in level):
+                raise ValueError(f"wildcards must occupy a whole level in topic filter {topic_filter!r}")
+        node = self.root
+        for level in levels:
+            node = node.children.setdefault(level, TopicTrieNode())
+        node.values.append(value)
+        self.size += 1
+
+    def match(self, topic):
+        """Return the values of every filter matching a concrete topic name."""
+        levels = topic.split("/")
+        matches = []
+        nodes = [self.root]
+        for index, level in enumerate(levels):
+            wildcards_allowed = not (index == 0 and level.startswith("$"))
+            next_nodes = []
+            for node in nodes:
+                if wildcards_allowed:
+                    multi = node.children.get(MULTI_LEVEL)
+                    if multi is not None:
+                        matches.extend(multi.values)
+                    single = node.children.get(SINGLE_LEVEL)
+                    if single is not None:
+                        next_nodes.append(single)
+                exact = node.children.get(level)
+                if exact is not None:
+                    next_nodes.append(exact)
+            nodes = next_nodes
+            if not nodes:
+                return matches
+        for node in nodes:
+            matches.extend(node.values)
+            # "a/#" also matches "a" itself
+            multi = node.children.get(MULTI_LEVEL)
+            if multi is not None:
+                matches.extend(multi.values)
+        return matches
+
+    def __len__(self):
+        return self.size
@@ -30,7 +30,9 @@ path("api/gateways/", views.api_gateways, name="api_gateways"),
     path("api/latest-data/<int:device_id>/", views.api_latest_data, name="api_latest_data"),
         path("api/monitor/filters/", views.monitor_filters, name="monitor_filters"),
     path("api/monitor/data/", views.monitor_data, name="monitor_data"),
+    path("api/monitor/stats/", views.monitor_stats, name="monitor_stats"),
     path("api/monitor/csv/", views.monitor_csv, name="export-monitor-csv"),
+    path("api/inbound/<uuid:connector_id>/push/", views.rest_inbound_push, name="rest_inbound_push"),
 
 
 
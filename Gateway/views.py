@@ -1,16 +1,31 @@
 import json
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from .models import IHG_Gateway, IHG_InboundConnector, IHG_OutboundConnector, IHG_Timeseries,Device,IHG_MQTTConfiguration,IHG_ModbusData,IHG_MQTTData,IHG_MQTTTimeseries,IHG_MQTTDevice,IHG_MQTTTopic
+from .models import DEADBAND_MODE_CHOICES, IHG_Gateway, IHG_InboundConnector, IHG_OutboundConnector, IHG_Timeseries,Device,IHG_MQTTConfiguration,IHG_ModbusData,IHG_MQTTData,IHG_MQTTTimeseries,IHG_MQTTDevice,IHG_MQTTTopic
 from .forms import GatewayForm, InboundConnectorForm, OutboundConnectorForm,MQTTConfigurationForm
 import logging
-from Gateway import mqtt,modbus
+from asgiref.sync import sync_to_async
+from django.core.exceptions import RequestDataTooBig
+from Gateway import mqtt
+from Gateway.rest_inbound import get_rest_schema, handle_push, is_authorized, peek_rest_schema
+from Gateway.rest_poller import get_rest_poll_stats
+from Gateway.modbus_health import device_health
+from Gateway.sample_writer import get_sample_writer
+from Gateway.deadband import deadband_filter
+from Gateway.http_client import http_clients
+from Gateway.mqtt_publisher import publisher_manager
+from Gateway.outbound import outbound_manager
+from Gateway.router import outbound_router
+from django.db import transaction
 from django.db.models import Count, Q, Max
 from django.http import JsonResponse, HttpResponse
 
 import csv
 logger = logging.getLogger(__name__)
 
+# Timeseries settings that are not part of the connector edit form
+DEADBAND_MODES = dict(DEADBAND_MODE_CHOICES)
+
 def gateway_list(request):
     gateways = IHG_Gateway.objects.all().order_by('-created_at')
     return render(request, 'gateway_list.html', {'gateways': gateways})
@@ -46,10 +61,7 @@ def delete_gateway(request, pk):
     if request.method == 'POST':
         gateway.delete()
         messages.success(request, 'Gateway deleted successfully.')
-        modbus.stop_modbus_loop()
-        modbus.start_modbus_loop()
-        mqtt.stop_mqtt_loop()
-        mqtt.start_mqtt_loop()
+        # The Modbus and MQTT loops pick up configuration changes themselves (Gateway/signals.py)
         return redirect('gateway_list')
     return render(request, 'delete_gateway.html', {'gateway': gateway})
 
@@ -95,7 +107,10 @@ def get_mqtt_data_nested(mqtt_config):
             for k, ts in enumerate(device.timeseries.all().order_by('id')):
                 timeseries_dict[k] = {
                     'key': ts.key,
-                    'type': ts.type
+                    'type': ts.type,
+                    'deadband': ts.deadband,
+                    'deadband_mode': ts.deadband_mode,
+                    'heartbeat': ts.heartbeat,
                 }
             devices_dict[j] = {
                 'device_name': device.device_name,
@@ -131,107 +146,123 @@ def edit_inbound_connector(request, connector_pk):
                 
                 if mqtt_form.is_valid():
                     mqtt_form.instance.connector_inbound = connector
-                    # Save MQTT general config (broker IP, port, credentials)
-                    mqtt_form.save()
-
-                    # Clear existing topics, devices, and timeseries to replace
-                    IHG_MQTTTopic.objects.filter(mqtt_config=mqtt_config).delete()
+                    # One transaction, so the MQTT reconciler never sees a half-rebuilt topic tree
+                    with transaction.atomic():
+                        # Save MQTT general config (broker IP, port, credentials)
+                        mqtt_form.save()
 
-                    # Loop through topics in POST
-                    # Expect topics indexed as: topics[0][name], topics[0][devices][0][name], etc.
-                    post = request.POST
+                        # Clear existing topics, devices, and timeseries to replace
+                        IHG_MQTTTopic.objects.filter(mqtt_config=mqtt_config).delete()
 
-                    topic_keys = [key for key in post if key.startswith("topics[") and key.endswith("][name]")]
-                    # Extract topic indices like '0', '1' from keys 'topics[0][name]'
-                    topic_indices = sorted(set([key.split('[')[1].split(']')[0] for key in topic_keys]))
-
-                    for ti in topic_indices:
-                        topic_name = post.get(f"topics[{ti}][name]", "").strip()
-                        if not topic_name:
-                            continue
+                        # Loop through topics in POST
+                        # Expect topics indexed as: topics[0][name], topics[0][devices][0][name], etc.
+                        post = request.POST
 
-                        # Create topic
-                        topic_obj = IHG_MQTTTopic.objects.create(mqtt_config=mqtt_config, name=topic_name)
+                        topic_keys = [key for key in post if key.startswith("topics[") and key.endswith("][name]")]
+                        # Extract topic indices like '0', '1' from keys 'topics[0][name]'
+                        topic_indices = sorted(set([key.split('[')[1].split(']')[0] for key in topic_keys]))
 
-                        # Find device indices under this topic
-                        device_prefix = f"topics[{ti}][devices]"
-                        device_keys = [key for key in post if key.startswith(device_prefix) and key.endswith("][name]")]
-                        device_indices = sorted(set([key.split('[')[3].split(']')[0] for key in device_keys]))
-
-                        for di in device_indices:
-                            device_name = post.get(f"topics[{ti}][devices][{di}][name]", "").strip()
-                            if not device_name:
+                        for ti in topic_indices:
+                            topic_name = post.get(f"topics[{ti}][name]", "").strip()
+                            if not topic_name:
                                 continue
 
-                            device_id = post.get(f"topics[{ti}][devices][{di}][id]", "").strip() # If device_id field exists, adjust accordingly
-
-                            # Create device linked to topic
-                            device_obj = IHG_MQTTDevice.objects.create(
-                                topic=topic_obj,
-                                device_name=device_name,
-                                device_id=device_id
-                            )
-
-                            # Get timeseries under this device
-                            ts_key_prefix = f"topics[{ti}][devices][{di}][timeseries]"
-                            # Find all keys for timeseries keys
-                            ts_key_keys = [k for k in post if k.startswith(ts_key_prefix) and k.endswith("[key]")]
-                            ts_indices = sorted(set([k.split('[')[5].split(']')[0] for k in ts_key_keys]))
-
-                            for tsi in ts_indices:
-                                ts_key = post.get(f"topics[{ti}][devices][{di}][timeseries][{tsi}][key]", "").strip()
-                                ts_type = post.get(f"topics[{ti}][devices][{di}][timeseries][{tsi}][type]", "").strip()
-
-                                if ts_key:
-                                    IHG_MQTTTimeseries.objects.create(
-                                        device=device_obj,
-                                        key=ts_key,
-                                        type=ts_type if ts_type else 'String',
-                                    )
-                mqtt.stop_mqtt_loop()
-                mqtt.start_mqtt_loop()
-            elif connector.connector_type == "modbus":
-                # Existing modbus handling (unchanged)
-                Device.objects.filter(connector=connector).delete()
-
-                devices_data = [key for key in request.POST if key.startswith("devices[")]
-                device_indices = sorted(set([key.split('[')[1].split(']')[0] for key in devices_data]))
-
-                for idx in device_indices:
-                    name = request.POST.get(f"devices[{idx}][name]")
-                    dev_id = request.POST.get(f"devices[{idx}][id]")
-                    dev_ip = request.POST.get(f"devices[{idx}][ip]")
-                    dev_port = request.POST.get(f"devices[{idx}][port]")
-
-                    if not name or not dev_id:
-                        continue
-
-                    device_obj = Device.objects.create(
-                        connector=connector,
-                        device_name=name,
-                        device_id=dev_id,
-                        device_ip=dev_ip,
-                        device_port=dev_port
-                    )
+                            # Create topic
+                            topic_obj = IHG_MQTTTopic.objects.create(mqtt_config=mqtt_config, name=topic_name)
+
+                            # Find device indices under this topic
+                            device_prefix = f"topics[{ti}][devices]"
+                            device_keys = [key for key in post if key.startswith(device_prefix) and key.endswith("][name]")]
+                            device_indices = sorted(set([key.split('[')[3].split(']')[0] for key in device_keys]))
+
+                            for di in device_indices:
+                                device_name = post.get(f"topics[{ti}][devices][{di}][name]", "").strip()
+                                if not device_name:
+                                    continue
+
+                                device_id = post.get(f"topics[{ti}][devices][{di}][id]", "").strip() # If device_id field exists, adjust accordingly
+
+                                # Create device linked to topic
+                                device_obj = IHG_MQTTDevice.objects.create(
+                                    topic=topic_obj,
+                                    device_name=device_name,
+                                    device_id=device_id
+                                )
+
+                                # Get timeseries under this device
+                                ts_key_prefix = f"topics[{ti}][devices][{di}][timeseries]"
+                                # Find all keys for timeseries keys
+                                ts_key_keys = [k for k in post if k.startswith(ts_key_prefix) and k.endswith("[key]")]
+                                ts_indices = sorted(set([k.split('[')[5].split(']')[0] for k in ts_key_keys]))
+
+                                for tsi in ts_indices:
+                                    ts_prefix = f"topics[{ti}][devices][{di}][timeseries][{tsi}]"
+                                    ts_key = post.get(f"{ts_prefix}[key]", "").strip()
+                                    ts_type = post.get(f"{ts_prefix}[type]", "").strip()
+
+                                    if ts_key:
+                                        IHG_MQTTTimeseries.objects.create(
+                                            device=device_obj,
+                                            key=ts_key,
+                                            type=ts_type if ts_type else 'String',
+                                            **deadband_fields(
+                                                post.get(f"{ts_prefix}[deadband]"),
+                                                post.get(f"{ts_prefix}[deadband_mode]"),
+                                                post.get(f"{ts_prefix}[heartbeat]"),
+                                            ),
+                                        )
+            elif connector.connector_type in ("modbus", "rest"):
+                # Modbus and REST connectors share the Device / IHG_Timeseries form
+                with transaction.atomic():
+                    Device.objects.filter(connector=connector).delete()
+
+                    devices_data = [key for key in request.POST if key.startswith("devices[")]
+                    device_indices = sorted(set([key.split('[')[1].split(']')[0] for key in devices_data]))
+
+                    for idx in device_indices:
+                        name = request.POST.get(f"devices[{idx}][name]")
+                        dev_id = request.POST.get(f"devices[{idx}][id]")
+                        dev_ip = request.POST.get(f"devices[{idx}][ip]")
+                        dev_port = request.POST.get(f"devices[{idx}][port]")
+
+                        if not name or not dev_id:
+                            continue
 
-                    ts_names = request.POST.getlist(f"devices[{idx}][ts][name][]")
-                    ts_scales = request.POST.getlist(f"devices[{idx}][ts][scale][]")
-                    ts_addresses = request.POST.getlist(f"devices[{idx}][ts][address][]")
-                    ts_byte_orders = request.POST.getlist(f"devices[{idx}][ts][byte_order][]")
-                    ts_data_types = request.POST.getlist(f"devices[{idx}][ts][data_type][]")
-
-                    for t in range(len(ts_names)):
-                        if ts_names[t].strip():
-                            IHG_Timeseries.objects.create(
-                                device=device_obj,
-                                name=ts_names[t].strip(),
-                                scale=float(ts_scales[t]),
-                                address=ts_addresses[t].strip(),
-                                byte_order=ts_byte_orders[t].strip(),
-                                data_type=ts_data_types[t].strip()
-                            )
-                modbus.stop_modbus_loop()
-                modbus.start_modbus_loop()
+                        device_obj = Device.objects.create(
+                            connector=connector,
+                            device_name=name,
+                            device_id=dev_id,
+                            device_ip=dev_ip,
+                            device_port=dev_port,
+                            unit_id=request.POST.get(f"devices[{idx}][unit]") or 1,
+                            connect_timeout=request.POST.get(f"devices[{idx}][connect_timeout]") or 3.0,
+                            read_timeout=request.POST.get(f"devices[{idx}][read_timeout]") or 3.0,
+                        )
+
+                        ts_names = request.POST.getlist(f"devices[{idx}][ts][name][]")
+                        ts_scales = request.POST.getlist(f"devices[{idx}][ts][scale][]")
+                        ts_addresses = request.POST.getlist(f"devices[{idx}][ts][address][]")
+                        ts_byte_orders = request.POST.getlist(f"devices[{idx}][ts][byte_order][]")
+                        ts_data_types = request.POST.getlist(f"devices[{idx}][ts][data_type][]")
+                        ts_deadbands = request.POST.getlist(f"devices[{idx}][ts][deadband][]")
+                        ts_deadband_modes = request.POST.getlist(f"devices[{idx}][ts][deadband_mode][]")
+                        ts_heartbeats = request.POST.getlist(f"devices[{idx}][ts][heartbeat][]")
+
+                        for t in range(len(ts_names)):
+                            if ts_names[t].strip():
+                                IHG_Timeseries.objects.create(
+                                    device=device_obj,
+                                    name=ts_names[t].strip(),
+                                    scale=float(ts_scales[t]),
+                                    address=ts_addresses[t].strip(),
+                                    byte_order=ts_byte_orders[t].strip(),
+                                    data_type=ts_data_types[t].strip(),
+                                    **deadband_fields(
+                                        ts_deadbands[t] if t < len(ts_deadbands) else None,
+                                        ts_deadband_modes[t] if t < len(ts_deadband_modes) else None,
+                                        ts_heartbeats[t] if t < len(ts_heartbeats) else None,
+                                    ),
+                                )
             messages.success(request, "Inbound connector updated successfully.")
             return redirect('edit_inbound_connector', connector_pk=connector_pk)
 
@@ -284,21 +315,20 @@ def edit_outbound_connector(request, connector_pk):
 
         if form.is_valid():
             connector = form.save()
-            gateway_id = connector.gateway.id
-            in_connector = IHG_InboundConnector.objects.get(gateway=gateway_id)
             if connector.connector_type == "mqtt":
                 mqtt_form = MQTTConfigurationForm(request.POST, instance=mqtt_config)
                 if mqtt_form.is_valid():
                     mqtt_form.instance.connector_outbound = connector
-                    mqtt_form.save()
-                    # Clear all previous topics for this config
-                    IHG_MQTTTopic.objects.filter(mqtt_config=mqtt_config).delete()
-                    # Get topics from POST list (array of inputs)
-                    topics_list = request.POST.getlist('topics[]')
-                    for topic_name in topics_list:
-                        topic_name = topic_name.strip()
-                        if topic_name:
-                            IHG_MQTTTopic.objects.create(mqtt_config=mqtt_config, name=topic_name)
+                    with transaction.atomic():
+                        mqtt_form.save()
+                        # Clear all previous topics for this config
+                        IHG_MQTTTopic.objects.filter(mqtt_config=mqtt_config).delete()
+                        # Get topics from POST list (array of inputs)
+                        topics_list = request.POST.getlist('topics[]')
+                        for topic_name in topics_list:
+                            topic_name = topic_name.strip()
+                            if topic_name:
+                                IHG_MQTTTopic.objects.create(mqtt_config=mqtt_config, name=topic_name)
                     # Reload topics for display
                     mqtt_topics_list = list(IHG_MQTTTopic.objects.filter(mqtt_config=mqtt_config).values_list('name', flat=True))
                 
@@ -311,15 +341,7 @@ def edit_outbound_connector(request, connector_pk):
                 connector.rest_url = post_data.get("rest_url")
                 
                 connector.save(update_fields=["rest_url"])
-            if in_connector.connector_type == "modbus":
-                modbus.stop_modbus_loop()
-                modbus.start_modbus_loop()
-            elif in_connector.connector_type == 'mqtt':
-                mqtt.stop_mqtt_loop()
-                mqtt.start_mqtt_loop()
 
-
-                
             print('Outbound connector updated.')
             return redirect('gateway_detail', pk=connector.gateway.pk)
     else:
@@ -524,6 +546,34 @@ def add_timeseries(request, connector_pk):
 
 #     return redirect('gateway_detail', pk=gateway_id)
 
+def parse_duration_seconds(value, default):
+    """Parse durations like 3, "3", "3s" or "500ms" from imported configs into seconds."""
+    if value in (None, ""):
+        return default
+    text = str(value).strip().lower()
+    try:
+        if text.endswith("ms"):
+            return float(text[:-2]) / 1000
+        if text.endswith("s"):
+            return float(text[:-1])
+        return float(text)
+    except ValueError:
+        return default
+
+
+def deadband_fields(deadband, mode, heartbeat):
+    """Deadband settings of a timeseries from form or imported values, blank meaning off."""
+    try:
+        deadband = float(deadband) if deadband not in (None, "") else None
+    except (TypeError, ValueError):
+        deadband = None
+    return {
+        "deadband": deadband,
+        "deadband_mode": mode if mode in DEADBAND_MODES else "absolute",
+        "heartbeat": parse_duration_seconds(heartbeat, None),
+    }
+
+
 def import_gateway_config(request, gateway_id):
     gateway = get_object_or_404(IHG_Gateway, id=gateway_id)
 
@@ -570,7 +620,14 @@ def import_gateway_config(request, gateway_id):
                 device, _ = Device.objects.get_or_create(
                     connector=inbound,
                     device_id=device_id,
-                    defaults={"device_name": device_name, "device_ip": ip, "device_port": port}
+                    defaults={
+                        "device_name": device_name,
+                        "device_ip": ip,
+                        "device_port": port,
+                        "unit_id": mb.get("slave_id", 1),
+                        "connect_timeout": parse_duration_seconds(mb.get("timeout"), 3.0),
+                        "read_timeout": parse_duration_seconds(mb.get("timeout"), 3.0),
+                    }
                 )
 
                 # Create timeseries from holding registers
@@ -583,6 +640,7 @@ def import_gateway_config(request, gateway_id):
                             "address": ",".join(map(str, reg.get("address", []))),
                             "byte_order": reg.get("byte_order"),
                             "data_type": reg.get("data_type"),
+                            **deadband_fields(reg.get("deadband"), reg.get("deadband_mode"), reg.get("heartbeat")),
                         }
                     )
 
@@ -706,6 +764,9 @@ def api_devices(request, gateway_id):
             Device.objects.filter(connector__gateway_id=gateway_id)
             .values("id", "device_name", "device_status")
         )
+        health = device_health.snapshot([device["id"] for device in devices])
+        for device in devices:
+            device["health"] = health.get(device["id"])
         print(devices,devices)
         return JsonResponse({"devices": devices})
 
@@ -788,15 +849,20 @@ def get_devices_data_for_gateway(gateway_id,device_id=None):
 
     # Build a dict of device last communication times for quick lookup
     device_last_comm = {d.device_name: d.last_communication for d in devices}
+    # Circuit breaker state of the pollers running in this process
+    health = device_health.snapshot()
 
     for ts in timeseries_with_latest:
         last_comm = device_last_comm.get(ts.device.device_name)
+        device_state = health.get(ts.device_id, {})
         result.append({
             "device_name": ts.device.device_name,
             "key": ts.name,
             "value": ts.latest_value,
             "last_update_time": ts.latest_timestamp.isoformat() if ts.latest_timestamp else None,
             "device_last_communication": last_comm.isoformat() if last_comm else None,  # Include device last comm time
+            "device_state": device_state.get("state", "closed"),
+            "backing_off_until": device_state.get("backing_off_until"),
         })
 
     return result
@@ -819,6 +885,20 @@ def monitor_filters(request):
     })
 
 
+def monitor_stats(request):
+    return JsonResponse({
+        "sample_writer": get_sample_writer().stats(),
+        "deadband": deadband_filter.stats(),
+        "mqtt_ingest": mqtt.get_ingest_pool().stats(),
+        "mqtt_clients": mqtt.client_reconciler.stats(),
+        "http_clients": http_clients.stats(),
+        "outbound_queues": outbound_router.stats(),
+        "mqtt_publishers": publisher_manager.stats(),
+        "outbound": outbound_manager.stats(),
+        "rest_poller": get_rest_poll_stats(),
+    })
+
+
 def monitor_data(request):
     gateway_id = request.GET.get("gateway")
     device_id = request.GET.get("device")
@@ -875,3 +955,33 @@ def monitor_csv(request):
                 ])
 
     return response
+
+
+async def rest_inbound_push(request, connector_id):
+    """Ingest samples pushed to a REST inbound connector.
+
+    The body is a JSON object {"device", "timestamp", "values": {name: number}},
+    a list of them, or NDJSON (Content-Type application/x-ndjson), optionally
+    gzip/deflate compressed. Slow uploads only hold the event loop; decoding
+    and storage run through sync_to_async on Django's sync thread, whose
+    database connection is managed like a sync view's.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    schema = peek_rest_schema(connector_id) or await sync_to_async(get_rest_schema)(connector_id)
+    if schema is None:
+        return JsonResponse({"error": "unknown connector"}, status=404)
+    if not is_authorized(schema, request.headers):
+        return JsonResponse({"error": "invalid token"}, status=401)
+    try:
+        body = request.body
+    except RequestDataTooBig:
+        return JsonResponse({"error": "body too large"}, status=413)
+    status, result = await sync_to_async(handle_push)(
+        schema, body, request.headers.get("Content-Type"), request.headers.get("Content-Encoding")
+    )
+    return JsonResponse(result, status=status)
+
+
+# Devices post without a CSRF token; set directly since csrf_exempt only wraps async views on Django >= 5.0
+rest_inbound_push.csrf_exempt = True
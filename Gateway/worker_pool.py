@@ -0,0 +1,77 @@
+import threading
+import zlib
+from Gateway.bounded_queue import BoundedQueue
+
+
+class WorkerPool:
+    """Worker threads fed from bounded queues, one queue per worker.
+
+    Items are assigned to a worker by ``partition`` (e.g. a topic), so items
+    of one partition are handled in arrival order while different
+    partitions are processed in parallel. ``handler(item)`` runs on the
+    worker thread; exceptions are printed and the worker carries on.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=10000, overflow="block", block_timeout=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(int(workers), 1)
+        per_worker = max(int(queue_size) // self.workers, 1)
+        self.queues = [BoundedQueue(per_worker, overflow, block_timeout) for _ in range(self.workers)]
+        self.processed = 0
+        self.failed = 0
+        self.stop_event = threading.Event()
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if any(thread.is_alive() for thread in self.threads):
+                return
+            self.stop_event.clear()
+            self.threads = [
+                threading.Thread(target=self.run, args=(queue,), name=f"{self.name}-{index}", daemon=True)
+                for index, queue in enumerate(self.queues)
+            ]
+            for thread in self.threads:
+                thread.start()
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+        self.threads = []
+
+    def submit(self, item, partition=""):
+        """Queue an item, return False if the overflow policy dropped it."""
+        if not self.threads:
+            self.start()
+        if isinstance(partition, str):
+            partition = zlib.crc32(partition.encode())
+        return self.queues[partition % self.workers].put(item)
+
+    def run(self, queue):
+        while not self.stop_event.is_set():
+            item = queue.get(timeout=0.5)
+            if item is None:
+                continue
+            try:
+                self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠ {self.name} worker failed to process item: {e}")
+
+    def stats(self):
+        queues = [queue.stats() for queue in self.queues]
+        return {
+            "workers": self.workers,
+            "depth": sum(queue["depth"] for queue in queues),
+            "capacity": sum(queue["capacity"] for queue in queues),
+            "policy": self.queues[0].policy,
+            "enqueued": sum(queue["enqueued"] for queue in queues),
+            "dropped": sum(queue["dropped"] for queue in queues),
+            "high_watermark": max(queue["high_watermark"] for queue in queues),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
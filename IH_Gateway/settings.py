@@ -124,3 +124,147 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/stable/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Modbus polling
+# Largest block read (in registers) and the largest hole between tags that is
+# still read through rather than split into a separate request. Both can be
+# overridden per connector via its configuration JSON (max_block_size / max_gap).
+
+MODBUS_MAX_BLOCK_SIZE = 125
+MODBUS_MAX_GAP = 0
+
+# Seconds a Modbus TCP connection (of either polling engine) may sit unused
+# before it is closed.
+MODBUS_IDLE_TIMEOUT = 300
+
+# Polling engine: "thread" walks connectors and devices one after another,
+# "asyncio" polls every Modbus device concurrently (see Gateway/modbus_async.py).
+MODBUS_ENGINE = "thread"
+# Upper bound on devices being read at the same time by the asyncio engine.
+MODBUS_ASYNC_MAX_CONCURRENCY = 50
+
+# Per-device circuit breaker: after MODBUS_BREAKER_FAILURE_THRESHOLD failed
+# polls a device is skipped for MODBUS_BACKOFF_BASE seconds, doubling per
+# further failure up to MODBUS_BACKOFF_MAX, randomised by +/- the jitter fraction.
+# Connect / read timeouts are configured per device.
+MODBUS_BREAKER_FAILURE_THRESHOLD = 2
+MODBUS_BACKOFF_BASE = 5
+MODBUS_BACKOFF_MAX = 300
+MODBUS_BACKOFF_JITTER = 0.2
+
+# Batched sample writer: rows are flushed with bulk_create every
+# SAMPLE_WRITER_BATCH_SIZE rows or SAMPLE_WRITER_FLUSH_INTERVAL seconds.
+# SAMPLE_WRITER_OVERFLOW is "block", "drop_oldest" or "drop_newest".
+SAMPLE_WRITER_BATCH_SIZE = 500
+SAMPLE_WRITER_FLUSH_INTERVAL = 1.0
+SAMPLE_WRITER_QUEUE_SIZE = 50000
+SAMPLE_WRITER_OVERFLOW = "block"
+
+# Stored samples are compacted every RETENTION_INTERVAL seconds: each series
+# keeps its connector's maximum_data_points newest rows, and rows older than
+# the connector's configuration["retention_seconds"] (default
+# DATA_RETENTION_SECONDS, 0 = keep forever) are deleted.
+RETENTION_INTERVAL = 60
+DATA_RETENTION_SECONDS = 0
+
+# Inbound MQTT messages are queued by paho's network thread and processed by
+# MQTT_INGEST_WORKERS threads (messages of one topic always go to the same
+# worker). MQTT_INGEST_OVERFLOW is "block" (for up to MQTT_INGEST_BLOCK_TIMEOUT
+# seconds), "drop_oldest" or "drop_newest".
+MQTT_INGEST_QUEUE_SIZE = 10000
+MQTT_INGEST_WORKERS = 2
+MQTT_INGEST_OVERFLOW = "drop_oldest"
+MQTT_INGEST_BLOCK_TIMEOUT = 5
+
+# Outbound MQTT: one persistent client per outbound configuration. QoS can be
+# overridden per connector with configuration["qos"]; at most
+# MQTT_PUBLISH_MAX_INFLIGHT QoS>0 messages are unacknowledged at a time and a
+# publish counts as failed if not acknowledged within MQTT_PUBLISH_TIMEOUT.
+MQTT_PUBLISH_QOS = 0
+MQTT_PUBLISH_MAX_INFLIGHT = 20
+MQTT_PUBLISH_TIMEOUT = 10
+MQTT_RECONNECT_MAX_DELAY = 60
+
+# Scale-out: several gateway processes may ingest from the same brokers. With
+# MQTT_SHARED_GROUP set, inbound topics are subscribed as "$share/<group>/<topic>"
+# so the broker spreads messages across the processes instead of delivering
+# each one to all of them. MQTT_PROTOCOL is "3.1.1" or "5". Per connector:
+# configuration["shared_group"], ["mqtt_protocol"]. Client ids are unique per
+# process; give each process its own GATEWAY_INSTANCE_ID so their outboxes
+# (OUTBOX_DIR/<instance>) do not collide.
+MQTT_SHARED_GROUP = ""
+MQTT_PROTOCOL = "3.1.1"
+GATEWAY_INSTANCE_ID = os.environ.get("GATEWAY_INSTANCE_ID", "")
+
+# Store-and-forward: outbound frames are appended to an on-disk outbox per
+# connector (OUTBOX_SEGMENT_BYTES per segment file, oldest segments discarded
+# beyond OUTBOX_MAX_BYTES) and removed once delivered. Failed sends are retried
+# with a backoff up to OUTBOUND_RETRY_MAX_DELAY seconds; a backlog drains at
+# OUTBOUND_CATCHUP_RATE messages per second (configuration["catchup_rate"]).
+# Appends reach the disk (fsync) within about OUTBOX_FSYNC_INTERVAL seconds
+# (0: on every append).
+OUTBOX_DIR = BASE_DIR / "outbox"
+OUTBOX_SEGMENT_BYTES = 1024 * 1024
+OUTBOX_MAX_BYTES = 100 * 1024 * 1024
+OUTBOX_FSYNC_INTERVAL = 1
+OUTBOUND_RETRY_MAX_DELAY = 60
+OUTBOUND_CATCHUP_RATE = 50
+
+# Ingest hands outbound frames to a router queue per outbound connector
+# (OUTBOUND_QUEUE_SIZE frames) and returns; the connector's worker writes them
+# to its outbox. OUTBOUND_QUEUE_OVERFLOW is "block" (for up to
+# OUTBOUND_QUEUE_BLOCK_TIMEOUT seconds), "drop_oldest" or "drop_newest".
+# Per connector: configuration["queue_size"], ["overflow"].
+OUTBOUND_QUEUE_SIZE = 10000
+OUTBOUND_QUEUE_OVERFLOW = "drop_oldest"
+OUTBOUND_QUEUE_BLOCK_TIMEOUT = 1
+
+# Outbound batching: with OUTBOUND_BATCH_MAX_BYTES > 0 frames are packed into
+# one envelope of up to that many bytes, waiting at most OUTBOUND_LINGER_MS for
+# it to fill, and compressed with OUTBOUND_COMPRESSION ("none", "zlib" or
+# "gzip"). Per connector: configuration["batch_max_bytes"], ["linger_ms"],
+# ["compression"]. See Gateway/outbound_batch.py for the envelope format.
+OUTBOUND_BATCH_MAX_BYTES = 0
+OUTBOUND_LINGER_MS = 500
+OUTBOUND_COMPRESSION = "none"
+
+# OUTBOUND_BATCH_FORMAT "envelope" posts {"frames": [...]}, "ndjson" one JSON
+# frame per line (REST only, configuration["batch_format"]). A REST connector
+# with configuration["rest_mode"] = "bulk" defaults to gzip-compressed NDJSON
+# batches of up to OUTBOUND_BULK_MAX_BYTES. A Retry-After on HTTP 429/503 is
+# honoured for up to OUTBOUND_RETRY_AFTER_MAX seconds.
+OUTBOUND_BATCH_FORMAT = "envelope"
+OUTBOUND_BULK_MAX_BYTES = 1024 * 1024
+OUTBOUND_RETRY_AFTER_MAX = 600
+
+# Payload codec for MQTT/REST message bodies: "json" (orjson when installed),
+# "msgpack" (pip install msgpack) or "cbor" (pip install cbor2).
+# Per connector: configuration["codec"]. See Gateway/payload_codecs.py.
+PAYLOAD_CODEC = "json"
+
+# Outbound MQTT payload mode: "plain" sends every frame as is, "alias" sends a
+# birth message with numeric aliases per metric, then binary data messages with
+# only the changed values. Per connector: configuration["payload_mode"].
+# See Gateway/alias_encoding.py for the message formats.
+OUTBOUND_PAYLOAD_MODE = "plain"
+
+# REST connectors share one keep-alive HTTP session each, pooling up to
+# HTTP_POOL_SIZE connections per host. HTTP_GZIP_REQUESTS compresses request
+# bodies. Per connector: configuration["pool_size"], ["connect_timeout"],
+# ["read_timeout"], ["gzip"].
+HTTP_POOL_SIZE = 4
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 10
+HTTP_GZIP_REQUESTS = False
+
+# REST inbound push (api/inbound/<connector uuid>/push/): bodies may be gzip or
+# deflate compressed up to REST_INBOUND_MAX_BYTES once decompressed. A connector
+# with configuration["token"] requires "Authorization: Bearer <token>".
+REST_INBOUND_MAX_BYTES = 16 * 1024 * 1024
+
+# REST inbound pull mode (configuration["mode"] = "poll"): configuration["url"]
+# is polled every interval with conditional requests over one shared async
+# client of up to REST_POLL_MAX_CONNECTIONS connections. Per connector:
+# configuration["headers"]. Timeouts follow HTTP_CONNECT/READ_TIMEOUT.
+REST_POLL_MAX_CONNECTIONS = 100